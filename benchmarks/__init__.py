@@ -0,0 +1,3 @@
+"""
+Benchmarks of the median filter stages and of the whole pipeline.
+"""
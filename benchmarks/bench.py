@@ -0,0 +1,474 @@
+"""
+Benchmarks measuring frames per second, p50 / p99 latency and peak RSS of
+resize and median filter, Broker queue overhead, passing frames through
+process queues, saving pictures and the whole graph of main.py. Each case runs
+in a fresh process, so its peak RSS is not shared with other cases, and results
+are saved as JSON to compare commits.
+
+Usage example:
+    python -m benchmarks.bench --output before.json
+    ... change the code ...
+    python -m benchmarks.bench --output after.json --compare before.json
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import subprocess
+import sys
+import tempfile
+from time import perf_counter, time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from median_filter import (
+    END_OF_STREAM,
+    Broker,
+    Consumer,
+    FramePool,
+    FrameQueue,
+    MedianFilter,
+    PictureRecorder,
+    Producer,
+    Sequenced,
+    set_n_steps,
+)
+from median_filter.kernels import FUSED_MAX_AREA
+from median_filter.median_filter import _make_filter
+from median_filter.recorder import _Recorder
+
+try:
+    import resource
+except ImportError:  # pragma: no cover, not available on Windows
+    resource = None  # type: ignore
+
+NEW_FRAME_SHAPE = (512, 384)
+"""Output shape of resize in all cases, the main workload."""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+"""Folder containing package benchmarks."""
+
+UINT16_BITS = 12
+"""Bit depth of uint16 frames like of typical sensors, rank kernels count values
+in histogram with 2 ** bit depth bins."""
+
+REGRESSION = 0.1
+"""Relative drop of frames per second reported by compare as regression."""
+
+
+def _summary(latencies: Sequence[float], frames: int, wall: float) -> Dict[str, Any]:
+    """Function summarize measured latencies.
+
+    Args:
+        latencies (Sequence[float]): latency of each frame in seconds
+        frames (int): number of processed frames
+        wall (float): time of processing all frames in seconds
+
+    Returns:
+        Dict[str, Any]: frames, fps, p50_ms and p99_ms
+    """
+    return {
+        "frames": frames,
+        "fps": frames / wall if wall > 0 else float("inf"),
+        "p50_ms": 1e3 * float(np.percentile(latencies, 50)),
+        "p99_ms": 1e3 * float(np.percentile(latencies, 99)),
+    }
+
+
+def _frame(shape: Tuple[int, ...], dtype: str) -> np.ndarray:
+    """Function make random frame with values in range of dtype used by the filters.
+
+    Args:
+        shape (Tuple[int, ...]): shape of frame
+        dtype (str): dtype of frame
+
+    Returns:
+        np.ndarray: random frame, float frames have values in [0, 1],
+            uint16 frames have UINT16_BITS bits
+    """
+    if np.dtype(dtype).kind == "f":
+        return np.random.random(shape).astype(dtype)
+    high = 2**UINT16_BITS if dtype == "uint16" else np.iinfo(dtype).max + 1
+    return np.random.randint(high, size=shape, dtype=dtype)
+
+
+def bench_resize_median(
+    size: Tuple[int, int],
+    dtype: str,
+    method: str,
+    filter_shape: Tuple[int, int, int],
+    frames: int,
+) -> Dict[str, Any]:
+    """Function measure resize and median filter of single frames.
+
+    Args:
+        size (Tuple[int, int]): shape of input frame
+        dtype (str): dtype of input frame
+        method (str): method of MedianFilter
+        filter_shape (Tuple[int, int, int]): shape of the filter
+        frames (int): number of measured frames
+
+    Returns:
+        Dict[str, Any]: summary, see _summary
+    """
+    fun = _make_filter(NEW_FRAME_SHAPE, tuple(filter_shape), method)
+    frame = _frame((*size, 3), dtype)
+    fun(frame)
+    latencies = []
+    for _ in range(frames):
+        started = perf_counter()
+        fun(frame)
+        latencies.append(perf_counter() - started)
+    return _summary(latencies, frames, sum(latencies))
+
+
+def bench_broker(queue_type: str, frames: int) -> Dict[str, Any]:
+    """Function measure overhead of Broker passing data by no-op function.
+
+    Args:
+        queue_type (str): "thread" (queue.Queue) or "process" (multiprocessing.Queue)
+        frames (int): number of passed data
+
+    Returns:
+        Dict[str, Any]: summary, see _summary
+    """
+    queue_type_ = queue.Queue if queue_type == "thread" else multiprocessing.Queue
+    queue_in, queue_out = queue_type_(), queue_type_()
+    broker = Broker(queue_in, queue_out, lambda data: data, timeout=None)
+    broker.start()
+    latencies = []
+    started = perf_counter()
+    for _ in range(frames):
+        queue_in.put(perf_counter())
+        sent = queue_out.get()
+        latencies.append(perf_counter() - sent)
+    wall = perf_counter() - started
+    queue_in.put(END_OF_STREAM)
+    broker.join()
+    return _summary(latencies, frames, wall)
+
+
+def bench_frame_queue(queue_type: str, frames: int) -> Dict[str, Any]:
+    """Function measure passing Sequenced frames through queue between processes.
+
+    Args:
+        queue_type (str): "process" (multiprocessing.Queue) or "frames" (FrameQueue)
+        frames (int): number of passed frames
+
+    Returns:
+        Dict[str, Any]: summary, see _summary
+    """
+    queue_ = multiprocessing.Queue() if queue_type == "process" else FrameQueue()
+    frame = _frame((*NEW_FRAME_SHAPE, 3), "uint8")
+    latencies = []
+    started = perf_counter()
+    for index in range(frames):
+        queue_.put(Sequenced(index, perf_counter(), frame))
+        received = queue_.get()
+        latencies.append(perf_counter() - received.timestamp)
+    wall = perf_counter() - started
+    queue_.close()
+    return _summary(latencies, frames, wall)
+
+
+def bench_recorder(file_ext: str, frames: int) -> Dict[str, Any]:
+    """Function measure saving pictures by _Recorder.save_to_file.
+
+    Args:
+        file_ext (str): format of pictures
+        frames (int): number of saved pictures
+
+    Returns:
+        Dict[str, Any]: summary, see _summary
+    """
+    frame = _frame((*NEW_FRAME_SHAPE, 3), "uint8")
+    with tempfile.TemporaryDirectory() as folder:
+        recorder = _Recorder(f"{folder}/pictures", "bench", file_ext)
+        latencies = []
+        for _ in range(frames):
+            started = perf_counter()
+            recorder.save_to_file(frame)
+            latencies.append(perf_counter() - started)
+    return _summary(latencies, frames, sum(latencies))
+
+
+def bench_pipeline(method: str, writers: int, frames: int) -> Dict[str, Any]:
+    """Function measure the graph of main.py: Producer of pooled frames,
+        MedianFilter and PictureRecorder, without interval between frames.
+        Latency is the age of frame since the Producer when it is saved.
+
+    Args:
+        method (str): method of MedianFilter
+        writers (int): writer threads of PictureRecorder
+        frames (int): number of frames
+
+    Returns:
+        Dict[str, Any]: summary, see _summary
+    """
+    input_shape = (768, 1024, 3)
+    counter = set_n_steps(frames)
+    input_pool = FramePool(input_shape, "uint8", size=4)
+    output_pool = FramePool((*NEW_FRAME_SHAPE, 3), "uint8", size=4)
+    noise = _frame(input_shape, "uint8")
+
+    def produce() -> Tuple[bool, Optional[np.ndarray]]:
+        if not next(counter):
+            return False, None
+        frame = input_pool.acquire()
+        np.copyto(frame, noise)
+        return True, frame
+
+    queue0: queue.Queue = queue.Queue()
+    queue1: queue.Queue = queue.Queue()
+    with tempfile.TemporaryDirectory() as folder:
+        workers: List[Any] = [
+            Producer(queue0, produce, 0, sequence=True, end_of_stream=1),
+            MedianFilter(
+                queue0,
+                queue1,
+                NEW_FRAME_SHAPE,
+                (5, 5, 1),
+                method=method,
+                pool=output_pool,
+                input_pool=input_pool,
+                timeout=None,
+            ),
+            PictureRecorder(
+                queue1,
+                f"{folder}/pictures",
+                "bench",
+                pool=output_pool,
+                writers=writers,
+                timeout=None,
+            ),
+        ]
+        started = perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        wall = perf_counter() - started
+    consumer: Consumer = workers[-1]
+    summary = _summary([0.0], consumer.metrics.items, wall)
+    summary["p50_ms"] = 1e3 * consumer.metrics.age.percentile(50)
+    summary["p99_ms"] = 1e3 * consumer.metrics.age.percentile(99)
+    return summary
+
+
+BENCHMARKS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    "resize_median": bench_resize_median,
+    "broker": bench_broker,
+    "frame_queue": bench_frame_queue,
+    "recorder": bench_recorder,
+    "pipeline": bench_pipeline,
+}
+
+
+def cases(quick: bool = False) -> List[Tuple[str, Dict[str, Any]]]:
+    """Function list benchmark cases.
+
+    Args:
+        quick (bool, optional): If True only small frames and few repetitions.
+            Defaults to False.
+
+    Returns:
+        List[Tuple[str, Dict[str, Any]]]: name of benchmark and its parameters
+    """
+    sizes = [(480, 640), (768, 1024)] + ([] if quick else [(2160, 3840)])
+    filters = [(3, 3, 1), (5, 5, 1)] + ([] if quick else [(15, 15, 1)])
+    frames = 3 if quick else 20
+    result: List[Tuple[str, Dict[str, Any]]] = []
+    methods = ("skimage", "rank", "fused", "histogram", "separable")
+    dtypes = ("uint8", "float32") + (() if quick else ("uint16",))
+    for size, dtype, method, filter_shape in itertools.product(
+        sizes, dtypes, methods, filters
+    ):
+        if method == "skimage" and dtype == "uint16":
+            continue
+        if method != "skimage" and dtype == "float32":
+            continue
+        if method == "histogram" and dtype != "uint8":
+            continue
+        if method == "fused" and filter_shape[0] * filter_shape[1] > FUSED_MAX_AREA:
+            continue
+        params = {
+            "size": size,
+            "dtype": dtype,
+            "method": method,
+            "filter_shape": filter_shape,
+            "frames": frames,
+        }
+        result.append(("resize_median", params))
+    for queue_type in ("thread", "process"):
+        params = {"queue_type": queue_type, "frames": 500 if quick else 5000}
+        result.append(("broker", params))
+    for queue_type in ("process", "frames"):
+        params = {"queue_type": queue_type, "frames": 100 if quick else 1000}
+        result.append(("frame_queue", params))
+    for file_ext in ("png", "jpg", "bmp", "tiff"):
+        result.append(("recorder", {"file_ext": file_ext, "frames": frames}))
+    for method, writers in (("rank", 0), ("fused", 0), ("fused", 2)):
+        params = {"method": method, "writers": writers, "frames": 10 * frames}
+        result.append(("pipeline", params))
+    return result
+
+
+def run_case(name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Function run one benchmark and measure peak RSS of the process.
+
+    Args:
+        name (str): name of benchmark, key of BENCHMARKS
+        params (Dict[str, Any]): parameters of benchmark
+
+    Returns:
+        Dict[str, Any]: name, params, summary and peak_rss_mb
+    """
+    result = {"name": name, "params": params}
+    result.update(BENCHMARKS[name](**params))
+    result["peak_rss_mb"] = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        scale = 1 if sys.platform == "darwin" else 1024
+        result["peak_rss_mb"] = peak * scale / 2**20
+    return result
+
+
+def run_isolated(name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Function run one benchmark in fresh interpreter, see option --case.
+
+    Args:
+        name (str): name of benchmark, key of BENCHMARKS
+        params (Dict[str, Any]): parameters of benchmark
+
+    Returns:
+        Dict[str, Any]: result of run_case
+    """
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.bench",
+            "--case",
+            json.dumps([name, params]),
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT,
+    )
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def environment() -> Dict[str, Any]:
+    """Function describe where benchmarks run.
+
+    Returns:
+        Dict[str, Any]: commit, python, numpy, platform, cpu count and time
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": multiprocessing.cpu_count(),
+        "time": time(),
+    }
+
+
+def _key(result: Dict[str, Any]) -> str:
+    """Function identify case of result.
+
+    Args:
+        result (Dict[str, Any]): result of run_case
+
+    Returns:
+        str: name and parameters of the case
+    """
+    return json.dumps([result["name"], result["params"]], sort_keys=True)
+
+
+def compare(
+    old: List[Dict[str, Any]], new: List[Dict[str, Any]]
+) -> List[Tuple[str, float]]:
+    """Function find cases which became slower.
+
+    Args:
+        old (List[Dict[str, Any]]): results of earlier commit
+        new (List[Dict[str, Any]]): current results
+
+    Returns:
+        List[Tuple[str, float]]: case and relative change of fps for cases slower
+            by more than REGRESSION
+    """
+    old_fps = {_key(result): result["fps"] for result in old}
+    regressions = []
+    for result in new:
+        before = old_fps.get(_key(result))
+        if before:
+            change = result["fps"] / before - 1
+            if change < -REGRESSION:
+                regressions.append((_key(result), change))
+    return regressions
+
+
+def main(argv: Sequence[str] = None) -> int:
+    """Function run benchmarks from command line.
+
+    Args:
+        argv (Sequence[str], optional): arguments, None means sys.argv. Defaults to None.
+
+    Returns:
+        int: exit code, 1 if compare found regressions
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", default="benchmarks.json", help="JSON file")
+    parser.add_argument("--quick", action="store_true", help="small cases only")
+    parser.add_argument("--filter", default="", help="run cases containing text")
+    parser.add_argument("--compare", help="JSON file of earlier run")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        print(json.dumps(run_case(*json.loads(args.case))))
+        return 0
+
+    results = []
+    for name, params in cases(args.quick):
+        if args.filter not in json.dumps([name, params]):
+            continue
+        result = run_isolated(name, params)
+        results.append(result)
+        print(
+            f"{name:14} {json.dumps(params):80} {result['fps']:10.1f} fps"
+            f" p50 {result['p50_ms']:9.3f} ms p99 {result['p99_ms']:9.3f} ms"
+            f" rss {result['peak_rss_mb'] or 0:7.1f} MB",
+            flush=True,
+        )
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump({"environment": environment(), "results": results}, file, indent=1)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            old = json.load(file)["results"]
+        regressions = compare(old, results)
+        for key, change in regressions:
+            print(f"REGRESSION {change:+.0%} fps {key}")
+        return int(bool(regressions))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
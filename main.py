@@ -1,22 +1,35 @@
+import queue
+
 import numpy as np
 
-from median_filter import MedianFilter, PictureRecorder, Producer, Queue, set_n_steps
+from median_filter import (
+    FramePool,
+    MedianFilter,
+    PictureRecorder,
+    Producer,
+    configure_logging,
+    set_n_steps,
+)
 
 
 class Source:
-    def __init__(self, source_shape: tuple):
+    def __init__(self, source_shape: tuple, pool_size: int = 4):
         self._source_shape: tuple = source_shape
+        self.pool = FramePool(source_shape, "uint8", size=pool_size)
+        self._noise = np.random.randint(
+            256, size=(pool_size, *source_shape), dtype=np.uint8
+        )
+        self._step = 0
 
     def get_data(self) -> np.ndarray:
-        rows, cols, channels = self._source_shape
-        return np.random.randint(
-            256,
-            size=rows * cols * channels,
-            dtype=np.uint8,
-        ).reshape(self._source_shape)
+        frame = self.pool.acquire()
+        np.add(self._noise[self._step % len(self._noise)], self._step, out=frame)
+        self._step += 1
+        return frame
 
 
 def main():
+    configure_logging()
     timeout = 2
     input_shape = (768, 1024, 3)
     new_frame_shape = (512, 384)
@@ -27,21 +40,26 @@ def main():
     folder_name = "processed"
     file_name = "output"
 
-    queue0: Queue = Queue()
-    queue1: Queue = Queue()
+    queue0: queue.Queue = queue.Queue()
+    queue1: queue.Queue = queue.Queue()
 
     src = Source(input_shape)
+    output_pool = FramePool((*new_frame_shape, input_shape[2]), "uint8", size=4)
 
     producer = Producer(
         queue0,
-        lambda: (next(counter), src.get_data()),
+        lambda: (True, src.get_data()) if next(counter) else (False, None),
         interval,
+        end_of_stream=1,
     )
     broker = MedianFilter(
         queue_in=queue0,
         queue_out=queue1,
         new_frame_shape=new_frame_shape,
         filter_shape=filter_shape,
+        method="rank",
+        pool=output_pool,
+        input_pool=src.pool,
         timeout=timeout,
     )
     consumer = PictureRecorder(
@@ -49,6 +67,7 @@ def main():
         folder_name,
         file_name,
         file_ext="png",
+        pool=output_pool,
         timeout=timeout,
     )
 
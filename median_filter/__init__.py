@@ -6,26 +6,63 @@ Producer produces data for the queue;
 Consumer consumes data from the queue;
 Broker uses data from the first queue to add to the second queue.
 
+Queue passes data between stages (threads of one process) by reference,
+ProcessQueue pickles data for stages in other processes,
+FrameQueue pickles them without copying arrays into pickle.
+
 Moreover, package implements a special case of Broker (MedianFilter)
 nad a special case of Consumer (Recorder).
 """
-from multiprocessing import Queue
+from multiprocessing import Queue as ProcessQueue
+from queue import Queue
 
+from .aio import AsyncBroker, AsyncConsumer, AsyncProducer
 from .broker import Broker
-from .common import set_n_steps
+from .chunked import ChunkedReader, ChunkedRecorder
+from .common import END_OF_STREAM, RETIRE, Sequenced, set_n_steps
 from .consumer import Consumer
+from .frame_file import FrameFileReader, FrameFileRecorder
+from .frame_pool import FramePool
+from .frame_queue import FrameQueue
+from .logs import configure_logging
 from .median_filter import MedianFilter
+from .metrics import MetricsReporter
+from .pipeline import Pipeline
+from .process_pool import ProcessPoolMedianFilter
 from .producer import Producer
 from .recorder import PictureRecorder
+from .reorder import ReorderBuffer
+from .supervisor import BrokerSupervisor
+from .temporal import TemporalMedianFilter
 from .worker import Worker
 
 __all__ = [
+    "END_OF_STREAM",
+    "AsyncBroker",
+    "AsyncConsumer",
+    "AsyncProducer",
     "Broker",
+    "BrokerSupervisor",
+    "ChunkedReader",
+    "ChunkedRecorder",
     "Consumer",
+    "FrameFileReader",
+    "FrameFileRecorder",
+    "FramePool",
+    "FrameQueue",
+    "ProcessQueue",
     "Queue",
+    "RETIRE",
     "MedianFilter",
+    "MetricsReporter",
+    "Pipeline",
     "PictureRecorder",
+    "ProcessPoolMedianFilter",
     "Producer",
+    "ReorderBuffer",
+    "Sequenced",
+    "TemporalMedianFilter",
     "Worker",
+    "configure_logging",
     "set_n_steps",
 ]
@@ -0,0 +1,470 @@
+"""
+Asyncio counterparts of Producer, Broker and Consumer. Stages are tasks of
+the running event loop waiting on asyncio.Queue, so many pipelines share one thread,
+and functions of stages are called in executor not to block the loop.
+"""
+import asyncio
+from concurrent.futures import Executor
+from time import monotonic, perf_counter
+from typing import Any, Callable, Optional, Tuple
+
+from .common import END_OF_STREAM, Sequenced
+from .stage import ScheduleMixin, StageMixin
+
+
+class AsyncWorker(StageMixin):
+    """
+    Abstract class for async producer, broker and consumer.
+    Markers, overflow policies, metrics, snapshot and logging are the same
+    as of Worker (see StageMixin), only waiting on queues is awaited.
+    Functions of stages are called by loop.run_in_executor(executor, ...),
+    None means the default executor of the loop (thread pool).
+
+    Usage example:
+        async def main():
+            queue0: asyncio.Queue = asyncio.Queue(16)
+            queue1: asyncio.Queue = asyncio.Queue(16)
+
+            workers = [
+                AsyncProducer(queue0, producer_foo, interval, end_of_stream=1),
+                AsyncBroker(queue0, queue1, broker_foo, executor=process_pool),
+                AsyncConsumer(queue1, consumer_foo),
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                await worker.join()
+
+        asyncio.run(main())
+    """
+
+    COUNTER = 0
+    QUEUE_EMPTY = (asyncio.QueueEmpty,)
+    QUEUE_FULL = (asyncio.QueueFull,)
+
+    def __init__(
+        self,
+        *,
+        name: str = None,
+        verbose: bool = True,
+        overflow: str = "block",
+        executor: Executor = None,
+    ) -> None:
+        """Initialize self.
+
+        Args:
+            name (str, optional): name of the worker and of its task.
+                Defaults to "AsyncWorker-N".
+            verbose (bool, optional): If True worker loged. Defaults to True.
+            overflow (str, optional): policy used by put when the output queue is full,
+                one of common.OVERFLOW_POLICIES. Defaults to "block".
+            executor (Executor, optional): executor calling functions of the stage,
+                None means the default executor of the loop. Defaults to None.
+
+        Raises:
+            ValueError: unknown overflow policy.
+        """
+        if name is None:
+            name = f"AsyncWorker-{AsyncWorker.COUNTER}"
+        AsyncWorker.COUNTER += 1
+
+        super().__init__(verbose=verbose, overflow=overflow)
+        self.name = name
+        self.executor = executor
+        self._task: Optional[asyncio.Task] = None
+        self.log("created")
+
+    def _watched_queue(self) -> Optional[asyncio.Queue]:
+        """Return queue which depth is reported in snapshot.
+
+        Returns:
+            Optional[asyncio.Queue]: input queue of the stage, None for AsyncWorker
+        """
+        return None
+
+    def start(self) -> asyncio.Task:
+        """method schedule run of the worker as task of the running loop.
+
+        Raises:
+            RuntimeError: worker was already started.
+
+        Returns:
+            asyncio.Task: task of the worker
+        """
+        if self._task is not None:
+            raise RuntimeError(f"{self.name} can be started only once.")
+        self._task = asyncio.get_running_loop().create_task(self.run(), name=self.name)
+        return self._task
+
+    async def join(self, timeout: float = None) -> None:
+        """method wait until the worker ends.
+
+        Args:
+            timeout (float, optional): Timeout for waiting, None means
+                waiting as long as needed. Defaults to None.
+
+        Raises:
+            RuntimeError: worker was not started.
+            asyncio.TimeoutError: the worker did not end during timeout.
+        """
+        if self._task is None:
+            raise RuntimeError(f"{self.name} was not started.")
+        await asyncio.wait_for(asyncio.shield(self._task), timeout)
+
+    def is_alive(self) -> bool:
+        """method check if the worker was started and did not end yet.
+
+        Returns:
+            bool: True if the worker runs
+        """
+        return self._task is not None and not self._task.done()
+
+    async def call(self, fun: Callable[..., Any], *args: Any) -> Any:
+        """method call function in executor of the worker.
+
+        Args:
+            fun (Callable[..., Any]): function of the stage
+            args (Any): arguments of fun
+
+        Returns:
+            Any: result of fun
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fun, *args)
+
+    async def get(self, queue: asyncio.Queue, timeout: Optional[float]) -> Any:
+        """Get data from queue counting END_OF_STREAM markers, see Worker.get.
+
+        Args:
+            queue (asyncio.Queue): input queue of the stage
+            timeout (Optional[float]): Timeout for queue get, None means no timeout.
+
+        Raises:
+            asyncio.TimeoutError: no data came during timeout.
+
+        Returns:
+            Any: data or END_OF_STREAM if markers came from all upstreams or RETIRE came
+        """
+        while 1:
+            started = perf_counter()
+            try:
+                data = await asyncio.wait_for(queue.get(), timeout)
+            finally:
+                self.metrics.get_wait.record(perf_counter() - started)
+            received, data = self._received(data)
+            if received:
+                return data
+
+    async def put(self, queue: asyncio.Queue, data: Any) -> None:
+        """Put data into queue according to the overflow policy, see Worker.put.
+
+        Args:
+            queue (asyncio.Queue): output queue of the stage
+            data (Any): data to put
+        """
+        started = perf_counter()
+        try:
+            if self.overflow == "block":
+                await queue.put(data)
+            else:
+                self._put_nowait(queue, data)
+        finally:
+            self.metrics.put_wait.record(perf_counter() - started)
+
+    async def send_end_of_stream(self, queue: asyncio.Queue, count: int) -> None:
+        """Put count END_OF_STREAM markers into queue, one for each reader of queue.
+
+        Args:
+            queue (asyncio.Queue): output queue of the stage
+            count (int): number of markers
+        """
+        for marker in self._end_markers(count):
+            await queue.put(marker)
+        if count:
+            self.log("End of stream sent.")
+
+    async def run(self) -> None:
+        """Method representing the worker's activity."""
+        raise NotImplementedError
+
+
+class AsyncProducer(ScheduleMixin, AsyncWorker):
+    """
+    Takes data from fun and puts it into asyncio.Queue as task of the running loop,
+    see Producer for function contract, sequence, end_of_stream and schedule.
+    """
+
+    COUNTER = 0
+
+    def __init__(
+        self,
+        queue: asyncio.Queue,
+        fun: Callable[[], Tuple[bool, Any]],
+        interval: float = 0,
+        *,
+        name: str = None,
+        verbose: bool = True,
+        sequence: bool = False,
+        end_of_stream: int = 0,
+        overflow: str = "block",
+        schedule: str = "sleep",
+        executor: Executor = None,
+    ) -> None:
+        """Initialize self.
+
+        Args:
+            queue (asyncio.Queue): queue for produced data.
+            fun (Callable[[], Tuple[bool, Any]]): function to produce data.
+                Data are producing while fun return (True, ...).
+            interval (float, optional): interval to next function calling. Defaults to 0.
+            name (str, optional): name of the worker. Defaults to "AsyncProducer-N".
+            verbose (bool, optional): If True worker loged. Defaults to True.
+            sequence (bool, optional): If True data are wrapped in Sequenced with
+                consecutive index, so ReorderBuffer can restore their order. Defaults to False.
+            end_of_stream (int, optional): number of END_OF_STREAM markers put into queue
+                when fun returns (False, ...), one for each reader of queue. Defaults to 0.
+            overflow (str, optional): what to do when queue is full: "block",
+                "drop_oldest", "drop_newest" or "latest". Dropped data are counted
+                in self.dropped. Defaults to "block".
+            schedule (str, optional): how interval is kept: "sleep", "catch_up" or "skip",
+                see common.SCHEDULES. Defaults to "sleep".
+            executor (Executor, optional): executor calling fun, None means
+                the default executor of the loop. Defaults to None.
+
+        Raises:
+            ValueError: unknown schedule.
+        """
+        if name is None:
+            name = f"AsyncProducer-{AsyncProducer.COUNTER}"
+        AsyncProducer.COUNTER += 1
+
+        AsyncWorker.__init__(
+            self, name=name, verbose=verbose, overflow=overflow, executor=executor
+        )
+        ScheduleMixin.__init__(self, interval, schedule=schedule, sequence=sequence)
+        self.queue = queue
+        self.fun = fun
+        self.end_of_stream = end_of_stream
+
+    def _watched_queue(self) -> asyncio.Queue:
+        """Return output queue, AsyncProducer has no input queue.
+
+        Returns:
+            asyncio.Queue: output queue
+        """
+        return self.queue
+
+    async def _wait(self, tick: float) -> None:
+        """method sleep until tick and measure the delay after it.
+
+        Args:
+            tick (float): time of monotonic clock
+        """
+        delay = tick - monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._record_tick(tick, monotonic())
+
+    async def run(self) -> None:
+        """Method representing the worker's activity."""
+        tick = monotonic()
+        while 1:
+            await self._wait(tick)
+            started = perf_counter()
+            try:
+                processing, data = await self.call(self.fun)
+            except Exception as error:  # pylint: disable = broad-exception-caught
+                self.metrics.errors += 1
+                self.warning(str(error))
+                continue
+            if not processing:
+                break
+            self.record_item(started)
+            data = self._sequenced(data, monotonic())
+            await self.put(self.queue, data)
+            self.log_item("Produced data.")
+            tick = self._next_tick(tick, monotonic())
+        self.report_dropped()
+        self.report_jitter()
+        await self.send_end_of_stream(self.queue, self.end_of_stream)
+
+
+class AsyncBroker(AsyncWorker):
+    """
+    Takes data from one asyncio.Queue, converts it by fun in executor,
+    and puts it into another as task of the running loop, see Broker.
+    Sequenced data keep their index and timestamp.
+    """
+
+    COUNTER = 0
+
+    def __init__(
+        self,
+        queue_in: asyncio.Queue,
+        queue_out: asyncio.Queue,
+        fun: Callable[[Any], Any],
+        *,
+        name: str = None,
+        verbose: bool = True,
+        timeout: float = 10.0,
+        upstreams: int = 1,
+        end_of_stream: int = 1,
+        overflow: str = "block",
+        executor: Executor = None,
+    ) -> None:
+        """Initialize self.
+
+        Args:
+            queue_in (asyncio.Queue): queue with data to convert.
+            queue_out (asyncio.Queue): queue for converted data.
+            fun (Callable[[Any], Any]): function for data processing
+            name (str, optional): name of the worker. Defaults to "AsyncBroker-N".
+            verbose (bool, optional): If True worker loged. Defaults to True.
+            timeout (float, optional): Timeout for queue get, None means waiting
+                for END_OF_STREAM markers only. Defaults to 10.0.
+            upstreams (int, optional): number of END_OF_STREAM markers which end
+                the work, one for each writer of queue_in. Defaults to 1.
+            end_of_stream (int, optional): number of END_OF_STREAM markers put into queue_out
+                after the work ended by markers, one for each reader of queue_out.
+                Defaults to 1.
+            overflow (str, optional): what to do when queue_out is full: "block",
+                "drop_oldest", "drop_newest" or "latest". Dropped data are counted
+                in self.dropped. Defaults to "block".
+            executor (Executor, optional): executor calling fun, None means
+                the default executor of the loop. Defaults to None.
+        """
+        if name is None:
+            name = f"AsyncBroker-{AsyncBroker.COUNTER}"
+        AsyncBroker.COUNTER += 1
+
+        super().__init__(
+            name=name, verbose=verbose, overflow=overflow, executor=executor
+        )
+        self.queue_in = queue_in
+        self.queue_out = queue_out
+        self.fun = fun
+        self.timeout = timeout
+        self.upstreams = upstreams
+        self.end_of_stream = end_of_stream
+
+    def _watched_queue(self) -> asyncio.Queue:
+        """Return input queue which depth is reported in snapshot.
+
+        Returns:
+            asyncio.Queue: queue_in
+        """
+        return self.queue_in
+
+    async def _convert(self, data: Any) -> Any:
+        """method convert single data in executor keeping its Sequenced wrapper.
+
+        Args:
+            data (Any): data from queue_in
+
+        Returns:
+            Any: converted data
+        """
+        if isinstance(data, Sequenced):
+            return data._replace(data=await self.call(self.fun, data.data))
+        return await self.call(self.fun, data)
+
+    async def run(self) -> None:
+        """Method representing the worker's activity."""
+        while 1:
+            try:
+                data = await self.get(self.queue_in, self.timeout)
+            except asyncio.TimeoutError:
+                break
+            if data is END_OF_STREAM:
+                break
+            started = perf_counter()
+            try:
+                result = await self._convert(data)
+            except Exception as error:  # pylint: disable = broad-exception-caught
+                self.metrics.errors += 1
+                self.warning(str(error))
+                continue
+            self.record_item(started, data)
+            await self.put(self.queue_out, result)
+            self.log_item("Processing completed.")
+        self.report_dropped()
+        if self.ended:
+            await self.send_end_of_stream(self.queue_out, self.end_of_stream)
+
+
+class AsyncConsumer(AsyncWorker):
+    """
+    Takes data from asyncio.Queue and uses them by fun in executor
+    as task of the running loop, see Consumer.
+    """
+
+    COUNTER = 0
+
+    def __init__(
+        self,
+        queue: asyncio.Queue,
+        fun: Callable[[Any], Any],
+        *,
+        name: str = None,
+        verbose: bool = True,
+        timeout: float = 10.0,
+        upstreams: int = 1,
+        sequenced: bool = False,
+        executor: Executor = None,
+    ) -> None:
+        """Initialize self.
+
+        Args:
+            queue (asyncio.Queue): queue with data to consume.
+            fun (Callable[[Any], Any]): function to consume data from queue.
+            name (str, optional): name of the worker. Defaults to "AsyncConsumer-N".
+            verbose (bool, optional): If True worker loged. Defaults to True.
+            timeout (float, optional): Timeout for queue get, None means waiting
+                for END_OF_STREAM markers only. Defaults to 10.0.
+            upstreams (int, optional): number of END_OF_STREAM markers which end
+                the work, one for each writer of queue. Defaults to 1.
+            sequenced (bool, optional): If True fun gets Sequenced data with their index
+                and timestamp, otherwise data only. Defaults to False.
+            executor (Executor, optional): executor calling fun, None means
+                the default executor of the loop. Defaults to None.
+        """
+        if name is None:
+            name = f"AsyncConsumer-{AsyncConsumer.COUNTER}"
+        AsyncConsumer.COUNTER += 1
+
+        super().__init__(name=name, verbose=verbose, executor=executor)
+        self.queue = queue
+        self.fun = fun
+        self.timeout = timeout
+        self.upstreams = upstreams
+        self.sequenced = sequenced
+
+    def _watched_queue(self) -> asyncio.Queue:
+        """Return input queue which depth is reported in snapshot.
+
+        Returns:
+            asyncio.Queue: queue
+        """
+        return self.queue
+
+    async def run(self) -> None:
+        """Method representing the worker's activity."""
+        while 1:
+            try:
+                data = await self.get(self.queue, self.timeout)
+            except asyncio.TimeoutError:
+                return
+            if data is END_OF_STREAM:
+                return
+            started = perf_counter()
+            item = data
+            if isinstance(data, Sequenced) and not self.sequenced:
+                data = data.data
+            try:
+                await self.call(self.fun, data)
+            except Exception as error:  # pylint: disable = broad-exception-caught
+                self.metrics.errors += 1
+                self.warning(str(error))
+            else:
+                self.record_item(started, item)
+            self.log_item("Consumed.")
@@ -4,8 +4,10 @@ converts it, and puts it into another as distinct thread.
 """
 from multiprocessing import Queue
 from queue import Empty
-from typing import Any, Callable
+from time import monotonic, perf_counter
+from typing import Any, Callable, List, Sequence, Tuple
 
+from .common import END_OF_STREAM, Sequenced
 from .worker import Worker
 
 
@@ -14,11 +16,18 @@ class Broker(Worker):
     Takes data from one queue, converts it,
         and puts it into another as distinct thread.
 
+    Broker ends after upstreams END_OF_STREAM markers (or timeout without data)
+    and passes end_of_stream markers on.
+
+    With batch_size = N broker takes up to N data, waiting at most batch_timeout
+    for the rest of the batch, and converts them by one call of batch_fun.
+    Results are put one by one or, with put_batch = True, as one list.
+
     Usage example:
         queue0: Queue = Queue()
         queue1: Queue = Queue()
 
-        producer = Producer(queue0, producer_foo, interval)
+        producer = Producer(queue0, producer_foo, interval, end_of_stream=1)
         broker = Broker(queue0, queue1, broker_foo)
         consumer = Consumer(queue1, consumer_foo)
 
@@ -43,6 +52,13 @@ class Broker(Worker):
         daemon: bool = None,
         verbose: bool = True,
         timeout: float = 10.0,
+        upstreams: int = 1,
+        end_of_stream: int = 1,
+        overflow: str = "block",
+        batch_size: int = 1,
+        batch_timeout: float = 0.0,
+        batch_fun: Callable[[List[Any]], Sequence[Any]] = None,
+        put_batch: bool = False,
     ) -> None:
         """Initialize self.
 
@@ -54,7 +70,24 @@ class Broker(Worker):
                 the form "Thread-N" where N is a small decimal number.
             daemon (bool, optional): description below. Defaults to None.
             verbose (bool, optional): If True thread loged. Defaults to True.
-            timeout (float, optional): Timeout for queue get. Defaults to 5.0.
+            timeout (float, optional): Timeout for queue get, None means waiting
+                for END_OF_STREAM markers only. Defaults to 10.0.
+            upstreams (int, optional): number of END_OF_STREAM markers which end
+                the work, one for each writer of queue_in. Defaults to 1.
+            end_of_stream (int, optional): number of END_OF_STREAM markers put into queue_out
+                after the work ended by markers, one for each reader of queue_out.
+                Defaults to 1.
+            overflow (str, optional): what to do when queue_out is full: "block",
+                "drop_oldest", "drop_newest" or "latest". Dropped data are counted
+                in self.dropped. Defaults to "block".
+            batch_size (int, optional): maximum number of data converted together. Defaults to 1.
+            batch_timeout (float, optional): maximum time in seconds to wait for
+                the rest of the batch after its first data. Defaults to 0.0.
+            batch_fun (Callable[[List[Any]], Sequence[Any]], optional): function converting
+                list of data into results in the same order. None means calling fun
+                for each data. Defaults to None.
+            put_batch (bool, optional): If True results of the batch are put into
+                queue_out as one list. Defaults to False.
         """
 
         if name is None:
@@ -65,26 +98,121 @@ class Broker(Worker):
             name=name,
             daemon=daemon,
             verbose=verbose,
+            overflow=overflow,
         )
         self.queue_in = queue_in
         self.queue_out = queue_out
         self.fun = fun
         self.timeout = timeout
+        self.upstreams = upstreams
+        self.end_of_stream = end_of_stream
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.batch_fun = batch_fun
+        self.put_batch = put_batch
+
+    def _watched_queue(self) -> Queue:
+        """Return input queue which depth is reported in snapshot.
+
+        Returns:
+            multiprocessing.Queue: queue_in
+        """
+        return self.queue_in
+
+    def _get_batch(self) -> Tuple[List[Any], bool]:
+        """method take up to batch_size data from queue_in.
+
+        Returns:
+            Tuple[List[Any], bool]: batch and False if the work ended
+        """
+        batch: List[Any] = []
+        timeout = self.timeout
+        deadline = None
+        while len(batch) < self.batch_size:
+            try:
+                data = self.get(self.queue_in, timeout)
+            except Empty:
+                return batch, bool(batch)
+            if data is END_OF_STREAM:
+                return batch, False
+            batch.append(data)
+            if deadline is None:
+                deadline = monotonic() + self.batch_timeout
+            timeout = max(deadline - monotonic(), 0)
+        return batch, True
+
+    def _convert(self, data: Any) -> Any:
+        """method convert single data keeping its Sequenced wrapper.
+
+        Args:
+            data (Any): data from queue_in
+
+        Returns:
+            Any: converted data
+        """
+        if isinstance(data, Sequenced):
+            return data._replace(data=self.fun(data.data))
+        return self.fun(data)
+
+    def _convert_batch(self, batch: List[Any]) -> List[Any]:
+        """method convert batch by one call of batch_fun keeping Sequenced wrappers.
+
+        Args:
+            batch (List[Any]): data from queue_in
+
+        Returns:
+            List[Any]: converted data in the same order
+        """
+        values = [data.data if isinstance(data, Sequenced) else data for data in batch]
+        results = self.batch_fun(values)
+        return [
+            data._replace(data=result) if isinstance(data, Sequenced) else result
+            for data, result in zip(batch, results)
+        ]
 
     def run(
         self,
     ):
         """Method representing the thread's activity."""
-        while 1:
-            try:
-                data = self.queue_in.get(timeout=self.timeout)
-            except Empty:
-                return
-            self.log("Processing has started.")
+        running = True
+        while running:
+            batch, running = self._get_batch()
+            if not batch:
+                continue
+            self.log_item("Processing has started.")
+            if self.batch_fun is None:
+                results = []
+                for data in batch:
+                    started = perf_counter()
+                    try:
+                        results.append(self._convert(data))
+                    except Exception as error:  # pylint: disable = broad-exception-caught
+                        self.metrics.errors += 1
+                        self.warning(str(error))
+                        continue
+                    self.record_item(started, data)
+            else:
+                started = perf_counter()
+                try:
+                    results = self._convert_batch(batch)
+                except Exception as error:  # pylint: disable = broad-exception-caught
+                    self.metrics.errors += len(batch)
+                    self.warning(str(error))
+                    continue
+                for data in batch:
+                    self.record_item(started, data)
+            if not results:
+                continue
             try:
-                out_val = self.fun(data)
-                self.queue_out.put(out_val)
+                if self.put_batch:
+                    self.put(self.queue_out, results)
+                else:
+                    for out_val in results:
+                        self.put(self.queue_out, out_val)
             except Exception as error:  # pylint: disable = broad-exception-caught
                 self.warning(str(error))
                 continue
-            self.log("Processing completed.")
+            self.log_item("Processing completed.")
+        self.report_dropped()
+        if self.ended:
+            self.send_end_of_stream(self.queue_out, self.end_of_stream)
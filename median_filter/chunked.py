@@ -0,0 +1,331 @@
+"""
+Chunked recorder streams frames into one file of zlib compressed chunks.
+Chunks are compressed on background threads and written in order.
+
+File layout:
+    MAGIC, header length (uint32), JSON header (dtype, frame_shape, chunk_size, level),
+    chunks: number of frames (uint32), data length (uint64), data,
+    index: offsets of chunks (uint64 each), index offset (uint64), INDEX_MAGIC.
+The index is written at the end, file without it is read chunk by chunk.
+"""
+import json
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing import Queue
+from typing import BinaryIO, Deque, List, Optional, Tuple
+
+import numpy as np
+
+from .consumer import Consumer
+from .frame_file import _convert_frame
+from .frame_pool import FramePool
+
+MAGIC = b"MFCHUNK1"
+INDEX_MAGIC = b"MFINDEX1"
+_CHUNK = struct.Struct("<IQ")
+_OFFSET = struct.Struct("<Q")
+
+
+def _compress(chunk: np.ndarray, level: int) -> bytes:
+    """Function compress chunk of frames, run on writer threads.
+
+    Args:
+        chunk (np.ndarray): frames of the chunk
+        level (int): zlib compression level, 0 means raw data
+
+    Returns:
+        bytes: data of the chunk
+    """
+    if level == 0:
+        return chunk.tobytes()
+    return zlib.compress(chunk, level)
+
+
+class ChunkedRecorder(Consumer):
+    """
+    Takes frames from queue and streams them into one file of compressed chunks
+    as distinct thread. Chunks of chunk_size frames are compressed by zlib
+    on compressors threads, at most max_in_flight chunks wait for writing.
+    All chunks and the index are written before the thread ends.
+    example use:
+
+        queue1: Queue = Queue()
+
+        consumer = ChunkedRecorder(queue1, "frames.mfc", (512, 384, 3), chunk_size=32)
+
+        consumer.start()
+        consumer.join()
+
+        reader = ChunkedReader("frames.mfc")
+        frame = reader[10]
+    """
+
+    COUNTER = 0
+
+    def __init__(
+        self,
+        queue: Queue,
+        file_name: str,
+        frame_shape: Tuple[int, ...],
+        dtype: str = "uint8",
+        *,
+        chunk_size: int = 32,
+        level: int = 6,
+        compressors: int = 2,
+        max_in_flight: int = None,
+        pool: FramePool = None,
+        name: str = None,
+        daemon: bool = None,
+        verbose: bool = True,
+        timeout: float = 10.0,
+        upstreams: int = 1,
+    ) -> None:
+        """Initialize self.
+
+        Args:
+            queue (multiprocessing.Queue): queue with frames.
+            file_name (str): path of the file
+            frame_shape (Tuple[int, ...]): shape of single frame
+            dtype (str, optional): dtype of frames. Defaults to "uint8".
+            chunk_size (int, optional): number of frames in chunk. Defaults to 32.
+            level (int, optional): zlib compression level from 0 (no compression)
+                to 9. Defaults to 6.
+            compressors (int, optional): number of compressing threads. Defaults to 2.
+            max_in_flight (int, optional): maximum number of chunks compressed and
+                not written yet. Defaults to 2 * compressors.
+            pool (FramePool, optional): pool to which frames are released after copying
+                into chunk. Defaults to None.
+            name (str, optional): the thread name. By default, a unique name is constructed of
+                the form "Thread-N" where N is a small decimal number.
+            daemon (bool, optional): description below. Defaults to None.
+            verbose (bool, optional): If True thread loged. Defaults to True.
+            timeout (float, optional): Timeout for queue get. Defaults to 10.0.
+            upstreams (int, optional): number of END_OF_STREAM markers which end
+                the work, one for each writer of queue. Defaults to 1.
+        """
+        if name is None:
+            name = f"ChunkedRecorder-{ChunkedRecorder.COUNTER}"
+        ChunkedRecorder.COUNTER += 1
+
+        super().__init__(
+            queue,
+            self._append,
+            name=name,
+            daemon=daemon,
+            verbose=verbose,
+            timeout=timeout,
+            upstreams=upstreams,
+        )
+        self.path = file_name
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.chunk_size = chunk_size
+        self.level = level
+        self.compressors = compressors
+        self.max_in_flight = max_in_flight or 2 * compressors
+        self.pool = pool
+        self.length = 0
+        self._chunk: Optional[np.ndarray] = None
+        self._filled = 0
+        self._offsets: List[int] = []
+        self._in_flight: Deque[Tuple[int, Future]] = deque()
+        self._file: Optional[BinaryIO] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _write_header(self) -> None:
+        """method write magic and JSON header."""
+        header = json.dumps(
+            {
+                "dtype": self.dtype.str,
+                "frame_shape": self.frame_shape,
+                "chunk_size": self.chunk_size,
+                "level": self.level,
+            }
+        ).encode()
+        self._file.write(MAGIC)
+        self._file.write(struct.pack("<I", len(header)))
+        self._file.write(header)
+
+    def _append(self, frame: np.ndarray) -> None:
+        """method copy frame into current chunk.
+
+        Args:
+            frame (np.ndarray): frame to record
+
+        Raises:
+            ValueError: frame has different shape than frame_shape
+                or dtype which can not be converted, see frame_file._convert_frame.
+        """
+        try:
+            if frame.shape != self.frame_shape:
+                raise ValueError(
+                    f"Frame shape {frame.shape} differs from {self.frame_shape}."
+                )
+            converted = _convert_frame(frame, self.dtype)
+            if self._chunk is None:
+                self._chunk = np.empty((self.chunk_size, *self.frame_shape), self.dtype)
+            self._chunk[self._filled] = converted
+            self._filled += 1
+            self.length += 1
+        finally:
+            if self.pool is not None:
+                self.pool.release(frame)
+        if self._filled == self.chunk_size:
+            self._submit()
+
+    def _submit(self) -> None:
+        """method give current chunk to compressors, waiting while
+        max_in_flight chunks are not written yet."""
+        while len(self._in_flight) >= self.max_in_flight:
+            self._write_oldest()
+        chunk = self._chunk[: self._filled]
+        future = self._executor.submit(_compress, chunk, self.level)
+        self._in_flight.append((self._filled, future))
+        self._chunk = None
+        self._filled = 0
+
+    def _write_oldest(self) -> None:
+        """method write the oldest compressed chunk."""
+        n_frames, future = self._in_flight.popleft()
+        data = future.result()
+        self._offsets.append(self._file.tell())
+        self._file.write(_CHUNK.pack(n_frames, len(data)))
+        self._file.write(data)
+
+    def _write_index(self) -> None:
+        """method write offsets of chunks at the end of file."""
+        index_offset = self._file.tell()
+        for offset in self._offsets:
+            self._file.write(_OFFSET.pack(offset))
+        self._file.write(_OFFSET.pack(index_offset))
+        self._file.write(INDEX_MAGIC)
+
+    def run(self):
+        """Method representing the thread's activity."""
+        self._file = open(self.path, "wb")  # pylint: disable = consider-using-with
+        self._executor = ThreadPoolExecutor(self.compressors)
+        with self._file, self._executor:
+            self._write_header()
+            try:
+                super().run()
+            finally:
+                if self._filled:
+                    self._submit()
+                while self._in_flight:
+                    self._write_oldest()
+                self._write_index()
+        self.log("%d frames recorded in %s.", self.length, self.path)
+
+
+class ChunkedReader:
+    """
+    Random access to frames recorded by ChunkedRecorder.
+    The last read chunk is kept decompressed.
+
+    Usage example:
+        reader = ChunkedReader("frames.mfc")
+        for i in range(len(reader)):
+            frame = reader[i]
+    """
+
+    def __init__(self, file_name: str) -> None:
+        """Initialize self.
+
+        Args:
+            file_name (str): path of the file
+
+        Raises:
+            ValueError: file was not written by ChunkedRecorder.
+        """
+        self.path = file_name
+        with open(file_name, "rb") as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{file_name} is not chunked frame file.")
+            (header_size,) = struct.unpack("<I", file.read(4))
+            header = json.loads(file.read(header_size))
+            self.dtype = np.dtype(header["dtype"])
+            self.frame_shape = tuple(header["frame_shape"])
+            self.chunk_size = header["chunk_size"]
+            self.level = header["level"]
+            self._offsets = self._read_offsets(file)
+            self._counts = []
+            for offset in self._offsets:
+                file.seek(offset)
+                self._counts.append(_CHUNK.unpack(file.read(_CHUNK.size))[0])
+        self._starts = np.cumsum([0] + self._counts)
+        self._cached: Tuple[int, Optional[np.ndarray]] = (-1, None)
+
+    def _read_offsets(self, file: BinaryIO) -> List[int]:
+        """method read offsets of chunks from index or by walking through chunks.
+
+        Args:
+            file (BinaryIO): file opened after header
+
+        Returns:
+            List[int]: offsets of chunks
+        """
+        data_start = file.tell()
+        end = file.seek(0, 2)
+        tail = len(INDEX_MAGIC) + _OFFSET.size
+        if end - data_start >= tail:
+            file.seek(end - tail)
+            (index_offset,) = _OFFSET.unpack(file.read(_OFFSET.size))
+            if file.read(len(INDEX_MAGIC)) == INDEX_MAGIC:
+                file.seek(index_offset)
+                count = (end - tail - index_offset) // _OFFSET.size
+                data = file.read(count * _OFFSET.size)
+                return [offset for (offset,) in _OFFSET.iter_unpack(data)]
+        offsets = []
+        offset = data_start
+        while offset + _CHUNK.size <= end:
+            file.seek(offset)
+            _, size = _CHUNK.unpack(file.read(_CHUNK.size))
+            if offset + _CHUNK.size + size > end:
+                break
+            offsets.append(offset)
+            offset += _CHUNK.size + size
+        return offsets
+
+    def __len__(self) -> int:
+        return int(self._starts[-1])
+
+    def _load_chunk(self, chunk: int) -> np.ndarray:
+        """method read and decompress chunk.
+
+        Args:
+            chunk (int): number of chunk
+
+        Returns:
+            np.ndarray: frames of the chunk
+        """
+        if self._cached[0] != chunk:
+            with open(self.path, "rb") as file:
+                file.seek(self._offsets[chunk])
+                _, size = _CHUNK.unpack(file.read(_CHUNK.size))
+                data = file.read(size)
+            if self.level:
+                data = zlib.decompress(data)
+            frames = np.frombuffer(data, self.dtype).reshape(-1, *self.frame_shape)
+            self._cached = (chunk, frames)
+        return self._cached[1]
+
+    def __getitem__(self, number: int) -> np.ndarray:
+        """method return frame by its number in file.
+
+        Args:
+            number (int): number of frame
+
+        Raises:
+            IndexError: number out of range.
+
+        Returns:
+            np.ndarray: read-only frame
+        """
+        if number < 0:
+            number += len(self)
+        if not 0 <= number < len(self):
+            raise IndexError(f"Frame {number} out of range.")
+        chunk = int(np.searchsorted(self._starts, number, side="right")) - 1
+        return self._load_chunk(chunk)[number - self._starts[chunk]]
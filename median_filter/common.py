@@ -1,6 +1,62 @@
 """
 Common objects for other project files.
 """
+from typing import Any, NamedTuple
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest", "latest")
+"""What to do with data when output queue is full:
+block - wait for free place,
+drop_oldest - remove the oldest data from queue,
+drop_newest - drop new data,
+latest - remove all data from queue, so the queue keeps only the newest data.
+"""
+
+SCHEDULES = ("sleep", "catch_up", "skip")
+"""How Producer keeps interval between data:
+sleep - sleep interval after each data, so the period is interval + time of producing,
+catch_up - start data at ticks start + n * interval of monotonic clock,
+    ticks late after slow producing start immediately one after another,
+skip - start data at ticks of monotonic clock, ticks missed during slow producing
+    are skipped and counted in Producer.missed_ticks.
+"""
+
+
+class _Marker:
+    """Type of markers put into queues between data.
+    Marker stays the same object after pickling."""
+
+    def __init__(self, name: str) -> None:
+        """Initialize self.
+
+        Args:
+            name (str): name of the marker in this module
+        """
+        self.name = name
+
+    def __reduce__(self) -> str:
+        return self.name
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+END_OF_STREAM = _Marker("END_OF_STREAM")
+"""Marker put into queue after the last data of the stage."""
+
+RETIRE = _Marker("RETIRE")
+"""Marker which ends one worker reading the queue, the worker does not put
+END_OF_STREAM markers for the next stage (see BrokerSupervisor)."""
+
+
+class Sequenced(NamedTuple):
+    """Data with sequence number given by the Producer.
+    Brokers convert only data and keep index and timestamp,
+    consumers get only data.
+    """
+
+    index: int
+    timestamp: float
+    data: Any
 
 
 def set_n_steps(n_steps: int):
@@ -4,8 +4,10 @@ According to the Producer-Consumer Paradigm.
 """
 from multiprocessing import Queue
 from queue import Empty
+from time import perf_counter
 from typing import Any, Callable
 
+from .common import END_OF_STREAM, Sequenced
 from .worker import Worker
 
 
@@ -17,7 +19,7 @@ class Consumer(Worker):
         queue0: Queue = Queue()
         queue1: Queue = Queue()
 
-        producer = Producer(queue0, producer_foo, interval)
+        producer = Producer(queue0, producer_foo, interval, end_of_stream=1)
         broker = Broker(queue0, queue1, broker_foo)
         consumer = Consumer(queue1, consumer_foo)
 
@@ -41,6 +43,8 @@ class Consumer(Worker):
         daemon: bool = None,
         verbose: bool = True,
         timeout: float = 10.0,
+        upstreams: int = 1,
+        sequenced: bool = False,
     ) -> None:
         """Initialize self.
 
@@ -51,7 +55,12 @@ class Consumer(Worker):
                 the form "Thread-N" where N is a small decimal number.
             daemon (bool, optional): description below. Defaults to None.
             verbose (bool, optional): If True thread loged. Defaults to True.
-            timeout (float, optional): Timeout for queue get. Defaults to 5.0.
+            timeout (float, optional): Timeout for queue get, None means waiting
+                for END_OF_STREAM markers only. Defaults to 10.0.
+            upstreams (int, optional): number of END_OF_STREAM markers which end
+                the work, one for each writer of queue. Defaults to 1.
+            sequenced (bool, optional): If True fun gets Sequenced data with their index
+                and timestamp, otherwise data only. Defaults to False.
         """
         if name is None:
             name = f"Consumer-{Consumer.COUNTER}"
@@ -61,17 +70,36 @@ class Consumer(Worker):
         self.queue = queue
         self.fun = fun
         self.timeout = timeout
+        self.upstreams = upstreams
+        self.sequenced = sequenced
+
+    def _watched_queue(self) -> Queue:
+        """Return input queue which depth is reported in snapshot.
+
+        Returns:
+            multiprocessing.Queue: queue
+        """
+        return self.queue
 
     def run(self):
         """Method representing the thread's activity."""
         while 1:
             try:
-                data = self.queue.get(timeout=self.timeout)
+                data = self.get(self.queue, self.timeout)
             except Empty:
                 return
+            if data is END_OF_STREAM:
+                return
+            started = perf_counter()
+            item = data
+            if isinstance(data, Sequenced) and not self.sequenced:
+                data = data.data
             try:
                 self.fun(data)
             except Exception as error:  # pylint: disable = broad-exception-caught
+                self.metrics.errors += 1
                 self.warning(str(error))
+            else:
+                self.record_item(started, item)
 
-            self.log("Consumed.")
+            self.log_item("Consumed.")
@@ -0,0 +1,260 @@
+"""
+Frame file keeps whole stream of frames in one preallocated memory-mapped .npy file,
+so recording a frame is a copy into the page cache instead of encoding a picture.
+"""
+import os
+import struct
+from multiprocessing import Queue
+from time import monotonic
+from typing import Any, Tuple
+
+import numpy as np
+
+from .common import Sequenced
+from .consumer import Consumer
+from .frame_pool import FramePool
+
+_INDEX_DTYPE = np.dtype([("index", "i8"), ("timestamp", "f8")])
+
+
+def _index_path(path: str) -> str:
+    """Function return path of the index file kept next to frame file.
+
+    Args:
+        path (str): path of the frame file
+
+    Returns:
+        str: path of the index file
+    """
+    return f"{path[:-len('.npy')]}.index.npy"
+
+
+def _convert_frame(frame: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    """Function make frame of dtype of recorded frames.
+    Float frames with values in [0, 1] are scaled to uint8 like saved pictures
+    (see recorder._write_picture), other dtypes have to be the same.
+
+    Args:
+        frame (np.ndarray): frame to record
+        dtype (np.dtype): dtype of recorded frames
+
+    Raises:
+        ValueError: frame dtype can not be converted.
+
+    Returns:
+        np.ndarray: frame of dtype
+    """
+    if frame.dtype == dtype:
+        return frame
+    if frame.dtype.kind == "f" and dtype == np.uint8:
+        return (255 * frame).astype(np.uint8)
+    raise ValueError(f"Frame dtype {frame.dtype} differs from {dtype}.")
+
+
+def _rewrite_header(
+    path: str,
+    offset: int,
+    dtype: np.dtype,
+    frame_shape: Tuple[int, ...],
+    length: int,
+) -> None:
+    """Function change number of frames in .npy header keeping its size
+        and cut off unused frames.
+
+    Args:
+        path (str): path of the frame file
+        offset (int): size of the header, the frames start there
+        dtype (np.dtype): dtype of frames
+        frame_shape (Tuple[int, ...]): shape of single frame
+        length (int): number of recorded frames
+    """
+    header = repr(
+        {
+            "descr": np.lib.format.dtype_to_descr(dtype),
+            "fortran_order": False,
+            "shape": (length, *frame_shape),
+        }
+    )
+    prefix = np.lib.format.magic(1, 0)
+    header_size = offset - len(prefix) - 2
+    header = header.ljust(header_size - 1) + "\n"
+    with open(path, "r+b") as file:
+        file.write(prefix)
+        file.write(struct.pack("<H", header_size))
+        file.write(header.encode("latin1"))
+        file.truncate(offset + length * int(np.prod(frame_shape)) * dtype.itemsize)
+
+
+class FrameFileRecorder(Consumer):
+    """
+    Takes frames from queue and appends them to one preallocated memory-mapped
+    .npy file as distinct thread. Index and timestamp of each frame
+    (from Sequenced data or order of the queue and time of writing)
+    are saved in file_name.index.npy. Frames over capacity are dropped and
+    counted in self.dropped. After the end the file holds only recorded frames,
+    so it can be read by np.load or FrameFileReader.
+    example use:
+
+        queue1: Queue = Queue()
+
+        consumer = FrameFileRecorder(queue1, "frames.npy", (512, 384, 3), capacity=1000)
+
+        consumer.start()
+        consumer.join()
+
+        reader = FrameFileReader("frames.npy")
+        frame = reader[10]
+    """
+
+    COUNTER = 0
+
+    def __init__(
+        self,
+        queue: Queue,
+        file_name: str,
+        frame_shape: Tuple[int, ...],
+        dtype: str = "uint8",
+        capacity: int = 1024,
+        *,
+        pool: FramePool = None,
+        name: str = None,
+        daemon: bool = None,
+        verbose: bool = True,
+        timeout: float = 10.0,
+        upstreams: int = 1,
+    ) -> None:
+        """Initialize self.
+
+        Args:
+            queue (multiprocessing.Queue): queue with frames.
+            file_name (str): path of the file, ".npy" is added if missing.
+            frame_shape (Tuple[int, ...]): shape of single frame
+            dtype (str, optional): dtype of frames. Defaults to "uint8".
+            capacity (int, optional): maximum number of frames in file. Defaults to 1024.
+            pool (FramePool, optional): pool to which frames are released after writing.
+                Defaults to None.
+            name (str, optional): the thread name. By default, a unique name is constructed of
+                the form "Thread-N" where N is a small decimal number.
+            daemon (bool, optional): description below. Defaults to None.
+            verbose (bool, optional): If True thread loged. Defaults to True.
+            timeout (float, optional): Timeout for queue get. Defaults to 10.0.
+            upstreams (int, optional): number of END_OF_STREAM markers which end
+                the work, one for each writer of queue. Defaults to 1.
+        """
+        if not file_name.endswith(".npy"):
+            file_name = f"{file_name}.npy"
+        if name is None:
+            name = f"FrameFileRecorder-{FrameFileRecorder.COUNTER}"
+        FrameFileRecorder.COUNTER += 1
+
+        super().__init__(
+            queue,
+            self._write,
+            name=name,
+            daemon=daemon,
+            verbose=verbose,
+            timeout=timeout,
+            upstreams=upstreams,
+            sequenced=True,
+        )
+        self.path = file_name
+        self.pool = pool
+        self.capacity = capacity
+        self.length = 0
+        self._frames = np.lib.format.open_memmap(
+            file_name, mode="w+", dtype=dtype, shape=(capacity, *frame_shape)
+        )
+        self._index = np.zeros(capacity, dtype=_INDEX_DTYPE)
+
+    def _write(self, data: Any) -> None:
+        """method copy frame into the file.
+
+        Args:
+            data (Any): frame or Sequenced frame
+
+        Raises:
+            ValueError: frame has different shape than frames in file
+                or dtype which can not be converted, see _convert_frame.
+        """
+        if isinstance(data, Sequenced):
+            index, timestamp, frame = data
+        else:
+            index, timestamp, frame = self.length, monotonic(), data
+        try:
+            if self.length >= self.capacity:
+                self.dropped += 1
+                return
+            if frame.shape != self._frames.shape[1:]:
+                raise ValueError(
+                    f"Frame shape {frame.shape} differs from {self._frames.shape[1:]}."
+                )
+            self._frames[self.length] = _convert_frame(frame, self._frames.dtype)
+            self._index[self.length] = (index, timestamp)
+            self.length += 1
+        finally:
+            if self.pool is not None:
+                self.pool.release(frame)
+
+    def close(self) -> None:
+        """method flush frames, cut the file to recorded frames and save the index."""
+        if self._frames is None:
+            return
+        self._frames.flush()
+        offset, dtype = self._frames.offset, self._frames.dtype
+        frame_shape = self._frames.shape[1:]
+        self._frames = None
+        _rewrite_header(self.path, offset, dtype, frame_shape, self.length)
+        np.save(_index_path(self.path), self._index[: self.length])
+        self.log("%d frames recorded in %s.", self.length, self.path)
+
+    def run(self):
+        """Method representing the thread's activity."""
+        try:
+            super().run()
+        finally:
+            self.report_dropped()
+            self.close()
+
+
+class FrameFileReader:
+    """
+    Random access to frames recorded by FrameFileRecorder.
+    Frames are memory-mapped, so only read frames are loaded from disk.
+
+    Usage example:
+        reader = FrameFileReader("frames.npy")
+        for i in range(len(reader)):
+            frame = reader[i]
+            index, timestamp = reader.indexes[i], reader.timestamps[i]
+    """
+
+    def __init__(self, file_name: str) -> None:
+        """Initialize self.
+
+        Args:
+            file_name (str): path of the file, ".npy" is added if missing.
+        """
+        if not file_name.endswith(".npy"):
+            file_name = f"{file_name}.npy"
+        self.path = file_name
+        self.frames = np.load(file_name, mmap_mode="r")
+        index = np.zeros(len(self.frames), dtype=_INDEX_DTYPE)
+        index["index"] = np.arange(len(self.frames))
+        if os.path.exists(_index_path(file_name)):
+            index = np.load(_index_path(file_name))
+        self.indexes = index["index"]
+        self.timestamps = index["timestamp"]
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __getitem__(self, number: int) -> np.ndarray:
+        """method return frame by its number in file.
+
+        Args:
+            number (int): number of frame
+
+        Returns:
+            np.ndarray: read-only frame
+        """
+        return self.frames[number]
@@ -0,0 +1,161 @@
+"""
+Frame pool is fixed set of preallocated frames which pipeline stages
+borrow and return, so the hot path does not allocate new frames.
+"""
+import multiprocessing
+import queue
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class FramePool:
+    """
+    Fixed pool of preallocated frames shared by threads
+    or, with shared = True, by processes.
+    Frames have to be passed between threads by reference (queue.Queue),
+    between processes pass index(frame) and get frame(index) on the other side.
+
+    Usage example:
+        pool = FramePool((512, 384, 3), "uint8", size=8)
+
+        frame = pool.acquire()  # blocks while all frames are in use
+        ...
+        pool.release(frame)
+    """
+
+    def __init__(
+        self,
+        shape: Tuple[int, ...],
+        dtype: str = "uint8",
+        size: int = 8,
+        *,
+        shared: bool = False,
+    ) -> None:
+        """Initialize self.
+
+        Args:
+            shape (Tuple[int, ...]): shape of single frame
+            dtype (str, optional): dtype of frames. Defaults to "uint8".
+            size (int, optional): number of frames in pool. Defaults to 8.
+            shared (bool, optional): If True frames live in shared memory and pool
+                can be passed to other processes. Defaults to False.
+        """
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.size = size
+        self.shared = shared
+        self._shm: Optional[SharedMemory] = None
+        self._owner = shared
+        nbytes = int(np.prod(self.shape)) * self.dtype.itemsize * size
+        if shared:
+            self._shm = SharedMemory(create=True, size=max(nbytes, 1))
+            self._free = multiprocessing.Queue()
+        else:
+            self._free = queue.Queue()
+        self._attach()
+        for index in range(size):
+            self._free.put(index)
+
+    def _attach(self) -> None:
+        """method make array with all frames."""
+        buffer = None if self._shm is None else self._shm.buf
+        self._frames = np.ndarray((self.size, *self.shape), self.dtype, buffer)
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["_shm"] = None if self._shm is None else self._shm.name
+        state["_owner"] = False
+        del state["_frames"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        if self._shm is not None:
+            self._shm = SharedMemory(name=self._shm)
+        self._attach()
+
+    def acquire(self, timeout: float = None) -> np.ndarray:
+        """method borrow free frame.
+
+        Args:
+            timeout (float, optional): Timeout for waiting for free frame.
+                None means waiting as long as needed. Defaults to None.
+
+        Raises:
+            queue.Empty: no frame was returned during timeout.
+
+        Returns:
+            np.ndarray: frame with content left by its previous user
+        """
+        return self._frames[self._free.get(timeout=timeout)]
+
+    def frame(self, index: int) -> np.ndarray:
+        """method return frame at index, e.g. received from other process.
+
+        Args:
+            index (int): index of frame
+
+        Returns:
+            np.ndarray: frame
+        """
+        return self._frames[index]
+
+    def location(self, index: int) -> Tuple[str, int]:
+        """method return where frame lives in shared memory, so other process
+            can reach it without copying.
+
+        Args:
+            index (int): index of frame
+
+        Raises:
+            ValueError: pool is not shared.
+
+        Returns:
+            Tuple[str, int]: name of shared memory block and offset of frame in bytes
+        """
+        if self._shm is None:
+            raise ValueError("Pool is not shared.")
+        return self._shm.name, index * self._frames[0].nbytes
+
+    def index(self, frame: np.ndarray) -> Optional[int]:
+        """method find position of frame in pool.
+
+        Args:
+            frame (np.ndarray): any array
+
+        Returns:
+            Optional[int]: index of frame or None if frame does not come from pool
+        """
+        if not isinstance(frame, np.ndarray) or frame.shape != self.shape:
+            return None
+        start = self._frames.__array_interface__["data"][0]
+        offset = frame.__array_interface__["data"][0] - start
+        index, rest = divmod(offset, self._frames[0].nbytes or 1)
+        if rest or not 0 <= index < self.size:
+            return None
+        return index
+
+    def release(self, frame: np.ndarray) -> None:
+        """method return borrowed frame to pool.
+
+        Args:
+            frame (np.ndarray): frame returned by acquire
+
+        Raises:
+            ValueError: frame does not come from pool.
+        """
+        index = self.index(frame)
+        if index is None:
+            raise ValueError("Frame does not come from this pool.")
+        self._free.put(index)
+
+    def close(self) -> None:
+        """method release shared memory, the pool can not be used after close."""
+        del self._frames
+        if self._shm is not None:
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+            self._shm = None
@@ -0,0 +1,352 @@
+"""
+Frame queue passes frames between processes like multiprocessing.Queue,
+but arrays are pickled by protocol 5 out-of-band, so their data are not copied
+into the pickle and are received directly into new buffers.
+"""
+import io
+import multiprocessing
+import os
+import pickle
+import struct
+import sys
+from collections import deque
+from multiprocessing import context
+from multiprocessing.util import Finalize
+from queue import Empty, Full
+from threading import Condition, Thread
+from time import monotonic
+from typing import Any, Deque, List, Optional
+
+import numpy as np
+
+_HEADER = struct.Struct("!I")
+"""Number of out-of-band buffers at the start of message header."""
+
+_CLOSE = object()
+"""Marker which ends feeder thread."""
+
+_RAW_PIPE = sys.platform != "win32"
+"""If True data of arrays are written to and read from file descriptors of pipe
+without length prefix and intermediate copy of Connection.recv_bytes_into."""
+
+
+def dumps_frame(obj: Any) -> List[memoryview]:
+    """Function serialize object with contiguous arrays out-of-band.
+
+    Args:
+        obj (Any): object to serialize, e.g. Sequenced frame
+
+    Returns:
+        List[memoryview]: header with sizes of buffers, pickle without data of arrays
+            and raw data of the arrays (not copied)
+    """
+    buffers: List[pickle.PickleBuffer] = []
+    data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+    sizes = [raw.nbytes for raw in raws]
+    header = struct.pack(f"!I{len(sizes)}Q", len(sizes), *sizes)
+    return [memoryview(header), memoryview(data), *raws]
+
+
+def loads_frame(data: bytes, buffers: List[Any]) -> Any:
+    """Function deserialize object serialized by dumps_frame.
+    Arrays use given buffers without copying, so they are writable.
+
+    Args:
+        data (bytes): pickle without data of arrays
+        buffers (List[Any]): writable buffers with data of arrays
+
+    Returns:
+        Any: deserialized object
+    """
+    return pickle.loads(data, buffers=buffers)
+
+
+def _buffer_sizes(header: bytes) -> List[int]:
+    """Function read sizes of out-of-band buffers from header.
+
+    Args:
+        header (bytes): header made by dumps_frame
+
+    Returns:
+        List[int]: sizes of buffers in bytes
+    """
+    (count,) = _HEADER.unpack_from(header)
+    return list(struct.unpack_from(f"!{count}Q", header, _HEADER.size))
+
+
+def _send_raw(writer: Any, raw: memoryview) -> None:
+    """Function send data of array through pipe.
+
+    Args:
+        writer (multiprocessing.connection.Connection): end of pipe for sending
+        raw (memoryview): data of array
+    """
+    if not _RAW_PIPE:
+        writer.send_bytes(raw)
+        return
+    fd = writer.fileno()
+    while raw:
+        raw = raw[os.write(fd, raw) :]
+
+
+def _recv_raw(reader: Any, size: int) -> np.ndarray:
+    """Function receive data of array from pipe into new buffer.
+
+    Args:
+        reader (multiprocessing.connection.Connection): end of pipe for receiving
+        size (int): size of data in bytes
+
+    Raises:
+        EOFError: pipe was closed.
+
+    Returns:
+        np.ndarray: bytes of array
+    """
+    buffer = np.empty(size, np.uint8)
+    if not _RAW_PIPE:
+        reader.recv_bytes_into(buffer)
+        return buffer
+    view = memoryview(buffer)
+    with io.FileIO(reader.fileno(), "rb", closefd=False) as file:
+        while view:
+            count = file.readinto(view)
+            if not count:
+                raise EOFError
+            view = view[count:]
+    return buffer
+
+
+class FrameQueue:
+    """
+    Queue between processes with interface of multiprocessing.Queue,
+    which sends numpy arrays (also inside Sequenced or other objects) without copying
+    them into pickle. Each message is header with sizes of buffers, pickle with shapes,
+    dtypes and other metadata, and raw data of contiguous arrays written to the pipe
+    as they are. Reader receives the data directly into new writable buffers.
+
+    Like multiprocessing.Queue, put returns immediately and messages are sent
+    by feeder thread, so arrays must not be changed after put until they are sent
+    (e.g. frames from FramePool should be copied or released by the reader).
+    Queue can be passed to processes only at their start.
+
+    Usage example:
+        queue0 = FrameQueue(maxsize=4)
+        queue1 = FrameQueue(maxsize=4)
+
+        process = multiprocessing.Process(target=run_broker, args=(queue0, queue1))
+        process.start()
+        queue0.put(Sequenced(0, monotonic(), frame))
+        result = queue1.get()
+    """
+
+    def __init__(self, maxsize: int = 0, *, ctx: context.BaseContext = None) -> None:
+        """Initialize self.
+
+        Args:
+            maxsize (int, optional): capacity, 0 means unbounded. Defaults to 0.
+            ctx (context.BaseContext, optional): multiprocessing context,
+                None means the default context. Defaults to None.
+        """
+        if ctx is None:
+            ctx = multiprocessing.get_context()
+        self._maxsize = maxsize
+        self._reader, self._writer = ctx.Pipe(duplex=False)
+        self._rlock = ctx.Lock()
+        self._wlock = ctx.Lock()
+        self._slots = ctx.BoundedSemaphore(maxsize) if maxsize > 0 else None
+        self._size = ctx.Value("l", 0)
+        self._reset()
+
+    def _reset(self) -> None:
+        """method create state which is local for process."""
+        self._pending: Deque[Any] = deque()
+        self._ready = Condition()
+        self._feeder: Optional[Thread] = None
+        self._finalize: Optional[Finalize] = None
+
+    def __getstate__(self) -> tuple:
+        context.assert_spawning(self)
+        return (
+            self._maxsize,
+            self._reader,
+            self._writer,
+            self._rlock,
+            self._wlock,
+            self._slots,
+            self._size,
+        )
+
+    def __setstate__(self, state: tuple) -> None:
+        (
+            self._maxsize,
+            self._reader,
+            self._writer,
+            self._rlock,
+            self._wlock,
+            self._slots,
+            self._size,
+        ) = state
+        self._reset()
+
+    def qsize(self) -> int:
+        """method return approximate number of data in queue.
+
+        Returns:
+            int: number of put data which were not got yet
+        """
+        return self._size.value
+
+    def empty(self) -> bool:
+        """method check if queue is empty, see qsize.
+
+        Returns:
+            bool: True if queue is empty
+        """
+        return self.qsize() == 0
+
+    def full(self) -> bool:
+        """method check if queue is full, see qsize.
+
+        Returns:
+            bool: True if bounded queue is full
+        """
+        return 0 < self._maxsize <= self.qsize()
+
+    def put(self, obj: Any, block: bool = True, timeout: float = None) -> None:
+        """method put object into queue, it is sent by feeder thread.
+
+        Args:
+            obj (Any): object to put
+            block (bool, optional): If True wait for free slot of bounded queue.
+                Defaults to True.
+            timeout (float, optional): Timeout for waiting, None means
+                waiting as long as needed. Defaults to None.
+
+        Raises:
+            Full: bounded queue had no free slot.
+        """
+        parts = dumps_frame(obj)
+        if self._slots is not None and not self._slots.acquire(block, timeout):
+            raise Full
+        with self._size.get_lock():
+            self._size.value += 1
+        with self._ready:
+            if self._feeder is None:
+                self._start_feeder()
+            self._pending.append(parts)
+            self._ready.notify()
+
+    def put_nowait(self, obj: Any) -> None:
+        """method put object into queue without waiting, see put.
+
+        Args:
+            obj (Any): object to put
+        """
+        self.put(obj, False)
+
+    def get(self, block: bool = True, timeout: float = None) -> Any:
+        """method remove and return object from queue.
+
+        Args:
+            block (bool, optional): If True wait for data. Defaults to True.
+            timeout (float, optional): Timeout for waiting, None means
+                waiting as long as needed. Defaults to None.
+
+        Raises:
+            Empty: no data came during timeout.
+
+        Returns:
+            Any: object from queue
+        """
+        if not block:
+            timeout = 0
+        deadline = None if timeout is None else monotonic() + timeout
+        if not self._rlock.acquire(True, timeout):
+            raise Empty
+        try:
+            remaining = None if deadline is None else max(deadline - monotonic(), 0)
+            if not self._reader.poll(remaining):
+                raise Empty
+            header = self._reader.recv_bytes()
+            data = self._reader.recv_bytes()
+            buffers = [_recv_raw(self._reader, size) for size in _buffer_sizes(header)]
+        finally:
+            self._rlock.release()
+        with self._size.get_lock():
+            self._size.value -= 1
+        if self._slots is not None:
+            self._slots.release()
+        return loads_frame(data, buffers)
+
+    def get_nowait(self) -> Any:
+        """method remove and return object from queue without waiting, see get.
+
+        Returns:
+            Any: object from queue
+        """
+        return self.get(False)
+
+    def close(self) -> None:
+        """method send the pending data and stop feeder thread."""
+        with self._ready:
+            feeder = self._feeder
+            self._feeder = None
+        if feeder is not None and self._finalize is not None:
+            self._finalize()
+
+    def _start_feeder(self) -> None:
+        """method start feeder thread, it is stopped after the pending data
+        are sent when queue is closed, collected or process exits."""
+        feeder = Thread(
+            target=FrameQueue._feed,
+            args=(self._pending, self._ready, self._writer, self._wlock),
+            name="FrameQueue-feeder",
+            daemon=True,
+        )
+        feeder.start()
+        self._feeder = feeder
+        self._finalize = Finalize(
+            self,
+            FrameQueue._stop_feeder,
+            (self._pending, self._ready, feeder),
+            exitpriority=-5,
+        )
+
+    @staticmethod
+    def _feed(pending: Deque[Any], ready: Condition, writer: Any, wlock: Any) -> None:
+        """Function of feeder thread sending pending messages in order.
+
+        Args:
+            pending (Deque[Any]): messages from dumps_frame and _CLOSE marker
+            ready (Condition): condition notified after append to pending
+            writer (multiprocessing.connection.Connection): end of pipe for sending
+            wlock (multiprocessing.Lock): lock of the writers of pipe
+        """
+        while 1:
+            with ready:
+                while not pending:
+                    ready.wait()
+                parts = pending.popleft()
+            if parts is _CLOSE:
+                return
+            header, data, *raws = parts
+            with wlock:
+                writer.send_bytes(header)
+                writer.send_bytes(data)
+                for raw in raws:
+                    _send_raw(writer, raw)
+
+    @staticmethod
+    def _stop_feeder(pending: Deque[Any], ready: Condition, feeder: Thread) -> None:
+        """Function make feeder thread end after the pending messages and wait for it.
+
+        Args:
+            pending (Deque[Any]): messages of feeder thread
+            ready (Condition): condition notified after append to pending
+            feeder (Thread): feeder thread
+        """
+        with ready:
+            pending.append(_CLOSE)
+            ready.notify()
+        feeder.join()
@@ -0,0 +1,486 @@
+"""
+Kernels used by MedianFilter to process frames in their native integer dtype.
+Frames are never converted to float, so uint8 frames stay uint8 from start to finish.
+"""
+import itertools
+import threading
+from functools import lru_cache
+from typing import Iterator, NamedTuple, Sequence, Tuple
+
+import numpy as np
+from skimage.filters import rank
+
+NATIVE_DTYPES = (np.dtype("uint8"), np.dtype("uint16"))
+
+HISTOGRAM_LEVELS = 256
+"""Number of values of uint8 pixel counted by histogram median."""
+HISTOGRAM_COARSE = 16
+"""Number of coarse bins, each groups HISTOGRAM_LEVELS // HISTOGRAM_COARSE values."""
+
+PLAN_CACHE_SIZE = 8
+"""Number of resize plans (pairs of input and output shape) kept in cache."""
+
+FUSED_MAX_AREA = 49
+"""Largest number of pixels in filter of fused kernel, its sorting network
+grows faster than the area and rank median is faster above 7 x 7."""
+FUSED_BAND_ROWS = 32
+"""Number of output rows filtered together by fused kernel, so the samples
+of one band stay in CPU cache."""
+
+_SCRATCH = threading.local()
+
+
+def _scratch(key: str, shape: Tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+    """Function return buffer of the calling thread reused for every frame,
+        so intermediate results do not allocate new arrays.
+
+    Args:
+        key (str): name of the buffer
+        shape (Tuple[int, ...]): shape of the buffer
+        dtype (np.dtype): dtype of the buffer
+
+    Returns:
+        np.ndarray: uninitialized C-contiguous buffer
+    """
+    buffers = getattr(_SCRATCH, "buffers", None)
+    if buffers is None:
+        buffers = _SCRATCH.buffers = {}
+    buffer = buffers.get(key)
+    if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+        buffer = buffers[key] = np.empty(shape, dtype)
+    return buffer
+
+
+def _check_native_frame(frame: np.ndarray) -> None:
+    """Function raise ValueError if frame can not be processed in native dtype.
+
+    Args:
+        frame (np.ndarray): frame with dimension (m x n x k)
+
+    Raises:
+        ValueError: frame has unsupported dtype or dimension.
+    """
+    if frame.dtype not in NATIVE_DTYPES:
+        raise ValueError(
+            f"Frame dtype {frame.dtype} is not supported, use uint8 or uint16."
+        )
+    if frame.ndim != 3:
+        raise ValueError(f"Frame has to have dimension (m x n x k), got {frame.shape}.")
+
+
+def _planar_footprint(filter_shape: Tuple[int, int, int]) -> np.ndarray:
+    """Function make two dimensional footprint applied to each channel separately.
+
+    Args:
+        filter_shape (Tuple[int, int, int]): shape of the filter, last dimension has to be 1.
+
+    Raises:
+        ValueError: filter spans more than one channel.
+
+    Returns:
+        np.ndarray: boolean footprint with shape filter_shape[:2]
+    """
+    if len(filter_shape) == 3 and filter_shape[2] != 1:
+        raise ValueError(
+            f"Filter shape {filter_shape} spans channels, native kernels need (m, n, 1)."
+        )
+    return np.ones(filter_shape[:2], dtype=bool)
+
+
+def _nearest_indices(in_size: int, out_size: int) -> np.ndarray:
+    """Function map output pixel centers to the nearest input pixels.
+
+    Args:
+        in_size (int): input size along the axis
+        out_size (int): output size along the axis
+
+    Returns:
+        np.ndarray: input index for each output index
+    """
+    indices = ((np.arange(out_size) + 0.5) * (in_size / out_size)).astype(np.intp)
+    return np.minimum(indices, in_size - 1)
+
+
+class _ResizePlan(NamedTuple):
+    """Index maps of nearest-neighbour resize between two frame shapes.
+    Plans are shared by all threads and must not be modified."""
+
+    rows: np.ndarray
+    cols: np.ndarray
+    flat: np.ndarray
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _resize_plan(in_shape: Tuple[int, int], out_shape: Tuple[int, int]) -> _ResizePlan:
+    """Function compute index maps once for each pair of shapes.
+
+    Args:
+        in_shape (Tuple[int, int]): shape of input frame
+        out_shape (Tuple[int, int]): shape of resized frame
+
+    Returns:
+        _ResizePlan: input row and column for each output row and column,
+            and input pixel for each output pixel of flattened frames
+    """
+    rows = _nearest_indices(in_shape[0], out_shape[0])
+    cols = _nearest_indices(in_shape[1], out_shape[1])
+    flat = (rows[:, None] * in_shape[1] + cols).ravel()
+    return _ResizePlan(rows, cols, flat)
+
+
+def _batcher_pairs(size: int) -> Iterator[Tuple[int, int]]:
+    """Function generate comparators of Batcher odd-even merge sort.
+
+    Args:
+        size (int): number of sorted values, power of 2
+
+    Yields:
+        Tuple[int, int]: wires compared and exchanged, smaller value goes to the first one
+    """
+    p = 1
+    while p < size:
+        k = p
+        while k >= 1:
+            for j in range(k % p, size - k, 2 * k):
+                for i in range(min(k, size - j - k)):
+                    if (i + j) // (2 * p) == (i + j + k) // (2 * p):
+                        yield i + j, i + j + k
+            k //= 2
+        p *= 2
+
+
+@lru_cache(maxsize=None)
+def _median_network(size: int) -> Tuple[Tuple[int, int, bool, bool], ...]:
+    """Function make sorting network selecting the median of size values.
+    Batcher network is cut to size wires (missing wires are treated as infinity)
+    and pruned to comparators on which the median wire depends.
+
+    Args:
+        size (int): number of values
+
+    Returns:
+        Tuple[Tuple[int, int, bool, bool], ...]: comparators (first wire, second wire,
+            minimum needed, maximum needed), the median ends on wire size // 2
+    """
+    power = 1
+    while power < size:
+        power *= 2
+    pairs = [(a, b) for a, b in _batcher_pairs(power) if b < size]
+    needed = {size // 2}
+    network = []
+    for a, b in reversed(pairs):
+        need_min, need_max = a in needed, b in needed
+        if need_min or need_max:
+            network.append((a, b, need_min, need_max))
+            needed.update((a, b))
+    return tuple(reversed(network))
+
+
+class _FusedPlan(NamedTuple):
+    """Input offsets of pixels under each row and column of the filter
+    for each output row and column. Plans are shared by all threads and must not be modified."""
+
+    rows: np.ndarray
+    cols: np.ndarray
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _fused_plan(
+    in_shape: Tuple[int, int],
+    out_shape: Tuple[int, int],
+    filter_shape: Tuple[int, int],
+) -> _FusedPlan:
+    """Function compute index maps of fused kernel once for each shape.
+
+    Args:
+        in_shape (Tuple[int, int]): shape of input frame
+        out_shape (Tuple[int, int]): shape of resized frame
+        filter_shape (Tuple[int, int]): shape of the filter
+
+    Returns:
+        _FusedPlan: offsets of input rows (m x out rows) in pixels
+            and input columns (n x out columns)
+    """
+    plan = _resize_plan(in_shape, out_shape)
+    (m, n), (height, width) = filter_shape, out_shape
+    rows = np.arange(height) + np.arange(-(m // 2), m - m // 2)[:, None]
+    cols = np.arange(width) + np.arange(-(n // 2), n - n // 2)[:, None]
+    return _FusedPlan(
+        plan.rows[np.clip(rows, 0, height - 1)] * in_shape[1],
+        plan.cols[np.clip(cols, 0, width - 1)],
+    )
+
+
+def _fused_resize_median(
+    frame: np.ndarray,
+    new_frame_shape: Tuple[int, int],
+    filter_shape: Tuple[int, int],
+    out: np.ndarray = None,
+) -> np.ndarray:
+    """Function resize frame with nearest-neighbour interpolation and apply median
+    filter in one pass without the resized frame. Pixels under the filter are taken
+    straight from frame through cached index maps, for FUSED_BAND_ROWS output rows at once,
+    and their median is selected by sorting network of element-wise minimum and maximum.
+    Pixels outside the resized frame repeat its edge like skimage.filters.median,
+    so the result equals median of the resized frame.
+
+    Args:
+        frame (np.ndarray): frame with dimension (m x n x k)
+        new_frame_shape (Tuple[int, int]): new shape after resize
+        filter_shape (Tuple[int, int]): shape of the filter, at most FUSED_MAX_AREA pixels
+        out (np.ndarray, optional): array for the result. Defaults to None.
+
+    Returns:
+        np.ndarray: resized and filtered frame with the same dtype as frame
+    """
+    height, width = new_frame_shape
+    channels = frame.shape[2]
+    plan = _fused_plan(tuple(frame.shape[:2]), tuple(new_frame_shape), filter_shape)
+    size = filter_shape[0] * filter_shape[1]
+    network = _median_network(size)
+    if out is None:
+        out = np.empty((height, width, channels), frame.dtype)
+    pixels = frame.reshape(-1, channels)
+    shape = (size + 1, FUSED_BAND_ROWS, width, channels)
+    samples = _scratch("fused_samples", shape, frame.dtype)
+    index = _scratch("fused_index", (FUSED_BAND_ROWS, width), np.dtype(np.intp))
+    for start in range(0, height, FUSED_BAND_ROWS):
+        stop = min(start + FUSED_BAND_ROWS, height)
+        rows = stop - start
+        wires = list(samples[:, :rows])
+        band_index = index[:rows]
+        for i, (row, col) in enumerate(itertools.product(plan.rows, plan.cols)):
+            np.add(row[start:stop, None], col, out=band_index)
+            target = wires[i].reshape(-1, channels)
+            np.take(pixels, band_index.ravel(), axis=0, out=target, mode="clip")
+        spare = wires[size]
+        for a, b, need_min, need_max in network:
+            if need_min and need_max:
+                np.minimum(wires[a], wires[b], out=spare)
+                np.maximum(wires[a], wires[b], out=wires[b])
+                wires[a], spare = spare, wires[a]
+            elif need_min:
+                np.minimum(wires[a], wires[b], out=wires[a])
+            else:
+                np.maximum(wires[a], wires[b], out=wires[b])
+        out[start:stop] = wires[size // 2]
+    return out
+
+
+def _native_resize(
+    frame: np.ndarray,
+    new_frame_shape: Tuple[int, int],
+    out: np.ndarray = None,
+) -> np.ndarray:
+    """Function resize frame with nearest-neighbour interpolation keeping its dtype.
+    Index maps come from cached plan, so they are computed once for each shape.
+
+    Args:
+        frame (np.ndarray): frame with dimension (m x n x k)
+        new_frame_shape (Tuple[int, int]): new shape after resize
+        out (np.ndarray, optional): array for the result. Defaults to None.
+
+    Returns:
+        np.ndarray: resized frame with the same dtype as frame
+    """
+    plan = _resize_plan(tuple(frame.shape[:2]), tuple(new_frame_shape))
+    if out is None:
+        out = np.empty((*new_frame_shape, *frame.shape[2:]), frame.dtype)
+    if frame.flags.c_contiguous and out.flags.c_contiguous:
+        pixels = frame.reshape(-1, *frame.shape[2:])
+        target = out.reshape(-1, *out.shape[2:])
+        np.take(pixels, plan.flat, axis=0, out=target, mode="clip")
+        return out
+    for i, row in enumerate(plan.rows):
+        np.take(frame[row], plan.cols, axis=0, out=out[i], mode="clip")
+    return out
+
+
+def _rank_median(
+    frame: np.ndarray,
+    footprint: np.ndarray,
+    out: np.ndarray = None,
+) -> np.ndarray:
+    """Function apply skimage.filters.rank.median to each channel of frame.
+    Rank median uses a sliding histogram, so the cost per pixel
+    grows with the footprint height only, not with its area.
+    Pixels outside the frame are not taken into account.
+    Channels are copied to contiguous scratch buffers of the calling thread,
+    because rank.median writes only into contiguous arrays.
+
+    Args:
+        frame (np.ndarray): frame with dimension (m x n x k)
+        footprint (np.ndarray): two dimensional matrix of 0 and 1 indicating values to median
+        out (np.ndarray, optional): array for the result. Defaults to None.
+
+    Returns:
+        np.ndarray: filtered frame with the same dtype as frame
+    """
+    if out is None:
+        out = np.empty_like(frame)
+    plane_in = _scratch("rank_in", frame.shape[:2], frame.dtype)
+    plane_out = _scratch("rank_out", frame.shape[:2], frame.dtype)
+    for channel in range(frame.shape[2]):
+        np.copyto(plane_in, frame[:, :, channel])
+        rank.median(plane_in, footprint, out=plane_out)
+        out[:, :, channel] = plane_out
+    return out
+
+
+def _rank_median_batch(
+    frames: np.ndarray,
+    footprint: np.ndarray,
+    out: Sequence[np.ndarray] = None,
+) -> Sequence[np.ndarray]:
+    """Function apply skimage.filters.rank.median to each channel of all frames
+    by one call per channel. The footprint has depth 1, so frames do not mix.
+
+    Args:
+        frames (np.ndarray): stacked frames with dimension (N x m x n x k)
+        footprint (np.ndarray): two dimensional matrix of 0 and 1 indicating values to median
+        out (Sequence[np.ndarray], optional): N arrays (or array N x m x n x k)
+            for the results. Defaults to None.
+
+    Returns:
+        Sequence[np.ndarray]: filtered frames with the same dtype as frames
+    """
+    if out is None:
+        out = np.empty_like(frames)
+    plane_in = _scratch("rank_batch_in", frames.shape[:3], frames.dtype)
+    plane_out = _scratch("rank_batch_out", frames.shape[:3], frames.dtype)
+    footprint = footprint[None]
+    for channel in range(frames.shape[3]):
+        np.copyto(plane_in, frames[..., channel])
+        rank.median(plane_in, footprint, out=plane_out)
+        for target, plane in zip(out, plane_out):
+            target[:, :, channel] = plane
+    return out
+
+
+def _histogram_median_plane(
+    plane: np.ndarray, size: Tuple[int, int], out: np.ndarray
+) -> None:
+    """Function compute exact median of uint8 plane with number of operations per pixel
+    independent of the window size.
+    Each column of the padded plane keeps histogram of the m pixels under the window,
+    moving down one row removes one pixel and adds one pixel to each column histogram.
+    Window histograms are differences of cumulative sums of column histograms,
+    so their cost does not depend on the window size. The median is found first among
+    coarse bins and then among HISTOGRAM_LEVELS // HISTOGRAM_COARSE values of one bin.
+
+    Args:
+        plane (np.ndarray): uint8 plane (m x n)
+        size (Tuple[int, int]): height and width of the window
+        out (np.ndarray): uint8 plane for the result
+    """
+    m, n = size
+    height, width = plane.shape
+    padded = np.pad(
+        plane, ((m // 2, m - 1 - m // 2), (n // 2, n - 1 - n // 2)), mode="edge"
+    )
+    columns = np.arange(padded.shape[1])
+    outputs = np.arange(width)
+    fine_size = HISTOGRAM_LEVELS // HISTOGRAM_COARSE
+    dtype = np.int16 if m * n < 2**15 else np.int32
+    fine = np.zeros((padded.shape[1], HISTOGRAM_LEVELS), dtype)
+    coarse = np.zeros((padded.shape[1], HISTOGRAM_COARSE), dtype)
+    fine_sum = np.zeros((padded.shape[1] + 1, HISTOGRAM_LEVELS), dtype)
+    coarse_sum = np.zeros((padded.shape[1] + 1, HISTOGRAM_COARSE), dtype)
+    for row in padded[:m]:
+        fine[columns, row] += 1
+        coarse[columns, row // fine_size] += 1
+    rank_ = m * n // 2
+    offsets = np.arange(fine_size)
+    for i in range(height):
+        np.cumsum(coarse, axis=0, out=coarse_sum[1:])
+        window = np.cumsum(coarse_sum[n:] - coarse_sum[:-n], axis=1)
+        bins = (window <= rank_).sum(axis=1)
+        below = np.where(bins > 0, window[outputs, bins - 1], 0)
+        np.cumsum(fine, axis=0, out=fine_sum[1:])
+        values = bins[:, None] * fine_size + offsets
+        counts = (
+            fine_sum[outputs[:, None] + n, values] - fine_sum[outputs[:, None], values]
+        )
+        counts = np.cumsum(counts, axis=1)
+        out[i] = bins * fine_size + (counts <= (rank_ - below)[:, None]).sum(axis=1)
+        if i + 1 < height:
+            old, new = padded[i], padded[i + m]
+            fine[columns, old] -= 1
+            fine[columns, new] += 1
+            coarse[columns, old // fine_size] -= 1
+            coarse[columns, new // fine_size] += 1
+
+
+def _histogram_median(
+    frame: np.ndarray,
+    footprint: np.ndarray,
+    out: np.ndarray = None,
+) -> np.ndarray:
+    """Function apply exact median with rectangular footprint to each channel of uint8 frame.
+    The number of operations per pixel does not depend on the footprint size,
+    but they run as NumPy calls on rows of 256 bin histograms, so it is slower than
+    _rank_median at every measured footprint size (about 1.2 s against 0.3-0.5 s
+    per 768 x 1024 frame up to 31 x 31, see benchmarks/bench.py). It is kept because
+    pixels outside the frame repeat the nearest edge pixel, like skimage.filters.median,
+    so results are equal to it without converting the frame to float64.
+
+    Args:
+        frame (np.ndarray): uint8 frame with dimension (m x n x k)
+        footprint (np.ndarray): two dimensional matrix of 1, only its shape is used
+        out (np.ndarray, optional): array for the result. Defaults to None.
+
+    Raises:
+        ValueError: frame is not uint8.
+
+    Returns:
+        np.ndarray: filtered uint8 frame
+    """
+    if frame.dtype != np.uint8:
+        raise ValueError(f"Histogram median needs uint8 frames, got {frame.dtype}.")
+    if out is None:
+        out = np.empty_like(frame)
+    plane_out = _scratch("histogram_out", frame.shape[:2], frame.dtype)
+    for channel in range(frame.shape[2]):
+        _histogram_median_plane(frame[:, :, channel], footprint.shape, plane_out)
+        out[:, :, channel] = plane_out
+    return out
+
+
+def _separable_median(
+    frame: np.ndarray,
+    footprint: np.ndarray,
+    out: np.ndarray = None,
+) -> np.ndarray:
+    """Function approximate median with rectangular footprint by median of each row
+    followed by median of each column (median of medians), both by skimage.filters.rank.median
+    along rows. It is modestly faster than _rank_median for large footprints
+    (about 0.37 s against 0.50 s per 768 x 1024 frame at 15 x 15, see benchmarks/bench.py),
+    not for small ones.
+    Approximation is exact on monotone gradients and removes sparse impulse noise like
+    the exact median, on textured frames values differ by a few levels on average,
+    more near thin lines and corners. Pixels outside the frame are not taken into account.
+
+    Args:
+        frame (np.ndarray): uint8 or uint16 frame with dimension (m x n x k)
+        footprint (np.ndarray): two dimensional matrix of 1, only its shape is used
+        out (np.ndarray, optional): array for the result. Defaults to None.
+
+    Returns:
+        np.ndarray: filtered frame with the same dtype as frame
+    """
+    if out is None:
+        out = np.empty_like(frame)
+    height, width = footprint.shape
+    rows = np.ones((1, width), dtype=bool)
+    columns = np.ones((1, height), dtype=bool)
+    plane_in = _scratch("separable_in", frame.shape[:2], frame.dtype)
+    plane_mid = _scratch("separable_mid", frame.shape[:2], frame.dtype)
+    plane_t = _scratch("separable_t", frame.shape[1::-1], frame.dtype)
+    plane_out = _scratch("separable_out", frame.shape[1::-1], frame.dtype)
+    for channel in range(frame.shape[2]):
+        np.copyto(plane_in, frame[:, :, channel])
+        rank.median(plane_in, rows, out=plane_mid)
+        np.copyto(plane_t, plane_mid.T)
+        rank.median(plane_t, columns, out=plane_out)
+        out[:, :, channel] = plane_out.T
+    return out
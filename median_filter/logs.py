@@ -0,0 +1,52 @@
+"""
+Logging of the package. Workers log to the "median_filter" logger, which has no
+handlers until configure_logging is called, so importing the package does not
+change logging of the application.
+"""
+import logging
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Optional
+
+LOGGER = logging.getLogger("median_filter")
+"""Logger of all workers."""
+LOGGER.addHandler(logging.NullHandler())
+
+FORMAT = "[%(asctime)s] [%(threadName)s] [%(levelname)s]: %(message)s"
+"""Default format of configure_logging."""
+
+
+def configure_logging(
+    level: int = logging.INFO,
+    *,
+    fmt: str = FORMAT,
+    non_blocking: bool = False,
+    root: bool = False,
+) -> Optional[QueueListener]:
+    """Function add stream handler (stderr) to the package logger.
+
+    Args:
+        level (int, optional): minimum level of logged messages. Defaults to logging.INFO.
+        fmt (str, optional): format of messages. Defaults to FORMAT.
+        non_blocking (bool, optional): If True workers only put records into queue
+            and the handler formats and writes them on a listener thread. Defaults to False.
+        root (bool, optional): If True the root logger is configured instead of
+            the package logger. Defaults to False.
+
+    Returns:
+        Optional[QueueListener]: started listener with non_blocking, stop it
+            at the end to write the rest of messages, otherwise None
+    """
+    logger = logging.getLogger() if root else LOGGER
+    handler: logging.Handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter(fmt))
+    listener = None
+    if non_blocking:
+        records: SimpleQueue = SimpleQueue()
+        listener = QueueListener(records, handler)
+        listener.start()
+        handler = QueueHandler(records)
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return listener
@@ -2,37 +2,434 @@
 Median filter is special broker which get picture from queue,
 applies median folter and push modified picture to next queue.
 """
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from multiprocessing import Queue
-from typing import Tuple
+from typing import Callable, List, Sequence, Tuple
 
 import numpy as np
 from skimage.filters import median  # pylint: disable = no-name-in-module
 from skimage.transform import resize
 
 from .broker import Broker
+from .frame_pool import FramePool
+from .kernels import (
+    FUSED_MAX_AREA,
+    _check_native_frame,
+    _fused_resize_median,
+    _histogram_median,
+    _native_resize,
+    _planar_footprint,
+    _rank_median,
+    _rank_median_batch,
+    _resize_plan,
+    _scratch,
+    _separable_median,
+)
+
+METHODS = ("skimage", "rank", "histogram", "separable", "fused")
+
+_NATIVE_KERNELS = {
+    "rank": _rank_median,
+    "histogram": _histogram_median,
+    "separable": _separable_median,
+}
+"""Median kernels of methods which keep frame dtype."""
+
+TILE_METHODS = ("rank", "histogram", "separable", "fused")
+"""Methods which can process frame in strips, their nearest-neighbour resize maps
+each output row to one input row, so strips give the same result as the whole frame."""
 
 
 def _resize_median_filter(
     frame: np.ndarray,
     new_frame_shape: Tuple[int, int],
     footprint: np.ndarray,
+    out: np.ndarray = None,
 ) -> np.ndarray:
     """Function resize frame using skimage.transform.resize and
         use on frame skimage.filters.median.
+        skimage.transform.resize has no out argument, so the float64
+        intermediate frame is allocated for every frame even with out.
 
     Args:
         frame (np.ndarray): frame to convert
         new_frame_shape (Tuple[int, int]): new shape after resize
         footprint (np.ndarray): matrix of 0 and 1 indicating values to median
+        out (np.ndarray, optional): float64 array for the result. Defaults to None.
 
     Returns:
         np.ndarray: frame after resize and median filter
     """
     frame = resize(frame, new_frame_shape)
-    frame = median(frame, footprint=footprint)
+    frame = median(frame, footprint=footprint, out=out)
     return frame
 
 
+def _resize_median_filter_native(
+    frame: np.ndarray,
+    new_frame_shape: Tuple[int, int],
+    footprint: np.ndarray,
+    out: np.ndarray = None,
+    kernel: Callable[..., np.ndarray] = _rank_median,
+) -> np.ndarray:
+    """Function resize frame with nearest-neighbour interpolation and
+        use on frame skimage.filters.rank.median (or other kernel) without leaving frame dtype.
+        The resized frame is kept in scratch buffer of the calling thread,
+        so with out the function does not allocate frames.
+
+    Args:
+        frame (np.ndarray): uint8 or uint16 frame to convert
+        new_frame_shape (Tuple[int, int]): new shape after resize
+        footprint (np.ndarray): two dimensional matrix of 0 and 1 indicating values to median
+        out (np.ndarray, optional): array with frame dtype for the result. Defaults to None.
+        kernel (Callable[..., np.ndarray], optional): median kernel, see _NATIVE_KERNELS.
+            Defaults to _rank_median.
+
+    Returns:
+        np.ndarray: frame after resize and median filter with the same dtype as frame
+    """
+    _check_native_frame(frame)
+    resized = _scratch("resized", (*new_frame_shape, *frame.shape[2:]), frame.dtype)
+    _native_resize(frame, new_frame_shape, out=resized)
+    return kernel(resized, footprint, out=out)
+
+
+def _same_layout(frames: List[np.ndarray], ndim: int) -> bool:
+    """Function check if frames can be stacked after resize.
+
+    Args:
+        frames (List[np.ndarray]): frames of the batch
+        ndim (int): number of leading dimensions which may differ
+
+    Returns:
+        bool: True if frames have the same dtype and trailing dimensions
+    """
+    first = frames[0]
+    return all(
+        frame.dtype == first.dtype and frame.shape[ndim:] == first.shape[ndim:]
+        for frame in frames
+    )
+
+
+def _resize_median_filter_batch(
+    frames: List[np.ndarray],
+    new_frame_shape: Tuple[int, int],
+    footprint: np.ndarray,
+    out: Sequence[np.ndarray] = None,
+) -> List[np.ndarray]:
+    """Function resize and filter stacked frames by one call of skimage.transform.resize
+        and skimage.filters.median. Frames with different shapes are converted one by one.
+
+    Args:
+        frames (List[np.ndarray]): frames to convert
+        new_frame_shape (Tuple[int, int]): new shape after resize
+        footprint (np.ndarray): matrix of 0 and 1 indicating values to median
+        out (Sequence[np.ndarray], optional): float64 arrays for the results. Defaults to None.
+
+    Returns:
+        List[np.ndarray]: frames after resize and median filter
+    """
+    if out is None:
+        out = [None] * len(frames)
+    if not _same_layout(frames, 0):
+        return [
+            _resize_median_filter(frame, new_frame_shape, footprint, out=target)
+            for frame, target in zip(frames, out)
+        ]
+    stack = resize(np.stack(frames), (len(frames), *new_frame_shape))
+    stack = median(stack, footprint=footprint[None])
+    results = []
+    for target, frame in zip(out, stack):
+        if target is not None:
+            target[...] = frame
+            frame = target
+        results.append(frame)
+    return results
+
+
+def _resize_median_filter_native_batch(
+    frames: List[np.ndarray],
+    new_frame_shape: Tuple[int, int],
+    footprint: np.ndarray,
+    out: Sequence[np.ndarray] = None,
+    kernel: Callable[..., np.ndarray] = _rank_median,
+) -> List[np.ndarray]:
+    """Function resize frames with nearest-neighbour interpolation into one stack
+        and filter all of them by one call of skimage.filters.rank.median per channel.
+        Frames with different dtypes or channels, or other kernels, convert frames one by one.
+
+    Args:
+        frames (List[np.ndarray]): uint8 or uint16 frames to convert
+        new_frame_shape (Tuple[int, int]): new shape after resize
+        footprint (np.ndarray): two dimensional matrix of 0 and 1 indicating values to median
+        out (Sequence[np.ndarray], optional): arrays with frame dtype for the results.
+            Defaults to None.
+        kernel (Callable[..., np.ndarray], optional): median kernel, see _NATIVE_KERNELS.
+            Defaults to _rank_median.
+
+    Returns:
+        List[np.ndarray]: frames after resize and median filter with the same dtype as frames
+    """
+    for frame in frames:
+        _check_native_frame(frame)
+    if kernel is not _rank_median or not _same_layout(frames, 2):
+        targets = [None] * len(frames) if out is None else out
+        return [
+            _resize_median_filter_native(
+                frame, new_frame_shape, footprint, out=target, kernel=kernel
+            )
+            for frame, target in zip(frames, targets)
+        ]
+    first = frames[0]
+    shape = (len(frames), *new_frame_shape, *first.shape[2:])
+    resized = _scratch("resized_batch", shape, first.dtype)
+    for frame, target in zip(frames, resized):
+        _native_resize(frame, new_frame_shape, out=target)
+    return list(_rank_median_batch(resized, footprint, out=out))
+
+
+def _resize_median_filter_fused(
+    frame: np.ndarray,
+    new_frame_shape: Tuple[int, int],
+    filter_shape: Tuple[int, int],
+    out: np.ndarray = None,
+) -> np.ndarray:
+    """Function resize frame with nearest-neighbour interpolation and apply
+        median filter in one pass, without the resized frame.
+
+    Args:
+        frame (np.ndarray): uint8 or uint16 frame to convert
+        new_frame_shape (Tuple[int, int]): new shape after resize
+        filter_shape (Tuple[int, int]): shape of the filter
+        out (np.ndarray, optional): array with frame dtype for the result. Defaults to None.
+
+    Returns:
+        np.ndarray: frame after resize and median filter with the same dtype as frame
+    """
+    _check_native_frame(frame)
+    return _fused_resize_median(frame, new_frame_shape, filter_shape, out=out)
+
+
+def _resize_median_filter_fused_batch(
+    frames: List[np.ndarray],
+    new_frame_shape: Tuple[int, int],
+    filter_shape: Tuple[int, int],
+    out: Sequence[np.ndarray] = None,
+) -> List[np.ndarray]:
+    """Function resize and filter frames one by one with the fused kernel,
+        which already works on bands of rows fitting in cache.
+
+    Args:
+        frames (List[np.ndarray]): uint8 or uint16 frames to convert
+        new_frame_shape (Tuple[int, int]): new shape after resize
+        filter_shape (Tuple[int, int]): shape of the filter
+        out (Sequence[np.ndarray], optional): arrays with frame dtype for the results.
+            Defaults to None.
+
+    Returns:
+        List[np.ndarray]: frames after resize and median filter with the same dtype as frames
+    """
+    targets = [None] * len(frames) if out is None else out
+    return [
+        _resize_median_filter_fused(frame, new_frame_shape, filter_shape, out=target)
+        for frame, target in zip(frames, targets)
+    ]
+
+
+@lru_cache(maxsize=None)
+def _tile_executor(workers: int) -> ThreadPoolExecutor:
+    """Function return thread pool shared by all tiled filters of the process
+        with the same number of workers, so filters do not oversubscribe cores.
+
+    Args:
+        workers (int): number of threads
+
+    Returns:
+        ThreadPoolExecutor: thread pool
+    """
+    return ThreadPoolExecutor(workers, thread_name_prefix="MedianFilterTile")
+
+
+def _resize_median_filter_tiled(
+    frame: np.ndarray,
+    new_frame_shape: Tuple[int, int],
+    filter_rows: int,
+    fun: Callable[..., np.ndarray],
+    tile_rows: int = None,
+    workers: int = 1,
+    out: np.ndarray = None,
+) -> np.ndarray:
+    """Function resize and filter frame in strips of tile_rows output rows.
+        Each strip takes only input rows mapped to its rows and filter_rows // 2 rows
+        of halo above and below, so the memory used by the filter is bounded
+        by the strip size and the result is identical to the whole frame.
+        Strips are kept in scratch buffers of the thread processing them.
+        With workers > 1 the calling thread and workers - 1 threads of shared pool
+        process strips at the same time, kernels release the GIL while they compute.
+
+    Args:
+        frame (np.ndarray): frame to convert
+        new_frame_shape (Tuple[int, int]): new shape after resize
+        filter_rows (int): number of rows of the filter
+        fun (Callable[..., np.ndarray]): function of one of TILE_METHODS
+            converting single frame
+        tile_rows (int, optional): number of output rows in strip, None means
+            one strip for each worker. Defaults to None.
+        workers (int, optional): number of threads processing strips. Defaults to 1.
+        out (np.ndarray, optional): array with frame dtype for the result. Defaults to None.
+
+    Returns:
+        np.ndarray: frame after resize and median filter
+    """
+    height, width = new_frame_shape
+    if out is None:
+        out = np.empty((height, width, *frame.shape[2:]), frame.dtype)
+    if tile_rows is None:
+        tile_rows = -(-height // workers)
+    rows = _resize_plan(tuple(frame.shape[:2]), tuple(new_frame_shape)).rows
+    halo = filter_rows // 2
+
+    def process_strip(start: int) -> None:
+        stop = min(start + tile_rows, height)
+        first, last = max(start - halo, 0), min(stop + halo, height)
+        strip = _scratch("tile_in", (last - first, *frame.shape[1:]), frame.dtype)
+        np.take(frame, rows[first:last], axis=0, out=strip, mode="clip")
+        shape = (last - first, width, *frame.shape[2:])
+        strip_out = _scratch("tile_out", shape, frame.dtype)
+        fun(strip, new_frame_shape=shape[:2], out=strip_out)
+        out[start:stop] = strip_out[start - first : stop - first]
+
+    starts = range(0, height, tile_rows)
+    if workers > 1 and len(starts) > 1:
+        executor = _tile_executor(workers - 1)
+        futures = [executor.submit(process_strip, start) for start in starts[1:]]
+        try:
+            process_strip(starts[0])
+        finally:
+            for future in futures:
+                future.result()
+    else:
+        for start in starts:
+            process_strip(start)
+    return out
+
+
+def _resize_median_filter_tiled_batch(
+    frames: List[np.ndarray],
+    new_frame_shape: Tuple[int, int],
+    filter_rows: int,
+    fun: Callable[..., np.ndarray],
+    tile_rows: int = None,
+    workers: int = 1,
+    out: Sequence[np.ndarray] = None,
+) -> List[np.ndarray]:
+    """Function resize and filter frames one by one in strips,
+        see _resize_median_filter_tiled.
+
+    Args:
+        frames (List[np.ndarray]): frames to convert
+        new_frame_shape (Tuple[int, int]): new shape after resize
+        filter_rows (int): number of rows of the filter
+        fun (Callable[..., np.ndarray]): function of one of TILE_METHODS
+            converting single frame
+        tile_rows (int, optional): number of output rows in strip, None means
+            one strip for each worker. Defaults to None.
+        workers (int, optional): number of threads processing strips. Defaults to 1.
+        out (Sequence[np.ndarray], optional): arrays with frame dtype for the results.
+            Defaults to None.
+
+    Returns:
+        List[np.ndarray]: frames after resize and median filter
+    """
+    targets = [None] * len(frames) if out is None else out
+    return [
+        _resize_median_filter_tiled(
+            frame, new_frame_shape, filter_rows, fun, tile_rows, workers, out=target
+        )
+        for frame, target in zip(frames, targets)
+    ]
+
+
+def _make_filter(
+    new_frame_shape: Tuple[int, int],
+    filter_shape: Tuple[int, int, int],
+    method: str = "skimage",
+    batch: bool = False,
+    tile_rows: int = None,
+    tile_workers: int = 1,
+) -> Callable[..., np.ndarray]:
+    """Function make picklable function which resizes frame and applies median filter.
+
+    Args:
+        new_frame_shape (Tuple[int, int]): final shape to reshape frame
+        filter_shape (Tuple[int, int, int]): shape of the filter to be used by median filter
+        method (str, optional): one of METHODS, see MedianFilter. Defaults to "skimage".
+        batch (bool, optional): If True function converts list of frames. Defaults to False.
+        tile_rows (int, optional): number of output rows in strip, None means
+            whole frame at once or, with tile_workers > 1, one strip for each worker.
+            Defaults to None.
+        tile_workers (int, optional): number of threads processing strips. Defaults to 1.
+
+    Raises:
+        ValueError: unknown method, filter or tiles not supported by the method.
+
+    Returns:
+        Callable[..., np.ndarray]: function converting single frame or list of frames
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method}, use one of {METHODS}.")
+    if tile_rows is not None or tile_workers > 1:
+        if method not in TILE_METHODS:
+            raise ValueError(
+                f"Method {method} can not process tiles, use one of {TILE_METHODS}."
+            )
+        if tile_rows is not None and tile_rows < 1:
+            raise ValueError(f"tile_rows has to be positive, got {tile_rows}.")
+        kernel = _resize_median_filter_tiled
+        if batch:
+            kernel = _resize_median_filter_tiled_batch
+        return partial(
+            kernel,
+            new_frame_shape=new_frame_shape,
+            filter_rows=filter_shape[0],
+            fun=_make_filter(new_frame_shape, filter_shape, method),
+            tile_rows=tile_rows,
+            workers=tile_workers,
+        )
+    if method == "fused":
+        footprint = _planar_footprint(filter_shape)
+        if footprint.size > FUSED_MAX_AREA:
+            raise ValueError(
+                f"Filter shape {filter_shape} is too large for fused method,"
+                f" use at most {FUSED_MAX_AREA} pixels."
+            )
+        kernel = _resize_median_filter_fused
+        if batch:
+            kernel = _resize_median_filter_fused_batch
+        return partial(
+            kernel,
+            new_frame_shape=new_frame_shape,
+            filter_shape=footprint.shape,
+        )
+    if method in _NATIVE_KERNELS:
+        kernel = _resize_median_filter_native
+        if batch:
+            kernel = _resize_median_filter_native_batch
+        return partial(
+            kernel,
+            new_frame_shape=new_frame_shape,
+            footprint=_planar_footprint(filter_shape),
+            kernel=_NATIVE_KERNELS[method],
+        )
+    kernel = _resize_median_filter_batch if batch else _resize_median_filter
+    return partial(
+        kernel,
+        new_frame_shape=new_frame_shape,
+        footprint=np.ones(filter_shape),
+    )
+
+
 class MedianFilter(Broker):
     """
     Takes picture frame (dimmension (m x n x k) where k is 1,3,4) from one queue,
@@ -54,6 +451,26 @@ class MedianFilter(Broker):
 
     broker.start()
     broker.join()
+
+    Parameter method = "rank" keeps uint8 and uint16 frames in their dtype
+    (nearest-neighbour resize and histogram based median) instead of float64.
+    Method = "histogram" gives exact median of uint8 frames equal to "skimage"
+    (edge repeated) in their dtype, but slower than "rank" at every filter size,
+    method = "separable" approximates median by median of rows and then columns
+    for uint8 and uint16 frames, modestly faster than "rank" for large filters.
+    For small filters (up to 7 x 7) method = "fused" resizes and filters in one pass
+    without the resized frame, several times faster than "rank".
+    Parameter pool = FramePool(...) makes filter write frames into preallocated buffers,
+    the consumer has to release them (see PictureRecorder). Pools need queues
+    passing frames by reference (queue.Queue). With method = "rank" the pooled
+    filter allocates no frames, "skimage" still allocates its float64 resize.
+    Parameter batch_size = N makes filter resize and filter up to N frames
+    stacked together (see Broker), pool has to have at least N frames.
+    Parameter tile_rows = R makes filter process frame in strips of R output rows
+    (on tile_workers threads), so memory used by the filter is bounded by the strip
+    instead of the frame, results are identical. Only methods in TILE_METHODS.
+    Parameter tile_workers = N alone splits each frame into N bands of rows filtered
+    at the same time, which cuts latency of single frame without batching.
     """
 
     COUNTER = 0
@@ -65,10 +482,21 @@ class MedianFilter(Broker):
         new_frame_shape: Tuple[int, int],
         filter_shape: Tuple[int, int, int],
         *,
+        method: str = "skimage",
+        pool: FramePool = None,
+        input_pool: FramePool = None,
         name: str = None,
         daemon: bool = None,
         verbose: bool = True,
         timeout: float = 10.0,
+        upstreams: int = 1,
+        end_of_stream: int = 1,
+        overflow: str = "block",
+        batch_size: int = 1,
+        batch_timeout: float = 0.0,
+        put_batch: bool = False,
+        tile_rows: int = None,
+        tile_workers: int = 1,
     ) -> None:
         """Initialize self.
 
@@ -78,25 +506,136 @@ class MedianFilter(Broker):
             queue_out (multiprocessing.Queue): queue for converted data.
             new_frame_shape (Tuple[int, int]): final shape to reshape data from queue_in
             filter_shape (Tuple[int, int, int]): shape of the filter to be used by median filter
+            method (str, optional): "skimage" resizes to float64 and uses skimage.filters.median.
+                "rank" keeps uint8 or uint16 frames in their dtype, resizes with
+                nearest-neighbour interpolation and uses skimage.filters.rank.median
+                per channel (filter_shape has to be (m, n, 1)).
+                "histogram" is exact median of uint8 frames, pixels outside the frame
+                repeat the edge like "skimage", slower than "rank" at every filter size.
+                "separable" approximates median by median of rows and then columns,
+                see kernels._separable_median. Both resize like "rank".
+                "fused" resizes like "rank" and filters in the same pass with filters
+                up to kernels.FUSED_MAX_AREA pixels, edge repeated like "skimage".
+                Defaults to "skimage".
+            pool (FramePool, optional): pool of frames (new_frame_shape + channels)
+                for the results, float64 for "skimage" method or frame dtype otherwise.
+                Defaults to None.
+            input_pool (FramePool, optional): pool to which frames from queue_in
+                are released after processing. Defaults to None.
             name (str, optional): the thread name. By default, a unique name is constructed of
                 the form "Thread-N" where N is a small decimal number.
             daemon (bool, optional): description below. Defaults to False.
             verbose (bool, optional): If True thread loged. Defaults to True.
             timeout (float, optional): Timeout for queue get. Defaults to 5.0.
+            upstreams (int, optional): number of END_OF_STREAM markers which end
+                the work, one for each writer of queue_in. Defaults to 1.
+            end_of_stream (int, optional): number of END_OF_STREAM markers put into queue_out
+                after the work ended by markers, one for each reader of queue_out.
+                Defaults to 1.
+            overflow (str, optional): what to do when queue_out is full: "block",
+                "drop_oldest", "drop_newest" or "latest". Dropped data are counted
+                in self.dropped. Defaults to "block".
+            batch_size (int, optional): maximum number of frames converted together.
+                Defaults to 1.
+            batch_timeout (float, optional): maximum time in seconds to wait for
+                the rest of the batch after its first frame. Defaults to 0.0.
+            put_batch (bool, optional): If True converted frames of the batch are put
+                into queue_out as one list. Defaults to False.
+            tile_rows (int, optional): number of output rows processed together,
+                None means whole frame or, with tile_workers > 1, one band of rows
+                for each thread. Defaults to None.
+            tile_workers (int, optional): number of threads processing strips of frame
+                at the same time, including the filter thread. Defaults to 1.
+
+        Raises:
+            ValueError: unknown method, tiles with method not in TILE_METHODS
+                or pool smaller than batch_size.
         """
+        self.pool = pool
+        self.input_pool = input_pool
+        self._filter = _make_filter(
+            new_frame_shape,
+            filter_shape,
+            method,
+            tile_rows=tile_rows,
+            tile_workers=tile_workers,
+        )
+        self._filter_batch = _make_filter(
+            new_frame_shape,
+            filter_shape,
+            method,
+            batch=True,
+            tile_rows=tile_rows,
+            tile_workers=tile_workers,
+        )
+        fun = self._filter
+        batch_fun = self._filter_batch if batch_size > 1 else None
+        if pool is not None or input_pool is not None:
+            fun = self._filter_pooled
+            batch_fun = self._filter_batch_pooled if batch_size > 1 else None
+        if pool is not None and pool.size < batch_size:
+            raise ValueError(f"Pool has less frames than batch_size {batch_size}.")
         if name is None:
             name = f"MedianFilter-{MedianFilter.COUNTER}"
         MedianFilter.COUNTER += 1
         super().__init__(
             queue_in,
             queue_out,
-            lambda frame: _resize_median_filter(
-                frame,
-                new_frame_shape=new_frame_shape,
-                footprint=np.ones(filter_shape),
-            ),
+            fun,
             name=name,
             daemon=daemon,
             verbose=verbose,
             timeout=timeout,
+            upstreams=upstreams,
+            end_of_stream=end_of_stream,
+            overflow=overflow,
+            batch_size=batch_size,
+            batch_timeout=batch_timeout,
+            batch_fun=batch_fun,
+            put_batch=put_batch,
         )
+
+    def _filter_pooled(self, frame: np.ndarray) -> np.ndarray:
+        """method convert frame writing result into frame from pool
+            and release input frame to its pool.
+
+        Args:
+            frame (np.ndarray): frame to convert
+
+        Returns:
+            np.ndarray: converted frame
+        """
+        out = None if self.pool is None else self.pool.acquire()
+        try:
+            return self._filter(frame, out=out)
+        except Exception:
+            if out is not None:
+                self.pool.release(out)
+            raise
+        finally:
+            if self.input_pool is not None:
+                self.input_pool.release(frame)
+
+    def _filter_batch_pooled(self, frames: List[np.ndarray]) -> List[np.ndarray]:
+        """method convert frames writing results into frames from pool
+            and release input frames to their pool.
+
+        Args:
+            frames (List[np.ndarray]): frames to convert
+
+        Returns:
+            List[np.ndarray]: converted frames
+        """
+        out = None
+        if self.pool is not None:
+            out = [self.pool.acquire() for _ in frames]
+        try:
+            return self._filter_batch(frames, out=out)
+        except Exception:
+            for frame in out or ():
+                self.pool.release(frame)
+            raise
+        finally:
+            if self.input_pool is not None:
+                for frame in frames:
+                    self.input_pool.release(frame)
@@ -0,0 +1,207 @@
+"""
+Metrics collect counters and latency histograms of pipeline stages,
+so the slowest stage can be found while the pipeline runs.
+"""
+from bisect import bisect_left
+from threading import Event, Thread
+from typing import Any, Callable, Dict, Iterable, List
+
+import numpy as np
+
+from .logs import LOGGER
+
+_BOUNDS = tuple(float(bound) for bound in np.geomspace(1e-6, 100.0, 81))
+
+
+class LatencyHistogram:
+    """
+    Histogram of durations in seconds with logarithmic buckets from 1 us to 100 s,
+    each bucket about 26% wider than previous one. Recording is O(log buckets)
+    and does not allocate, percentiles are upper bounds of their buckets.
+    """
+
+    def __init__(self) -> None:
+        """Initialize self."""
+        self.counts = [0] * (len(_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """method add one duration.
+
+        Args:
+            seconds (float): duration
+        """
+        self.counts[bisect_left(_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, percent: float) -> float:
+        """method estimate percentile of recorded durations.
+
+        Args:
+            percent (float): percentile from 0 to 100
+
+        Returns:
+            float: upper bound of bucket with the percentile, 0 if nothing was recorded
+        """
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                if bucket == len(_BOUNDS):
+                    return self.max
+                return min(_BOUNDS[bucket], self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """method return count, mean, p50, p90, p99 and max of durations.
+
+        Returns:
+            Dict[str, float]: summary of histogram
+        """
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+class StageMetrics:
+    """
+    Counters and histograms of one pipeline stage:
+    items - processed items,
+    errors - items which raised exception,
+    processing - time of processing of one item,
+    get_wait - time blocked on input queue get,
+    put_wait - time blocked on output queue put,
+    age - time from Sequenced timestamp (given by Producer) to the end of processing.
+    Metrics are written by the stage thread only, snapshots from other threads
+    can be a few items behind.
+    """
+
+    HISTOGRAMS = ("processing", "get_wait", "put_wait", "age")
+
+    def __init__(self) -> None:
+        """Initialize self."""
+        self.items = 0
+        self.errors = 0
+        self.processing = LatencyHistogram()
+        self.get_wait = LatencyHistogram()
+        self.put_wait = LatencyHistogram()
+        self.age = LatencyHistogram()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """method return current values of metrics.
+
+        Returns:
+            Dict[str, Any]: counters and summaries of histograms
+        """
+        snapshot: Dict[str, Any] = {"items": self.items, "errors": self.errors}
+        for name in self.HISTOGRAMS:
+            snapshot[name] = getattr(self, name).summary()
+        return snapshot
+
+
+def format_snapshot(snapshot: Dict[str, Any]) -> str:
+    """Function make one line of text from worker snapshot.
+
+    Args:
+        snapshot (Dict[str, Any]): snapshot made by Worker.snapshot
+
+    Returns:
+        str: line with counters and p50 / p99 of histograms in milliseconds
+    """
+    parts = [
+        f"{snapshot['name']}: items {snapshot['items']}",
+        f"errors {snapshot['errors']}",
+        f"dropped {snapshot['dropped']}",
+        f"depth {snapshot['queue_depth']}",
+    ]
+    for name in StageMetrics.HISTOGRAMS:
+        summary = snapshot[name]
+        if summary["count"]:
+            parts.append(
+                f"{name} p50 {1000 * summary['p50']:.2f} ms"
+                f" p99 {1000 * summary['p99']:.2f} ms"
+            )
+    return ", ".join(parts)
+
+
+def _log_snapshots(snapshots: List[Dict[str, Any]]) -> None:
+    """Function log one line for each snapshot.
+
+    Args:
+        snapshots (List[Dict[str, Any]]): snapshots of workers
+    """
+    for snapshot in snapshots:
+        LOGGER.info(format_snapshot(snapshot))
+
+
+class MetricsReporter(Thread):
+    """
+    Takes snapshots of workers every interval seconds and gives them to fun
+    (logs them by default) as a distinct thread, until stop is called.
+    The last snapshots are reported after stop.
+
+    Usage example:
+        reporter = MetricsReporter([producer, broker, consumer], interval=5.0)
+        reporter.start()
+        ...
+        reporter.stop()
+        reporter.join()
+    """
+
+    COUNTER = 0
+
+    def __init__(
+        self,
+        workers: Iterable[Any],
+        interval: float = 1.0,
+        fun: Callable[[List[Dict[str, Any]]], Any] = None,
+        *,
+        name: str = None,
+        daemon: bool = True,
+    ) -> None:
+        """Initialize self.
+
+        Args:
+            workers (Iterable[Worker]): workers to report
+            interval (float, optional): time between reports in seconds. Defaults to 1.0.
+            fun (Callable[[List[Dict[str, Any]]], Any], optional): function getting
+                list of snapshots. Defaults to logging one line per worker.
+            name (str, optional): the thread name. By default, a unique name is constructed of
+                the form "Thread-N" where N is a small decimal number.
+            daemon (bool, optional): description below. Defaults to True.
+        """
+        if name is None:
+            name = f"MetricsReporter-{MetricsReporter.COUNTER}"
+        MetricsReporter.COUNTER += 1
+
+        super().__init__(name=name, daemon=daemon)
+        self.workers = list(workers)
+        self.interval = interval
+        self.fun = fun or _log_snapshots
+        self._stopped = Event()
+
+    def report(self) -> None:
+        """method give current snapshots of all workers to fun."""
+        self.fun([worker.snapshot() for worker in self.workers])
+
+    def stop(self) -> None:
+        """method end reporting after the last report."""
+        self._stopped.set()
+
+    def run(self):
+        """Method representing the thread's activity."""
+        while not self._stopped.wait(self.interval):
+            self.report()
+        self.report()
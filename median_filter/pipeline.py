@@ -0,0 +1,377 @@
+"""
+Pipeline wires producers, brokers and consumers with queues,
+starts them, ends them in order and scales stages by depth of their queues.
+"""
+import queue
+from threading import Event
+from typing import Any, Callable, List, Optional, Tuple, Type
+
+from .common import END_OF_STREAM
+from .consumer import Consumer
+from .frame_queue import FrameQueue
+from .logs import LOGGER
+from .producer import Producer
+from .worker import Worker
+
+QUEUE_TYPES = ("thread", "process")
+"""Types of queues created by Pipeline:
+thread - queue.Queue passing data by reference between threads (needed by FramePool),
+process - FrameQueue pickling data with arrays out-of-band.
+"""
+
+
+class _Stage:
+    """Workers of one type reading the same input queue."""
+
+    def __init__(
+        self,
+        worker_type: Type[Worker],
+        args: Tuple[Any, ...],
+        kwargs: dict,
+        workers: int,
+        max_workers: int,
+        maxsize: Optional[int],
+    ) -> None:
+        """Initialize self.
+
+        Args:
+            worker_type (Type[Worker]): class of workers
+            args (Tuple[Any, ...]): arguments of workers after queues
+            kwargs (dict): keyword arguments of workers
+            workers (int): initial number of workers
+            max_workers (int): maximum number of workers
+            maxsize (Optional[int]): capacity of input queue, None means Pipeline default
+        """
+        self.worker_type = worker_type
+        self.args = args
+        self.kwargs = kwargs
+        self.n_workers = workers
+        self.max_workers = max_workers
+        self.maxsize = maxsize
+        self.queue_in: Any = None
+        self.queue_out: Any = None
+        self.workers: List[Worker] = []
+        self.target = workers
+        self.idle_polls = 0
+
+    @property
+    def alive(self) -> List[Worker]:
+        """List[Worker]: workers which did not end yet."""
+        return [worker for worker in self.workers if worker.is_alive()]
+
+    @property
+    def depth(self) -> int:
+        """int: number of data in input queue, 0 if unknown."""
+        if self.queue_in is None:
+            return 0
+        try:
+            return self.queue_in.qsize()
+        except NotImplementedError:
+            return 0
+
+
+class Pipeline:
+    """
+    Pipeline of stages added in order of data flow: Producer, any brokers, Consumer.
+    Each stage has its own number of workers reading one input queue. Pipeline creates
+    the queues, gives them to workers before other arguments, starts the workers
+    and, when all workers of a stage ended, puts END_OF_STREAM markers for the next stage,
+    so stages end in order after the producers. If any worker fails, or its function
+    fails on more than max_errors items, producers stop and join raises RuntimeError
+    after the rest of data is processed. Data for stages whose workers all ended
+    are dropped then, so workers blocked on full queues can end.
+    Stage with max_workers > workers gets new worker when its input queue has
+    more than high_water data per worker, and loses one (by END_OF_STREAM marker)
+    when the queue was empty for idle_polls polls.
+
+    Usage example:
+        pipeline = Pipeline(maxsize=16)
+        pipeline.add(Producer, lambda: (next(counter), producer_foo()), interval)
+        pipeline.add(MedianFilter, (512, 384), (5, 5, 1), workers=2, max_workers=4)
+        pipeline.add(PictureRecorder, folder_name, file_name)
+        pipeline.run()
+    """
+
+    def __init__(
+        self,
+        *,
+        queue_type: str = "thread",
+        maxsize: int = 0,
+        poll_interval: float = 0.1,
+        high_water: int = 2,
+        idle_polls: int = 10,
+        max_errors: int = 0,
+    ) -> None:
+        """Initialize self.
+
+        Args:
+            queue_type (str, optional): "thread" or "process", see QUEUE_TYPES.
+                Defaults to "thread".
+            maxsize (int, optional): capacity of queues, 0 means unbounded. Defaults to 0.
+            poll_interval (float, optional): time between checks of workers and queues
+                in seconds. Defaults to 0.1.
+            high_water (int, optional): depth of input queue per worker above which
+                stage gets new worker. Defaults to 2.
+            idle_polls (int, optional): number of polls with empty input queue after which
+                stage loses one worker. Defaults to 10.
+            max_errors (int, optional): number of items, which function of one worker
+                can fail on (see StageMetrics.errors), before the pipeline is stopped
+                and join raises RuntimeError. Defaults to 0.
+
+        Raises:
+            ValueError: unknown queue type.
+        """
+        if queue_type not in QUEUE_TYPES:
+            raise ValueError(
+                f"Unknown queue type {queue_type}, use one of {QUEUE_TYPES}."
+            )
+        self.queue_type = queue_type
+        self.maxsize = maxsize
+        self.poll_interval = poll_interval
+        self.high_water = high_water
+        self.idle_polls = idle_polls
+        self.max_errors = max_errors
+        self.stages: List[_Stage] = []
+        self.errors: List[Tuple[Worker, BaseException]] = []
+        self._stopping = Event()
+        self._started = False
+
+    def add(
+        self,
+        worker_type: Type[Worker],
+        *args: Any,
+        workers: int = 1,
+        max_workers: int = None,
+        maxsize: int = None,
+        **kwargs: Any,
+    ) -> "Pipeline":
+        """method add stage at the end of pipeline.
+
+        Args:
+            worker_type (Type[Worker]): Producer, Consumer or broker class, its workers get
+                input queue (except Producer) and output queue (except Consumer)
+                as first arguments
+            args (Any): next arguments of workers
+            workers (int, optional): number of workers. Defaults to 1.
+            max_workers (int, optional): maximum number of workers when stage is scaled,
+                None means no scaling. Defaults to None.
+            maxsize (int, optional): capacity of input queue of the stage,
+                None means capacity of Pipeline. Defaults to None.
+            kwargs (Any): keyword arguments of workers
+
+        Raises:
+            RuntimeError: pipeline was started.
+
+        Returns:
+            Pipeline: self
+        """
+        if self._started:
+            raise RuntimeError("Stages can not be added to started pipeline.")
+        stage = _Stage(
+            worker_type, args, kwargs, workers, max_workers or workers, maxsize
+        )
+        self.stages.append(stage)
+        return self
+
+    def _make_queue(self, maxsize: Optional[int]) -> Any:
+        """method create queue of the pipeline type.
+
+        Args:
+            maxsize (Optional[int]): capacity, None means capacity of Pipeline
+
+        Returns:
+            queue.Queue | FrameQueue: new queue
+        """
+        if maxsize is None:
+            maxsize = self.maxsize
+        if self.queue_type == "process":
+            return FrameQueue(maxsize)
+        return queue.Queue(maxsize)
+
+    def _guard(self, worker: Worker) -> Callable[[], None]:
+        """method wrap run of worker, so its failure stops the pipeline.
+
+        Args:
+            worker (Worker): worker of the pipeline
+
+        Returns:
+            Callable[[], None]: run method recording exceptions
+        """
+        run = worker.run
+
+        def guarded_run() -> None:
+            try:
+                run()
+            except BaseException as error:
+                self.errors.append((worker, error))
+                self.stop()
+                raise
+
+        return guarded_run
+
+    def _stoppable(self, fun: Callable[[], Tuple[bool, Any]]) -> Callable[[], Any]:
+        """method wrap producing function, so it ends after stop.
+
+        Args:
+            fun (Callable[[], Tuple[bool, Any]]): function of Producer
+
+        Returns:
+            Callable[[], Any]: function returning (False, None) after stop
+        """
+
+        def stoppable_fun() -> Tuple[bool, Any]:
+            if self._stopping.is_set():
+                return False, None
+            return fun()
+
+        return stoppable_fun
+
+    def _spawn(self, stage: _Stage) -> Worker:
+        """method create and start worker of stage.
+
+        Args:
+            stage (_Stage): stage of the pipeline
+
+        Returns:
+            Worker: started worker
+        """
+        queues = [q for q in (stage.queue_in, stage.queue_out) if q is not None]
+        kwargs = dict(stage.kwargs)
+        if issubclass(stage.worker_type, Producer):
+            kwargs.setdefault("end_of_stream", 0)
+        else:
+            kwargs.setdefault("timeout", None)
+            kwargs.setdefault("upstreams", 1)
+            if not issubclass(stage.worker_type, Consumer):
+                kwargs.setdefault("end_of_stream", 0)
+        worker = stage.worker_type(*queues, *stage.args, **kwargs)
+        if isinstance(worker, Producer):
+            worker.fun = self._stoppable(worker.fun)
+        worker.run = self._guard(worker)
+        stage.workers.append(worker)
+        worker.start()
+        return worker
+
+    def start(self) -> None:
+        """method create queues and start all workers.
+
+        Raises:
+            ValueError: pipeline does not start with Producer or end with Consumer.
+        """
+        stages = self.stages
+        if len(stages) < 2 or not issubclass(stages[0].worker_type, Producer):
+            raise ValueError("Pipeline has to start with Producer stage.")
+        if not issubclass(stages[-1].worker_type, Consumer):
+            raise ValueError("Pipeline has to end with Consumer stage.")
+        self._started = True
+        for previous, stage in zip(stages, stages[1:]):
+            stage.queue_in = previous.queue_out = self._make_queue(stage.maxsize)
+        for stage in reversed(stages):
+            for _ in range(stage.n_workers):
+                self._spawn(stage)
+
+    def _scale(self, stage: _Stage, ended: bool) -> None:
+        """method add or retire worker of stage according to depth of its input queue.
+
+        Args:
+            stage (_Stage): stage with input queue
+            ended (bool): True if END_OF_STREAM markers were already put for the stage,
+                so new worker needs its own marker
+        """
+        depth = stage.depth
+        stage.idle_polls = stage.idle_polls + 1 if depth == 0 else 0
+        if depth > self.high_water * stage.target and stage.target < stage.max_workers:
+            self._spawn(stage)
+            stage.target += 1
+            if ended:
+                stage.queue_in.put(END_OF_STREAM)
+        elif stage.idle_polls >= self.idle_polls and stage.target > stage.n_workers:
+            stage.queue_in.put(END_OF_STREAM)
+            stage.target -= 1
+            stage.idle_polls = 0
+
+    def _check_errors(self) -> None:
+        """method stop pipeline when function of worker failed on more than
+        max_errors items."""
+        failed = {id(worker) for worker, _ in self.errors}
+        for stage in self.stages:
+            for worker in stage.workers:
+                errors = worker.metrics.errors
+                if errors > self.max_errors and id(worker) not in failed:
+                    error = RuntimeError(f"function failed on {errors} items")
+                    self.errors.append((worker, error))
+                    self.stop()
+
+    def _drain_dead(self) -> None:
+        """method drop data from input queues of stages without running workers,
+        so workers blocked on put into bounded queue can end after stop."""
+        for stage in self.stages[1:]:
+            if stage.workers and not stage.alive:
+                dropped = 0
+                try:
+                    while 1:
+                        stage.queue_in.get_nowait()
+                        dropped += 1
+                except queue.Empty:
+                    pass
+                if dropped:
+                    LOGGER.error("%d items dropped before ended stage.", dropped)
+
+    def _put_marker(self, stage: _Stage) -> None:
+        """method put END_OF_STREAM marker into input queue of stage, dropping data
+        for ended stages while the queue is full after stop.
+
+        Args:
+            stage (_Stage): stage getting the marker
+        """
+        while 1:
+            try:
+                stage.queue_in.put(END_OF_STREAM, timeout=self.poll_interval)
+                return
+            except queue.Full:
+                if self._stopping.is_set():
+                    self._drain_dead()
+
+    def join(self) -> None:
+        """method wait until all stages end, putting END_OF_STREAM markers
+        between stages and scaling stages meanwhile. After stop, data for stages
+        whose workers all ended are dropped, so the other stages do not block.
+
+        Raises:
+            RuntimeError: worker of the pipeline failed.
+        """
+        for i, stage in enumerate(self.stages):
+            while stage.alive:
+                stage.alive[0].join(self.poll_interval)
+                self._check_errors()
+                if self._stopping.is_set():
+                    self._drain_dead()
+                for j in range(max(i, 1), len(self.stages)):
+                    if self.stages[j].max_workers > self.stages[j].n_workers:
+                        self._scale(self.stages[j], ended=j == i)
+            if i + 1 < len(self.stages):
+                next_stage = self.stages[i + 1]
+                for _ in next_stage.alive:
+                    self._put_marker(next_stage)
+        self._check_errors()
+        if self.errors:
+            worker, error = self.errors[0]
+            raise RuntimeError(f"Worker {worker.name} failed: {error!r}") from error
+
+    def run(self) -> None:
+        """method start pipeline and wait until it ends."""
+        self.start()
+        self.join()
+
+    def stop(self) -> None:
+        """method make producers end, the rest of data goes through the pipeline,
+        join drops data for stages which already ended."""
+        self._stopping.set()
+
+    def snapshot(self) -> List[dict]:
+        """method return snapshots of all workers, see Worker.snapshot.
+
+        Returns:
+            List[dict]: snapshots of workers
+        """
+        return [worker.snapshot() for stage in self.stages for worker in stage.workers]
@@ -0,0 +1,378 @@
+"""
+Process pool median filter is special broker which spreads frames
+across worker processes. Frames are passed to the processes through
+shared memory, so only small handles are pickled.
+"""
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import Queue
+from multiprocessing.shared_memory import SharedMemory
+from queue import Empty
+from time import perf_counter
+from typing import Any, Callable, Deque, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .broker import Broker
+from .common import END_OF_STREAM, Sequenced
+from .frame_pool import FramePool
+from .median_filter import _make_filter
+
+POLL_INTERVAL = 0.005
+"""Timeout for queue get in seconds while frames are being converted."""
+
+
+class _Block(NamedTuple):
+    """Handle of array in shared memory, shape None means shape of the result."""
+
+    name: str
+    offset: int
+    shape: Optional[Tuple[int, ...]]
+    dtype: Optional[str]
+
+
+def _filter_slot(
+    fun: Callable[..., np.ndarray],
+    source: _Block,
+    target: _Block,
+) -> Tuple[Tuple[int, ...], str]:
+    """Function run in worker process. Converts frame from one shared memory block
+        and writes the result to another.
+
+    Args:
+        fun (Callable[..., np.ndarray]): function converting single frame
+        source (_Block): frame to convert
+        target (_Block): place for converted frame. If its shape is known
+            the result is written directly there by fun(frame, out=...).
+
+    Returns:
+        Tuple[Tuple[int, ...], str]: shape and dtype of converted frame
+    """
+    shm_in = SharedMemory(name=source.name)
+    shm_out = SharedMemory(name=target.name)
+    try:
+        frame = np.ndarray(
+            source.shape, source.dtype, buffer=shm_in.buf, offset=source.offset
+        )
+        if target.shape is not None:
+            out = np.ndarray(
+                target.shape, target.dtype, buffer=shm_out.buf, offset=target.offset
+            )
+            fun(frame, out=out)
+        else:
+            result = fun(frame)
+            out = np.ndarray(result.shape, result.dtype, buffer=shm_out.buf)
+            out[...] = result
+        shape, dtype = out.shape, out.dtype.str
+        del frame, out
+        return shape, dtype
+    finally:
+        shm_in.close()
+        shm_out.close()
+
+
+class _Slot:
+    """Shared memory blocks for one frame in flight, used when frames do not come
+    from shared FramePool."""
+
+    def __init__(self) -> None:
+        """Initialize self."""
+        self.shm_in: Optional[SharedMemory] = None
+        self.shm_out: Optional[SharedMemory] = None
+
+    @staticmethod
+    def fit(shm: Optional[SharedMemory], nbytes: int) -> SharedMemory:
+        """method return shm if it is big enough, otherwise new block.
+
+        Args:
+            shm (Optional[SharedMemory]): current block
+            nbytes (int): required size
+
+        Returns:
+            SharedMemory: block with at least nbytes
+        """
+        if shm is not None and shm.size >= nbytes:
+            return shm
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+        return SharedMemory(create=True, size=max(nbytes, 1))
+
+    def close(self) -> None:
+        """method release shared memory blocks."""
+        for shm in (self.shm_in, self.shm_out):
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self.shm_in = None
+        self.shm_out = None
+
+
+class _Task(NamedTuple):
+    """Frame in flight."""
+
+    future: Future
+    slot: _Slot
+    sequenced: Optional[Sequenced]
+    frame_in: Optional[np.ndarray]
+    frame_out: Optional[np.ndarray]
+    started: float
+
+
+class ProcessPoolMedianFilter(Broker):
+    """
+    Takes picture frame (dimmension (m x n x k) where k is 1,3,4) from one queue,
+        converts it on one of N worker processes, and puts it into another
+        in the order of arrival as a distinct thread.
+    Frames from shared input_pool (or their indexes in input_pool) are read by
+    the processes in place and results are written directly into frames of
+    shared pool, so only handles are pickled and queue_in / queue_out should be
+    queue.Queue passing frames by reference. Other frames are copied into
+    the filter's own shared memory and results are copied out of it.
+    Example use:
+
+    queue0: Queue = Queue()
+    queue1: Queue = Queue()
+
+    broker = ProcessPoolMedianFilter(
+        queue_in=queue0,
+        queue_out=queue1,
+        new_frame_shape=(512, 384),
+        filter_shape=(5, 5, 1),
+        processes=4,
+    )
+
+    broker.start()
+    broker.join()
+    """
+
+    COUNTER = 0
+
+    def __init__(
+        self,
+        queue_in: Queue,
+        queue_out: Queue,
+        new_frame_shape: Tuple[int, int],
+        filter_shape: Tuple[int, int, int],
+        *,
+        processes: int = None,
+        slots: int = None,
+        method: str = "skimage",
+        pool: FramePool = None,
+        input_pool: FramePool = None,
+        name: str = None,
+        daemon: bool = None,
+        verbose: bool = True,
+        timeout: float = 10.0,
+        upstreams: int = 1,
+        end_of_stream: int = 1,
+        overflow: str = "block",
+    ) -> None:
+        """Initialize self.
+
+        Args:
+            queue_in (multiprocessing.Queue): queue with array to convert.
+                Array have to has dimension (m x n x k), where k can be 1,3,4.
+            queue_out (multiprocessing.Queue): queue for converted data.
+            new_frame_shape (Tuple[int, int]): final shape to reshape data from queue_in
+            filter_shape (Tuple[int, int, int]): shape of the filter to be used by median filter
+            processes (int, optional): number of worker processes. Defaults to os.cpu_count().
+            slots (int, optional): number of frames in flight (shared memory slots).
+                Defaults to 2 * processes.
+            method (str, optional): one of METHODS, see MedianFilter. Defaults to "skimage".
+            pool (FramePool, optional): shared pool of frames for the results,
+                the consumer has to release them. Defaults to None.
+            input_pool (FramePool, optional): shared pool from which frames (or their
+                indexes) come in queue_in, frames are released after processing.
+                Defaults to None.
+            name (str, optional): the thread name. By default, a unique name is constructed of
+                the form "Thread-N" where N is a small decimal number.
+            daemon (bool, optional): description below. Defaults to False.
+            verbose (bool, optional): If True thread loged. Defaults to True.
+            timeout (float, optional): Timeout for queue get. Defaults to 10.0.
+            upstreams (int, optional): number of END_OF_STREAM markers which end
+                the work, one for each writer of queue_in. Defaults to 1.
+            end_of_stream (int, optional): number of END_OF_STREAM markers put into queue_out
+                after the work ended by markers, one for each reader of queue_out.
+                Defaults to 1.
+            overflow (str, optional): what to do when queue_out is full: "block",
+                "drop_oldest", "drop_newest" or "latest". Dropped data are counted
+                in self.dropped. Defaults to "block".
+        """
+        fun = _make_filter(new_frame_shape, filter_shape, method)
+        for frame_pool in (pool, input_pool):
+            if frame_pool is not None and not frame_pool.shared:
+                raise ValueError("ProcessPoolMedianFilter needs shared FramePool.")
+        if name is None:
+            name = f"ProcessPoolMedianFilter-{ProcessPoolMedianFilter.COUNTER}"
+        ProcessPoolMedianFilter.COUNTER += 1
+        super().__init__(
+            queue_in,
+            queue_out,
+            fun,
+            name=name,
+            daemon=daemon,
+            verbose=verbose,
+            timeout=timeout,
+            upstreams=upstreams,
+            end_of_stream=end_of_stream,
+            overflow=overflow,
+        )
+        self.new_frame_shape = new_frame_shape
+        self.processes = processes or os.cpu_count() or 1
+        self.n_slots = slots or 2 * self.processes
+        self.pool = pool
+        self.input_pool = input_pool
+
+    def _out_nbytes(self, frame: np.ndarray) -> int:
+        """method return maximum size of converted frame.
+
+        Args:
+            frame (np.ndarray): frame to convert
+
+        Returns:
+            int: size in bytes (converted frames are at most float64)
+        """
+        channels = int(np.prod(frame.shape[2:]))
+        itemsize = max(frame.itemsize, np.dtype("float64").itemsize)
+        return int(np.prod(self.new_frame_shape)) * channels * itemsize
+
+    def _frame_block(
+        self, slot: _Slot, data: Any
+    ) -> Tuple[_Block, Optional[np.ndarray]]:
+        """method find frame in shared memory or copy it to slot.
+
+        Args:
+            slot (_Slot): free slot
+            data (Any): frame or index of frame in input_pool
+
+        Returns:
+            Tuple[_Block, Optional[np.ndarray]]: handle of frame and frame from input_pool
+        """
+        pool = self.input_pool
+        if pool is not None:
+            index = data if isinstance(data, (int, np.integer)) else pool.index(data)
+            if index is not None:
+                name, offset = pool.location(index)
+                block = _Block(name, offset, pool.shape, pool.dtype.str)
+                return block, pool.frame(index)
+        frame = np.asarray(data)
+        slot.shm_in = slot.fit(slot.shm_in, frame.nbytes)
+        view = np.ndarray(frame.shape, frame.dtype, buffer=slot.shm_in.buf)
+        view[...] = frame
+        del view
+        return _Block(slot.shm_in.name, 0, frame.shape, frame.dtype.str), None
+
+    def _result_block(
+        self, slot: _Slot, source: _Block
+    ) -> Tuple[_Block, Optional[np.ndarray]]:
+        """method get frame from pool or slot for converted frame.
+
+        Args:
+            slot (_Slot): slot of the frame
+            source (_Block): handle of frame to convert
+
+        Returns:
+            Tuple[_Block, Optional[np.ndarray]]: handle of place for result and frame from pool
+        """
+        if self.pool is not None:
+            frame = self.pool.acquire()
+            name, offset = self.pool.location(self.pool.index(frame))
+            return _Block(name, offset, self.pool.shape, self.pool.dtype.str), frame
+        nbytes = self._out_nbytes(np.empty(source.shape, source.dtype))
+        slot.shm_out = slot.fit(slot.shm_out, nbytes)
+        return _Block(slot.shm_out.name, 0, None, None), None
+
+    def _submit(self, executor: ProcessPoolExecutor, slot: _Slot, data: Any) -> _Task:
+        """method submit conversion of frame.
+
+        Args:
+            executor (ProcessPoolExecutor): pool of worker processes
+            slot (_Slot): free slot
+            data (Any): frame, index of frame in input_pool or Sequenced with them
+
+        Returns:
+            _Task: frame in flight
+        """
+        started = perf_counter()
+        sequenced = data if isinstance(data, Sequenced) else None
+        if sequenced is not None:
+            data = sequenced.data
+        source, frame_in = self._frame_block(slot, data)
+        target, frame_out = self._result_block(slot, source)
+        future = executor.submit(_filter_slot, self.fun, source, target)
+        return _Task(future, slot, sequenced, frame_in, frame_out, started)
+
+    def _collect(self, task: _Task) -> None:
+        """method wait for conversion and put converted frame into queue_out.
+
+        Args:
+            task (_Task): frame in flight
+        """
+        try:
+            shape, dtype = task.future.result()
+        except Exception as error:  # pylint: disable = broad-exception-caught
+            self.metrics.errors += 1
+            self.warning(str(error))
+            if task.frame_out is not None:
+                self.pool.release(task.frame_out)
+            return
+        finally:
+            if task.frame_in is not None:
+                self.input_pool.release(task.frame_in)
+        self.record_item(task.started, task.sequenced)
+        if task.frame_out is not None:
+            out = task.frame_out
+        else:
+            buffer = task.slot.shm_out.buf
+            out = np.ndarray(shape, dtype=dtype, buffer=buffer).copy()
+        if task.sequenced is not None:
+            out = task.sequenced._replace(data=out)
+        self.put(self.queue_out, out)
+        self.log_item("Processing completed.")
+
+    def run(self):
+        """Method representing the thread's activity."""
+        slots: List[_Slot] = [_Slot() for _ in range(self.n_slots)]
+        free: List[_Slot] = list(slots)
+        pending: Deque[_Task] = deque()
+
+        def collect() -> None:
+            task = pending.popleft()
+            self._collect(task)
+            free.append(task.slot)
+
+        try:
+            with ProcessPoolExecutor(self.processes) as executor:
+                while 1:
+                    while pending and pending[0].future.done():
+                        collect()
+                    if not free:
+                        collect()
+                    timeout = self.timeout
+                    if pending:
+                        timeout = POLL_INTERVAL
+                    try:
+                        data = self.get(self.queue_in, timeout)
+                    except Empty:
+                        if pending:
+                            continue
+                        break
+                    if data is END_OF_STREAM:
+                        break
+                    self.log_item("Processing has started.")
+                    slot = free.pop()
+                    try:
+                        pending.append(self._submit(executor, slot, data))
+                    except Exception as error:  # pylint: disable = broad-exception-caught
+                        self.warning(str(error))
+                        free.append(slot)
+                while pending:
+                    collect()
+            self.report_dropped()
+            if self.ended:
+                self.send_end_of_stream(self.queue_out, self.end_of_stream)
+        finally:
+            for slot in slots:
+                slot.close()
@@ -3,16 +3,27 @@ Producer is worker on single thread which takes data from one queue, and consume
 According to the Producer-Consumer Paradigm.
 """
 from multiprocessing import Queue
-from time import sleep
+from time import monotonic, perf_counter, sleep
 from typing import Any, Callable, Tuple
 
+from .stage import ScheduleMixin
 from .worker import Worker
 
 
-class Producer(Worker):
+class Producer(ScheduleMixin, Worker):
     """
     Takes data and puts it into queue as a distinct thread.
 
+    With end_of_stream = n producer puts n END_OF_STREAM markers when it ends,
+    so n readers of queue stop immediately instead of waiting for timeout.
+
+    For live sources use bounded queue (Queue(maxsize)) with overflow policy
+    other than "block", so slow readers do not increase memory and latency.
+
+    With schedule = "catch_up" or "skip" data are started at fixed rate
+    of monotonic clock instead of sleeping interval after each data.
+    Delay of each start after its tick is measured in mean_jitter and max_jitter.
+
     Usage example:
         counter = set_n_steps(n_steps)
         queue0: Queue = Queue()
@@ -43,6 +54,10 @@ class Producer(Worker):
         name: str = None,
         daemon: bool = None,
         verbose: bool = True,
+        sequence: bool = False,
+        end_of_stream: int = 0,
+        overflow: str = "block",
+        schedule: str = "sleep",
     ) -> None:
         """Initialize self.
 
@@ -55,26 +70,69 @@ class Producer(Worker):
                 the form "Thread-N" where N is a small decimal number.
             daemon (bool, optional): description below. Defaults to None.
             verbose (bool, optional): If True thread loged. Defaults to True.
+            sequence (bool, optional): If True data are wrapped in Sequenced with
+                consecutive index, so ReorderBuffer can restore their order. Defaults to False.
+            end_of_stream (int, optional): number of END_OF_STREAM markers put into queue
+                when fun returns (False, ...), one for each reader of queue. Defaults to 0.
+            overflow (str, optional): what to do when queue is full: "block",
+                "drop_oldest", "drop_newest" or "latest". Dropped data are counted
+                in self.dropped. Defaults to "block".
+            schedule (str, optional): how interval is kept: "sleep", "catch_up" or "skip",
+                see common.SCHEDULES. Defaults to "sleep".
+
+        Raises:
+            ValueError: unknown schedule.
         """
         if name is None:
             name = f"Producer-{Producer.COUNTER}"
         Producer.COUNTER += 1
 
-        super().__init__(name=name, daemon=daemon, verbose=verbose)
+        Worker.__init__(
+            self, name=name, daemon=daemon, verbose=verbose, overflow=overflow
+        )
+        ScheduleMixin.__init__(self, interval, schedule=schedule, sequence=sequence)
         self.queue = queue
-        self.interval = interval
         self.fun = fun
+        self.end_of_stream = end_of_stream
+
+    def _watched_queue(self) -> Queue:
+        """Return output queue, Producer has no input queue.
+
+        Returns:
+            multiprocessing.Queue: output queue
+        """
+        return self.queue
+
+    def _wait(self, tick: float) -> None:
+        """method sleep until tick and measure the delay after it.
+
+        Args:
+            tick (float): time of monotonic clock
+        """
+        delay = tick - monotonic()
+        if delay > 0:
+            sleep(delay)
+        self._record_tick(tick, monotonic())
 
     def run(self):
         """Method representing the thread's activity."""
+        tick = monotonic()
         while 1:
+            self._wait(tick)
+            started = perf_counter()
             try:
                 processing, data = self.fun()
             except Exception as error:  # pylint: disable = broad-exception-caught
+                self.metrics.errors += 1
                 self.warning(str(error))
                 continue
             if not processing:
                 break
-            self.queue.put(data)
-            self.log("Produced data.")
-            sleep(self.interval)
+            self.record_item(started)
+            data = self._sequenced(data, monotonic())
+            self.put(self.queue, data)
+            self.log_item("Produced data.")
+            tick = self._next_tick(tick, monotonic())
+        self.report_dropped()
+        self.report_jitter()
+        self.send_end_of_stream(self.queue, self.end_of_stream)
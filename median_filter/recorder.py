@@ -3,13 +3,32 @@ Recorder is special consumer which get picture from queue,
 and save it.
 """
 import os
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
 from multiprocessing import Queue
 from threading import Lock
+from typing import Deque, Optional
 
 import numpy as np
 from skimage.io import imsave
 
 from .consumer import Consumer
+from .frame_pool import FramePool
+
+
+def _write_picture(name: str, frame: np.ndarray) -> None:
+    """Function encode frame and write it to file, run also in writer processes.
+
+    Args:
+        name (str): path of the file
+        frame (np.ndarray): frame representing the picture.
+            Float frames have values in [0, 1], integer frames are saved as they are.
+    """
+    if frame.shape[-1] == 1:
+        frame = frame[:, :, 0]
+    if frame.dtype.kind == "f":
+        frame = (255 * frame).astype(np.dtype("uint8"))
+    imsave(name, arr=frame)
 
 
 class _Recorder:
@@ -58,21 +77,22 @@ class _Recorder:
         """save frame to file.
 
         Args:
-            frame (np.ndarray): frame representing the picture
+            frame (np.ndarray): frame representing the picture.
+                Float frames have values in [0, 1], integer frames are saved as they are.
         """
-        name = self._new_name()
-        if frame.shape[-1] == 1:
-            frame = frame[:, :, 0]
-        imsave(
-            name,
-            arr=(255 * frame).astype(np.dtype("uint8")),
-        )
+        _write_picture(self._new_name(), frame)
 
 
 class PictureRecorder(Consumer):
     """
     Takes picture data from queue and save them as picture in set folder.
-    Parameter previous_recorder = consumer0 let save pictures on some threads and save order
+    Parameter writers = n makes recorder encode and write pictures on n threads
+    (or processes with processes = True) with at most max_in_flight pictures waiting.
+    Names are given when pictures are taken from queue, so numbers follow the order
+    of queue also with many writers. All pictures are written before the thread ends.
+    Parameter previous_recorder = consumer0 let save pictures on some threads
+    with common numbering. Numbers follow the order of taking pictures from queue,
+    so put ReorderBuffer before recorders if frames come from parallel brokers.
     example use:
 
         folder_name = "folder_name"
@@ -87,6 +107,10 @@ class PictureRecorder(Consumer):
         consumer1.start()
         consumer0.join()
         consumer1.join()
+
+    or with one recorder and writer pool:
+
+        consumer = PictureRecorder(queue1, folder_name, file_name, writers=4)
     """
 
     COUNTER = 0
@@ -99,10 +123,15 @@ class PictureRecorder(Consumer):
         file_ext: str = "png",
         *,
         previous_recorder=None,
+        pool: FramePool = None,
+        writers: int = 0,
+        processes: bool = False,
+        max_in_flight: int = None,
         name=None,
         daemon=None,
         verbose: bool = True,
         timeout: float = 10.0,
+        upstreams: int = 1,
     ) -> None:
         """
         Args:
@@ -111,10 +140,20 @@ class PictureRecorder(Consumer):
             file_name (str): name pattern to save pictures.
             file_ext (str, optional): Extension for file to record. Defaults to "png".
             previous_recorder (PictureRecorder, optional): Prievious PictureRecorder.
-                this case let save pictures on some threads and save order. Defaults to None.
+                this case let save pictures on some threads with common numbering.
+                Defaults to None.
+            pool (FramePool, optional): pool to which pictures are released after saving.
+                Defaults to None.
+            writers (int, optional): number of threads or processes encoding and writing
+                pictures, 0 means writing on the recorder thread. Defaults to 0.
+            processes (bool, optional): If True writers are processes. Defaults to False.
+            max_in_flight (int, optional): maximum number of pictures given to writers
+                and not written yet. Defaults to 2 * writers.
             daemon (bool, optional): description below. Defaults to False.
             verbose (bool, optional): If True thread loged. Defaults to True.
             timeout (float, optional): Timeout for queue get. Defaults to 5.0.
+            upstreams (int, optional): number of END_OF_STREAM markers which end
+                the work, one for each writer of queue. Defaults to 1.
         """
         if previous_recorder is None:
             self._rec = _Recorder(folder_name, file_name, file_ext=file_ext)
@@ -123,12 +162,70 @@ class PictureRecorder(Consumer):
         if name is None:
             name = f"PictureRecorder-{PictureRecorder.COUNTER}"
         PictureRecorder.COUNTER += 1
+        self.pool = pool
+        self.writers = writers
+        self.processes = processes
+        self.max_in_flight = max_in_flight or 2 * writers
+        self._executor: Optional[Executor] = None
+        self._in_flight: Deque[Future] = deque()
+        fun = self._rec.save_to_file if pool is None else self._save_and_release
+        if writers:
+            fun = self._submit
 
         super().__init__(
             queue,
-            self._rec.save_to_file,
+            fun,
             name=name,
             daemon=daemon,
             verbose=verbose,
             timeout=timeout,
+            upstreams=upstreams,
         )
+
+    def _save_and_release(self, frame: np.ndarray) -> None:
+        """method save frame to file and release it to pool.
+
+        Args:
+            frame (np.ndarray): frame representing the picture
+        """
+        try:
+            self._rec.save_to_file(frame)
+        finally:
+            self.pool.release(frame)
+
+    def _submit(self, frame: np.ndarray) -> None:
+        """method give frame with its name to writers, waiting while
+            max_in_flight pictures are not written yet.
+
+        Args:
+            frame (np.ndarray): frame representing the picture
+        """
+        while len(self._in_flight) >= self.max_in_flight:
+            self._wait_oldest()
+        future = self._executor.submit(_write_picture, self._rec._new_name(), frame)
+        if self.pool is not None:
+            future.add_done_callback(lambda _: self.pool.release(frame))
+        self._in_flight.append(future)
+
+    def _wait_oldest(self) -> None:
+        """method wait until the oldest picture in flight is written."""
+        future = self._in_flight.popleft()
+        try:
+            future.result()
+        except Exception as error:  # pylint: disable = broad-exception-caught
+            self.warning(str(error))
+
+    def run(self):
+        """Method representing the thread's activity."""
+        if not self.writers:
+            super().run()
+            return
+        executor_type = ProcessPoolExecutor if self.processes else ThreadPoolExecutor
+        self._executor = executor_type(self.writers)
+        with self._executor:
+            try:
+                super().run()
+            finally:
+                while self._in_flight:
+                    self._wait_oldest()
+        self.log("All pictures written.")
@@ -0,0 +1,178 @@
+"""
+Reorder buffer is worker on single thread which takes sequenced data from one queue,
+and puts it into another strictly in the order given by the Producer.
+"""
+import heapq
+from multiprocessing import Queue
+from queue import Empty
+from time import monotonic
+from typing import List, Optional, Tuple
+
+from .common import END_OF_STREAM, Sequenced
+from .worker import Worker
+
+
+class ReorderBuffer(Worker):
+    """
+    Takes Sequenced data from queue, which can be scrambled by parallel brokers,
+        and puts them into another queue in order of their index as distinct thread.
+    Missing indexes are skipped when more than window items wait
+    or when no item could be put for max_latency seconds.
+
+    Usage example:
+        queue0: Queue = Queue()
+        queue1: Queue = Queue()
+        queue2: Queue = Queue()
+
+        producer = Producer(queue0, producer_foo, interval, sequence=True)
+        brokers = [Broker(queue0, queue1, broker_foo) for _ in range(4)]
+        reorder = ReorderBuffer(queue1, queue2, window=16)
+        consumer = Consumer(queue2, consumer_foo)
+    """
+
+    COUNTER = 0
+
+    def __init__(
+        self,
+        queue_in: Queue,
+        queue_out: Queue,
+        *,
+        window: int = 64,
+        max_latency: float = None,
+        start: int = 0,
+        name: str = None,
+        daemon: bool = None,
+        verbose: bool = True,
+        timeout: float = 10.0,
+        upstreams: int = 1,
+        end_of_stream: int = 1,
+    ) -> None:
+        """Initialize self.
+
+        Args:
+            queue_in (multiprocessing.Queue): queue with Sequenced data in any order.
+            queue_out (multiprocessing.Queue): queue for Sequenced data in order.
+            window (int, optional): maximum number of items waiting for a missing index.
+                Defaults to 64.
+            max_latency (float, optional): maximum time in seconds which an item waits
+                for a missing index. None means no limit. Defaults to None.
+            start (int, optional): first expected index. Defaults to 0.
+            name (str, optional): the thread name. By default, a unique name is constructed of
+                the form "Thread-N" where N is a small decimal number.
+            daemon (bool, optional): description below. Defaults to None.
+            verbose (bool, optional): If True thread loged. Defaults to True.
+            timeout (float, optional): Timeout for queue get. Defaults to 10.0.
+            upstreams (int, optional): number of END_OF_STREAM markers which end
+                the work, one for each writer of queue_in. Defaults to 1.
+            end_of_stream (int, optional): number of END_OF_STREAM markers put into queue_out
+                after the work ended by markers, one for each reader of queue_out.
+                Defaults to 1.
+        """
+        if name is None:
+            name = f"ReorderBuffer-{ReorderBuffer.COUNTER}"
+        ReorderBuffer.COUNTER += 1
+
+        super().__init__(name=name, daemon=daemon, verbose=verbose)
+        self.queue_in = queue_in
+        self.queue_out = queue_out
+        self.window = window
+        self.max_latency = max_latency
+        self.timeout = timeout
+        self.upstreams = upstreams
+        self.end_of_stream = end_of_stream
+        self.next_index = start
+        self.skipped = 0
+        self.late = 0
+        self._heap: List[Tuple[int, Sequenced]] = []
+        self._waiting_since: Optional[float] = None
+
+    def _watched_queue(self) -> Queue:
+        """Return input queue which depth is reported in snapshot.
+
+        Returns:
+            multiprocessing.Queue: queue_in
+        """
+        return self.queue_in
+
+    def _push(self, item: Sequenced) -> None:
+        """method add item to buffer, items with already skipped index are dropped.
+
+        Args:
+            item (Sequenced): item from queue_in
+        """
+        if item.index < self.next_index:
+            self.late += 1
+            self.warning("Item %d came too late and is dropped.", item.index)
+            return
+        heapq.heappush(self._heap, (item.index, item))
+
+    def _flush(self) -> None:
+        """method put into queue_out all items with consecutive indexes."""
+        progress = False
+        while self._heap and self._heap[0][0] == self.next_index:
+            _, item = heapq.heappop(self._heap)
+            self.put(self.queue_out, item)
+            self.metrics.items += 1
+            self.metrics.age.record(monotonic() - item.timestamp)
+            self.next_index += 1
+            progress = True
+            self.log_item("Reordered.")
+        if not self._heap:
+            self._waiting_since = None
+        elif progress or self._waiting_since is None:
+            self._waiting_since = monotonic()
+
+    def _skip(self) -> None:
+        """method give up waiting for missing indexes before the first buffered item."""
+        index = self._heap[0][0]
+        self.skipped += index - self.next_index
+        self.warning("Items %d..%d skipped.", self.next_index, index - 1)
+        self.next_index = index
+        self._flush()
+
+    def _expired(self) -> bool:
+        """method check if buffered items wait for a missing index longer than max_latency.
+
+        Returns:
+            bool: True if missing indexes should be skipped.
+        """
+        if self.max_latency is None or self._waiting_since is None:
+            return False
+        return monotonic() - self._waiting_since >= self.max_latency
+
+    def _get_timeout(self) -> Optional[float]:
+        """method return time to wait for next item.
+
+        Returns:
+            Optional[float]: timeout for queue get.
+        """
+        if self.max_latency is None or self._waiting_since is None:
+            return self.timeout
+        deadline = self._waiting_since + self.max_latency - monotonic()
+        if self.timeout is None:
+            return max(deadline, 0)
+        return max(min(deadline, self.timeout), 0)
+
+    def run(self):
+        """Method representing the thread's activity."""
+        while 1:
+            try:
+                item = self.get(self.queue_in, self._get_timeout())
+            except Empty:
+                if not self._expired():
+                    break
+                self._skip()
+                continue
+            if item is END_OF_STREAM:
+                break
+            if not isinstance(item, Sequenced):
+                self.warning("Item without index %s is dropped.", type(item))
+                continue
+            self._push(item)
+            self._flush()
+            if len(self._heap) > self.window or self._expired():
+                self._skip()
+        while self._heap:
+            self._skip()
+        if self.ended:
+            self.send_end_of_stream(self.queue_out, self.end_of_stream)
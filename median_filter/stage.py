@@ -0,0 +1,349 @@
+"""
+State shared by thread workers (Worker, Producer) and asyncio workers (AsyncWorker,
+AsyncProducer): counting of markers, overflow policies, metrics, logging and
+schedule of producers. Mixins use only non-blocking queue calls, so the workers
+add the blocking or awaited get and put.
+"""
+import logging
+from queue import Empty, Full
+from time import monotonic, perf_counter
+from typing import Any, Callable, Dict, List, Tuple
+
+from .common import END_OF_STREAM, OVERFLOW_POLICIES, RETIRE, SCHEDULES, Sequenced
+from .logs import LOGGER
+from .metrics import StageMetrics
+
+
+class StageMixin:
+    """
+    Common state of thread and asyncio workers.
+    QUEUE_EMPTY and QUEUE_FULL are exceptions raised by get_nowait and put_nowait
+    of the queues used by the worker.
+    Messages about single items (log_item) are logged at most once
+    per ITEM_LOG_INTERVAL seconds by each worker.
+    """
+
+    name: str
+    ITEM_LOG_INTERVAL = 1.0
+    QUEUE_EMPTY: Tuple[type, ...] = (Empty,)
+    QUEUE_FULL: Tuple[type, ...] = (Full,)
+
+    def __init__(self, *, verbose: bool = True, overflow: str = "block") -> None:
+        """Initialize self.
+
+        Args:
+            verbose (bool, optional): If True worker loged. Defaults to True.
+            overflow (str, optional): policy used by put when the output queue is full,
+                one of common.OVERFLOW_POLICIES. Defaults to "block".
+
+        Raises:
+            ValueError: unknown overflow policy.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown overflow policy {overflow}, use one of {OVERFLOW_POLICIES}."
+            )
+        self.verbose = verbose
+        self.overflow = overflow
+        self.dropped = 0
+        self._held_markers: List[Any] = []
+        self.upstreams = 1
+        self._ends = 0
+        self.retired = False
+        self.metrics = StageMetrics()
+        self._item_logged = -float("inf")
+        self._items_suppressed = 0
+
+    @property
+    def ended(self) -> bool:
+        """bool: True if END_OF_STREAM markers came from all upstreams."""
+        return self._ends >= self.upstreams
+
+    def _received(self, data: Any) -> Tuple[bool, Any]:
+        """method count END_OF_STREAM marker got from input queue.
+        RETIRE marker ends the worker at once (self.retired) without counting.
+
+        Args:
+            data (Any): data from input queue
+
+        Returns:
+            Tuple[bool, Any]: (False, None) if worker waits for markers from other
+                upstreams, else (True, data) or (True, END_OF_STREAM)
+                if markers came from all upstreams or RETIRE came
+        """
+        if data is RETIRE:
+            self.retired = True
+            return True, END_OF_STREAM
+        if data is not END_OF_STREAM:
+            return True, data
+        self._ends += 1
+        return self.ended, END_OF_STREAM
+
+    def _put_held_markers(self, queue: Any) -> None:
+        """Put markers, which could not be moved by _drop_oldest,
+        back into queue without blocking.
+
+        Args:
+            queue (Any): output queue of the stage
+        """
+        while self._held_markers:
+            try:
+                queue.put_nowait(self._held_markers[0])
+            except self.QUEUE_FULL:
+                return
+            self._held_markers.pop(0)
+
+    def _drop_oldest(self, queue: Any) -> bool:
+        """Remove the oldest data from queue without blocking.
+        Markers (END_OF_STREAM, RETIRE) are never removed, they are moved
+        to the end of queue.
+
+        Args:
+            queue (Any): output queue of the stage
+
+        Returns:
+            bool: True if data was removed, False if queue was empty or had marker at head
+        """
+        try:
+            data = queue.get_nowait()
+        except self.QUEUE_EMPTY:
+            return False
+        if data is END_OF_STREAM or data is RETIRE:
+            self._held_markers.append(data)
+            self._put_held_markers(queue)
+            return False
+        self.dropped += 1
+        return True
+
+    def _put_nowait(self, queue: Any, data: Any) -> None:
+        """Put data into queue without blocking according to overflow policy
+        other than "block". Dropped data are counted in self.dropped.
+        Data is dropped when queue is full of markers only.
+
+        Args:
+            queue (Any): output queue of the stage
+            data (Any): data to put
+        """
+        self._put_held_markers(queue)
+        if self.overflow == "latest":
+            while self._drop_oldest(queue):
+                pass
+        attempts = 0
+        while 1:
+            try:
+                queue.put_nowait(data)
+                return
+            except self.QUEUE_FULL:
+                if self.overflow == "drop_newest" or attempts > queue.qsize():
+                    self.dropped += 1
+                    return
+                if not self._drop_oldest(queue):
+                    attempts += 1
+
+    def _end_markers(self, count: int) -> List[Any]:
+        """method take markers held by _drop_oldest followed by count END_OF_STREAM
+        markers, one for each reader of output queue.
+
+        Args:
+            count (int): number of END_OF_STREAM markers
+
+        Returns:
+            List[Any]: markers to put into output queue in order
+        """
+        markers = self._held_markers + [END_OF_STREAM] * count
+        self._held_markers = []
+        return markers
+
+    def record_item(self, started: float, data: Any = None) -> None:
+        """Count processed item with its processing time and, for Sequenced data,
+        its age since the Producer.
+
+        Args:
+            started (float): time.perf_counter() at the start of processing
+            data (Any, optional): processed data. Defaults to None.
+        """
+        self.metrics.items += 1
+        self.metrics.processing.record(perf_counter() - started)
+        if isinstance(data, Sequenced):
+            self.metrics.age.record(monotonic() - data.timestamp)
+
+    def _watched_queue(self) -> Any:
+        """Return queue which depth is reported in snapshot.
+
+        Returns:
+            Any: input queue of the stage, None if the worker has none
+        """
+        queue: Any = None
+        return queue
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return current metrics of the worker.
+
+        Returns:
+            Dict[str, Any]: name, dropped data, depth of watched queue
+                (None if unknown) and StageMetrics.snapshot()
+        """
+        depth = None
+        queue = self._watched_queue()
+        if queue is not None:
+            try:
+                depth = queue.qsize()
+            except NotImplementedError:
+                pass
+        return {
+            "name": self.name,
+            "dropped": self.dropped,
+            "queue_depth": depth,
+            **self.metrics.snapshot(),
+        }
+
+    def report_dropped(self) -> None:
+        """Send warning log with number of dropped data, if any was dropped."""
+        if self.dropped:
+            self.warning("%d items dropped, output queue was full.", self.dropped)
+
+    def log(self, message: str, *args: Any) -> None:
+        """Send info log to console.
+        Send log to console if self.verbose, message is formatted with args
+        only if it is logged.
+
+        Args:
+            message (str): log message
+            args (Any): arguments of %-style message
+        """
+        if self.verbose:
+            LOGGER.info(message, *args)
+
+    def log_item(self, message: str, *args: Any) -> None:
+        """Send info log about single item, at most once per ITEM_LOG_INTERVAL seconds.
+        Number of suppressed messages is added to the next logged one.
+
+        Args:
+            message (str): log message
+            args (Any): arguments of %-style message
+        """
+        if not self.verbose or not LOGGER.isEnabledFor(logging.INFO):
+            return
+        now = monotonic()
+        if now - self._item_logged < self.ITEM_LOG_INTERVAL:
+            self._items_suppressed += 1
+            return
+        if self._items_suppressed:
+            message = f"{message} (%d item messages suppressed)"
+            args = (*args, self._items_suppressed)
+        self._item_logged = now
+        self._items_suppressed = 0
+        LOGGER.info(message, *args)
+
+    def warning(self, message: str, *args: Any) -> None:
+        """Send warning log to console.
+        Send log to console if self.verbose
+
+        Args:
+            message (str): log message
+            args (Any): arguments of %-style message
+        """
+        if self.verbose:
+            LOGGER.error(message, *args)
+
+
+class ScheduleMixin:
+    """
+    Schedule of producers, see common.SCHEDULES. Time of monotonic clock is given
+    by the producer, which also sleeps until the ticks.
+    Data are wrapped in Sequenced with consecutive index, if sequence is True.
+    """
+
+    log: Callable[..., None]
+
+    def __init__(
+        self, interval: float = 0, *, schedule: str = "sleep", sequence: bool = False
+    ) -> None:
+        """Initialize self.
+
+        Args:
+            interval (float, optional): interval to next function calling. Defaults to 0.
+            schedule (str, optional): how interval is kept: "sleep", "catch_up" or "skip",
+                see common.SCHEDULES. Defaults to "sleep".
+            sequence (bool, optional): If True data are wrapped in Sequenced with
+                consecutive index, so ReorderBuffer can restore their order. Defaults to False.
+
+        Raises:
+            ValueError: unknown schedule.
+        """
+        if schedule not in SCHEDULES:
+            raise ValueError(f"Unknown schedule {schedule}, use one of {SCHEDULES}.")
+        self.interval = interval
+        self.schedule = schedule
+        self.sequence = sequence
+        self.ticks = 0
+        self.missed_ticks = 0
+        self.max_jitter = 0.0
+        self._jitter_sum = 0.0
+        self._index = 0
+
+    @property
+    def mean_jitter(self) -> float:
+        """float: mean delay in seconds of data start after its tick."""
+        if not self.ticks:
+            return 0.0
+        return self._jitter_sum / self.ticks
+
+    def _record_tick(self, tick: float, now: float) -> None:
+        """method measure delay of data start after its tick.
+
+        Args:
+            tick (float): time of the tick
+            now (float): time of the start
+        """
+        jitter = now - tick
+        self.ticks += 1
+        self._jitter_sum += jitter
+        self.max_jitter = max(self.max_jitter, jitter)
+
+    def _next_tick(self, tick: float, now: float) -> float:
+        """method compute time of the next data start according to the schedule.
+
+        Args:
+            tick (float): time of the last tick
+            now (float): current time
+
+        Returns:
+            float: time of the next tick
+        """
+        if self.schedule == "sleep":
+            return now + self.interval
+        tick += self.interval
+        if self.schedule == "skip" and self.interval > 0 and tick < now:
+            missed = int((now - tick) / self.interval) + 1
+            self.missed_ticks += missed
+            tick += missed * self.interval
+        return tick
+
+    def _sequenced(self, data: Any, now: float) -> Any:
+        """method wrap data in Sequenced with the next index, if self.sequence.
+
+        Args:
+            data (Any): produced data
+            now (float): timestamp of data
+
+        Returns:
+            Any: Sequenced data or data
+        """
+        if not self.sequence:
+            return data
+        data = Sequenced(self._index, now, data)
+        self._index += 1
+        return data
+
+    def report_jitter(self) -> None:
+        """Send log with measured jitter of the schedule."""
+        if not self.interval:
+            return
+        self.log(
+            "Jitter mean %.3f ms, max %.3f ms over %d ticks, %d ticks missed.",
+            1000 * self.mean_jitter,
+            1000 * self.max_jitter,
+            self.ticks,
+            self.missed_ticks,
+        )
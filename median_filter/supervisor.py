@@ -0,0 +1,271 @@
+"""
+Broker supervisor starts and retires workers of one broker stage,
+so the number of workers follows the load of its input queue.
+"""
+import os
+from threading import Thread
+from time import sleep
+from typing import Any, Callable, List, Tuple
+
+from .broker import Broker
+from .common import END_OF_STREAM, RETIRE
+from .logs import LOGGER
+
+
+class BrokerSupervisor(Thread):
+    """
+    Keeps between min_workers and max_workers brokers made by factory,
+    which read the same queue_in and write the same queue_out, as distinct thread.
+
+    Every interval seconds supervisor estimates backlog, the time needed by current workers
+    to empty queue_in (depth * mean processing time of recent items / workers),
+    and load, the part of the interval in which workers were processing.
+    New worker is started when backlog was above max_backlog for up_polls polls,
+    worker is retired by RETIRE marker when the other workers would have load
+    below max_load / 2 and backlog below max_backlog / 2 for down_polls polls.
+    Different thresholds and numbers of polls give hysteresis, so the number
+    of workers does not oscillate when the load is near a threshold.
+
+    Workers end by RETIRE or END_OF_STREAM markers only without sending markers,
+    supervisor counts upstreams markers taken by workers, then puts END_OF_STREAM
+    for each remaining worker, waits for them and puts end_of_stream markers into queue_out.
+    If a worker ends otherwise (timeout or failure), supervisor stops scaling and waits
+    for the rest of workers.
+
+    Usage example:
+        queue0: Queue = Queue()
+        queue1: Queue = Queue()
+
+        supervisor = BrokerSupervisor(
+            lambda: MedianFilter(queue0, queue1, (512, 384), (5, 5, 1), timeout=None),
+            min_workers=1,
+            max_workers=4,
+        )
+        supervisor.start()
+        supervisor.join()
+    """
+
+    COUNTER = 0
+
+    def __init__(
+        self,
+        factory: Callable[[], Broker],
+        min_workers: int = 1,
+        max_workers: int = None,
+        *,
+        name: str = None,
+        daemon: bool = None,
+        verbose: bool = True,
+        interval: float = 0.1,
+        max_backlog: float = 0.1,
+        max_load: float = 0.8,
+        up_polls: int = 2,
+        down_polls: int = 10,
+        upstreams: int = 1,
+        end_of_stream: int = 1,
+    ) -> None:
+        """Initialize self.
+
+        Args:
+            factory (Callable[[], Broker]): function making new broker with the same
+                queue_in and queue_out, workers should have timeout None
+            min_workers (int, optional): number of workers kept running. Defaults to 1.
+            max_workers (int, optional): maximum number of workers,
+                None means number of CPUs. Defaults to None.
+            name (str, optional): the thread name. By default, a unique name is constructed of
+                the form "Thread-N" where N is a small decimal number.
+            daemon (bool, optional): description below. Defaults to None.
+            verbose (bool, optional): If True thread loged. Defaults to True.
+            interval (float, optional): time between checks of workers and queue
+                in seconds. Defaults to 0.1.
+            max_backlog (float, optional): time in seconds to empty queue_in above which
+                new worker is started. Defaults to 0.1.
+            max_load (float, optional): part of time in which workers process data,
+                worker is retired when the others would stay below half of it.
+                Defaults to 0.8.
+            up_polls (int, optional): number of polls with high backlog
+                before new worker. Defaults to 2.
+            down_polls (int, optional): number of polls with low load
+                before worker is retired. Defaults to 10.
+            upstreams (int, optional): number of END_OF_STREAM markers which end
+                the work, one for each writer of queue_in. Defaults to 1.
+            end_of_stream (int, optional): number of END_OF_STREAM markers put into queue_out
+                after the work ended by markers, one for each reader of queue_out.
+                Defaults to 1.
+
+        Raises:
+            ValueError: wrong number of workers.
+        """
+        if max_workers is None:
+            max_workers = max(os.cpu_count() or 1, min_workers)
+        if not 1 <= min_workers <= max_workers:
+            raise ValueError(
+                f"Workers have to be 1 <= min_workers <= max_workers, "
+                f"got {min_workers} and {max_workers}."
+            )
+        if name is None:
+            name = f"BrokerSupervisor-{BrokerSupervisor.COUNTER}"
+        BrokerSupervisor.COUNTER += 1
+
+        super().__init__(name=name, daemon=daemon)
+        self.factory = factory
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.verbose = verbose
+        self.interval = interval
+        self.max_backlog = max_backlog
+        self.max_load = max_load
+        self.up_polls = up_polls
+        self.down_polls = down_polls
+        self.upstreams = upstreams
+        self.end_of_stream = end_of_stream
+        self.workers: List[Broker] = []
+        self.running: List[Broker] = []
+        self.item_time = 0.0
+        self.backlog = 0.0
+        self.load = 0.0
+        self._retiring = 0
+        self._ends = 0
+        self._interrupted = False
+        self._high_polls = 0
+        self._low_polls = 0
+        self._processed = (0, 0.0)
+
+    @property
+    def n_workers(self) -> int:
+        """int: number of running workers which were not retired."""
+        return len(self.running) - self._retiring
+
+    def _spawn(self) -> Broker:
+        """method create and start new worker.
+
+        Returns:
+            Broker: started worker
+        """
+        worker = self.factory()
+        worker.upstreams = 1
+        worker.end_of_stream = 0
+        self.workers.append(worker)
+        self.running.append(worker)
+        worker.start()
+        return worker
+
+    def _check_workers(self) -> None:
+        """method remove ended workers and count why they ended."""
+        for worker in [worker for worker in self.running if not worker.is_alive()]:
+            self.running.remove(worker)
+            if worker.retired:
+                self._retiring -= 1
+            elif worker.ended:
+                self._ends += 1
+            else:
+                self._interrupted = True
+                self.warning("%s ended without marker, scaling stopped.", worker.name)
+
+    def _processed_since(self) -> Tuple[int, float]:
+        """method count items and their processing time since the last call.
+
+        Returns:
+            Tuple[int, float]: number of items and their processing time in seconds
+        """
+        items = sum(worker.metrics.processing.count for worker in self.workers)
+        busy = sum(worker.metrics.processing.total for worker in self.workers)
+        last_items, last_busy = self._processed
+        self._processed = (items, busy)
+        return items - last_items, busy - last_busy
+
+    def _measure(self) -> None:
+        """method update item_time, backlog and load from queue_in and metrics."""
+        items, busy = self._processed_since()
+        if items:
+            self.item_time = busy / items
+        workers = max(self.n_workers, 1)
+        depth = self.workers[0].queue_in.qsize()
+        self.backlog = depth * (self.item_time or self.interval) / workers
+        self.load = busy / (self.interval * workers)
+
+    def _scale(self) -> None:
+        """method start or retire one worker according to backlog and load."""
+        n_workers = self.n_workers
+        if n_workers < self.min_workers:
+            self._spawn()
+            return
+        high = self.backlog > self.max_backlog and n_workers < self.max_workers
+        low = (
+            n_workers > self.min_workers
+            and self.backlog < self.max_backlog / 2
+            and self.load * n_workers / (n_workers - 1) < self.max_load / 2
+        )
+        self._high_polls = self._high_polls + 1 if high else 0
+        self._low_polls = self._low_polls + 1 if low else 0
+        if self._high_polls >= self.up_polls:
+            self._spawn()
+            self.log(
+                "Worker started, %d workers, backlog %.1f ms.",
+                n_workers + 1,
+                1000 * self.backlog,
+            )
+        elif self._low_polls >= self.down_polls:
+            self.workers[0].queue_in.put(RETIRE)
+            self._retiring += 1
+            self.log("Worker retired, %d workers, load %.2f.", n_workers - 1, self.load)
+        else:
+            return
+        self._high_polls = 0
+        self._low_polls = 0
+
+    def run(self):
+        """Method representing the thread's activity."""
+        for _ in range(self.min_workers):
+            self._spawn()
+        queue_in = self.workers[0].queue_in
+        queue_out = self.workers[0].queue_out
+        while 1:
+            sleep(self.interval)
+            self._check_workers()
+            if self._interrupted or self._ends >= self.upstreams:
+                break
+            self._measure()
+            self._scale()
+        if not self._interrupted:
+            for _ in range(self.n_workers):
+                queue_in.put(END_OF_STREAM)
+        for worker in list(self.running):
+            worker.join()
+        self._check_workers()
+        if not self._interrupted and self._ends >= self.upstreams:
+            for _ in range(self.end_of_stream):
+                queue_out.put(END_OF_STREAM)
+            if self.end_of_stream:
+                self.log("End of stream sent.")
+
+    def snapshot(self) -> List[dict]:
+        """method return snapshots of all workers, see Worker.snapshot.
+
+        Returns:
+            List[dict]: snapshots of workers
+        """
+        return [worker.snapshot() for worker in list(self.workers)]
+
+    def log(self, message: str, *args: Any) -> None:
+        """Send info log to console.
+        Send log to console if self.verbose, message is formatted with args
+        only if it is logged.
+
+        Args:
+            message (str): log message
+            args (Any): arguments of %-style message
+        """
+        if self.verbose:
+            LOGGER.info(message, *args)
+
+    def warning(self, message: str, *args: Any) -> None:
+        """Send warning log to console.
+        Send log to console if self.verbose
+
+        Args:
+            message (str): log message
+            args (Any): arguments of %-style message
+        """
+        if self.verbose:
+            LOGGER.error(message, *args)
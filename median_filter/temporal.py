@@ -0,0 +1,171 @@
+"""
+Temporal median filter is special broker which keeps the last frames from queue
+and pushes median of each pixel over them (and optionally over its neighbours)
+to next queue.
+"""
+from multiprocessing import Queue
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from .broker import Broker
+from .kernels import _check_native_frame, _planar_footprint, _rank_median
+
+
+class TemporalMedianFilter(Broker):
+    """
+    Takes frames from one queue and puts into another, as distinct thread,
+        median of each pixel over the last window frames, which removes flicker
+        and shot noise of video. The first window - 1 frames give median of the frames
+        received so far. Frame with different shape or dtype starts new window.
+
+    The last frames are kept in circular buffer and, for each pixel, also sorted along time.
+    New frame replaces the value of the oldest frame in the sorted buffer and one pass
+    of compare-exchanges up and one down restore the order, so the cost per frame
+    grows with the window linearly and is not a full median of window frames.
+
+    With spatial_shape = (m, n) the temporal median of uint8 or uint16 frames is filtered
+    by median over m x n pixels (see kernels._rank_median), a separable approximation
+    of median over window x m x n values.
+
+    Usage example:
+        queue0: Queue = Queue()
+        queue1: Queue = Queue()
+
+        broker = TemporalMedianFilter(queue0, queue1, window=5)
+        broker.start()
+        broker.join()
+    """
+
+    COUNTER = 0
+
+    def __init__(
+        self,
+        queue_in: Queue,
+        queue_out: Queue,
+        window: int = 5,
+        spatial_shape: Tuple[int, int] = None,
+        *,
+        name: str = None,
+        daemon: bool = None,
+        verbose: bool = True,
+        timeout: float = 10.0,
+        upstreams: int = 1,
+        end_of_stream: int = 1,
+        overflow: str = "block",
+    ) -> None:
+        """Initialize self.
+
+        Args:
+            queue_in (multiprocessing.Queue): queue with frames in order of time.
+            queue_out (multiprocessing.Queue): queue for filtered frames.
+            window (int, optional): number of the last frames of the median. Defaults to 5.
+            spatial_shape (Tuple[int, int], optional): shape of median filter applied
+                to the temporal median, None means pure temporal median. Defaults to None.
+            name (str, optional): the thread name. By default, a unique name is constructed of
+                the form "Thread-N" where N is a small decimal number.
+            daemon (bool, optional): description below. Defaults to None.
+            verbose (bool, optional): If True thread loged. Defaults to True.
+            timeout (float, optional): Timeout for queue get. Defaults to 10.0.
+            upstreams (int, optional): number of END_OF_STREAM markers which end
+                the work, one for each writer of queue_in. Defaults to 1.
+            end_of_stream (int, optional): number of END_OF_STREAM markers put into queue_out
+                after the work ended by markers, one for each reader of queue_out.
+                Defaults to 1.
+            overflow (str, optional): what to do when queue_out is full: "block",
+                "drop_oldest", "drop_newest" or "latest". Dropped data are counted
+                in self.dropped. Defaults to "block".
+
+        Raises:
+            ValueError: window is not positive.
+        """
+        if window < 1:
+            raise ValueError(f"Window has to be positive, got {window}.")
+        if name is None:
+            name = f"TemporalMedianFilter-{TemporalMedianFilter.COUNTER}"
+        TemporalMedianFilter.COUNTER += 1
+        super().__init__(
+            queue_in,
+            queue_out,
+            self._filter,
+            name=name,
+            daemon=daemon,
+            verbose=verbose,
+            timeout=timeout,
+            upstreams=upstreams,
+            end_of_stream=end_of_stream,
+            overflow=overflow,
+        )
+        self.window = window
+        self.footprint: Optional[np.ndarray] = None
+        if spatial_shape is not None:
+            self.footprint = _planar_footprint(tuple(spatial_shape))
+        self.frames: Optional[np.ndarray] = None
+        self.sorted: Optional[np.ndarray] = None
+        self.count = 0
+
+    def reset(self) -> None:
+        """method forget received frames, the next frame starts new window."""
+        self.frames = None
+        self.sorted = None
+        self.count = 0
+
+    def _push(self, frame: np.ndarray) -> None:
+        """method add frame to the circular buffer and to the sorted buffer.
+
+        Args:
+            frame (np.ndarray): new frame
+        """
+        frames = self.frames
+        if (
+            frames is None
+            or frames.shape[1:] != frame.shape
+            or frames.dtype != frame.dtype
+        ):
+            self.frames = np.empty((self.window, *frame.shape), frame.dtype)
+            self.sorted = np.empty_like(self.frames)
+            self.count = 0
+        values = self.sorted[: min(self.count + 1, self.window)]
+        slot = self.count % self.window
+        if self.count < self.window:
+            values[-1] = frame
+        else:
+            oldest = self.frames[slot]
+            position = (values < oldest).sum(axis=0, dtype=np.intp)
+            np.put_along_axis(values, position[None], frame[None], axis=0)
+            self._bubble(values, range(len(values) - 1))
+        self._bubble(values, reversed(range(len(values) - 1)))
+        self.frames[slot] = frame
+        self.count += 1
+
+    @staticmethod
+    def _bubble(values: np.ndarray, steps: Iterable[int]) -> None:
+        """method compare and exchange neighbouring values of each pixel in given order.
+
+        Args:
+            values (np.ndarray): values sorted along the first axis except one of them
+            steps (Iterable[int]): indexes of the lower values of compared pairs
+        """
+        for i in steps:
+            lower = np.minimum(values[i], values[i + 1])
+            np.maximum(values[i], values[i + 1], out=values[i + 1])
+            values[i] = lower
+
+    def _filter(self, frame: np.ndarray) -> np.ndarray:
+        """method add frame to the window and return median of the window.
+
+        Args:
+            frame (np.ndarray): new frame
+
+        Returns:
+            np.ndarray: median of each pixel over the last frames
+        """
+        frame = np.asarray(frame)
+        if self.footprint is not None:
+            _check_native_frame(frame)
+        self._push(frame)
+        size = min(self.count, self.window)
+        median = self.sorted[size // 2].copy()
+        if self.footprint is not None:
+            return _rank_median(median, self.footprint)
+        return median
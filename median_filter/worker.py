@@ -1,19 +1,23 @@
 """
 Worker is abstract class for producer, broker and consumer.
 """
-import logging
+from multiprocessing import Queue
 from threading import Thread
+from time import perf_counter
+from typing import Any, Optional
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="[%(asctime)s] [%(threadName)s] [%(levelname)s]: %(message)s",
-)
+from .stage import StageMixin
 
 
-class Worker(Thread):
+class Worker(StageMixin, Thread):
     """
     Abstract class for producer, broker and consumer.
-    Include common methods.
+    Include common methods, the state shared with asyncio workers
+    (markers, overflow policies, metrics and logs) comes from StageMixin.
+    Workers collect counters and latency histograms in self.metrics,
+    snapshot() returns them with depth of the watched queue (see MetricsReporter).
+    Messages about single items (log_item) are logged at most once
+    per ITEM_LOG_INTERVAL seconds by each worker.
     """
 
     COUNTER = 0
@@ -24,46 +28,89 @@ class Worker(Thread):
         name: str = None,
         daemon: bool = None,
         verbose: bool = True,
+        overflow: str = "block",
     ) -> None:
         """Initialize self.
 
         Args:
-            queue (multiprocessing.Queue): queue for converted data.
-            fun (Callable[[], Tuple[bool, Any]]): function to produce data.
-                Data are producing while fun return (True, ...).
-            interval (float, optional): interval to next function calling. Defaults to 0.
             name (str, optional): the thread name. By default, a unique name is constructed of
                 the form "Thread-N" where N is a small decimal number.
             daemon (bool, optional): description below. Defaults to None.
             verbose (bool, optional): If True thread loged. Defaults to True.
+            overflow (str, optional): policy used by put when the output queue is full,
+                one of common.OVERFLOW_POLICIES. Defaults to "block".
         """
         if name is None:
             name = f"Worker-{Worker.COUNTER}"
         Worker.COUNTER += 1
 
-        super().__init__(name=name, daemon=daemon)
-        self.verbose = verbose
+        Thread.__init__(self, name=name, daemon=daemon)
+        StageMixin.__init__(self, verbose=verbose, overflow=overflow)
         self.log("created")
 
     def __del__(self):
-        self.log("closed")
+        if hasattr(self, "verbose"):
+            self.log("closed")
 
-    def log(self, message: str) -> None:
-        """Send info log to console.
-        Send log to console if self.verbose
+    def get(self, queue: Queue, timeout: Optional[float]) -> Any:
+        """Get data from queue counting END_OF_STREAM markers.
+        RETIRE marker ends the worker at once (self.retired) without counting.
 
         Args:
-            message (str): log message
+            queue (multiprocessing.Queue): input queue of the stage
+            timeout (Optional[float]): Timeout for queue get, None means no timeout.
+
+        Raises:
+            Empty: no data came during timeout.
+
+        Returns:
+            Any: data or END_OF_STREAM if markers came from all upstreams or RETIRE came
+        """
+        while 1:
+            started = perf_counter()
+            try:
+                data = queue.get(timeout=timeout)
+            finally:
+                self.metrics.get_wait.record(perf_counter() - started)
+            received, data = self._received(data)
+            if received:
+                return data
+
+    def put(self, queue: Queue, data: Any) -> None:
+        """Put data into queue according to the overflow policy.
+        Dropped data are counted in self.dropped. With policy other than "block"
+        data is dropped when queue is full of END_OF_STREAM markers only.
+
+        Args:
+            queue (multiprocessing.Queue): output queue of the stage
+            data (Any): data to put
+        """
+        started = perf_counter()
+        try:
+            if self.overflow == "block":
+                queue.put(data)
+            else:
+                self._put_nowait(queue, data)
+        finally:
+            self.metrics.put_wait.record(perf_counter() - started)
+
+    def _watched_queue(self) -> Optional[Queue]:
+        """Return queue which depth is reported in snapshot.
+
+        Returns:
+            Optional[multiprocessing.Queue]: input queue of the stage, None for Worker
         """
-        if self.verbose:
-            logging.info(message)
+        queue: Optional[Queue] = None
+        return queue
 
-    def warning(self, message: str) -> None:
-        """Send warning log to console.
-        Send log to console if self.verbose
+    def send_end_of_stream(self, queue: Queue, count: int) -> None:
+        """Put count END_OF_STREAM markers into queue, one for each reader of queue.
 
         Args:
-            message (str): log message
+            queue (multiprocessing.Queue): output queue of the stage
+            count (int): number of markers
         """
-        if self.verbose:
-            logging.error(message)
+        for marker in self._end_markers(count):
+            queue.put(marker)
+        if count:
+            self.log("End of stream sent.")
@@ -0,0 +1,21 @@
+"""
+Fixtures shared by tests.
+"""
+import os
+from shutil import rmtree
+
+import pytest
+
+
+@pytest.fixture
+def try_folder() -> str:
+    """Fixture prepare empty folder for recorded files.
+
+    Returns:
+        str: path of the folder
+    """
+    folder_name = os.sep.join(["tests", "try"])
+    if os.path.exists(folder_name):
+        rmtree(folder_name)
+    os.mkdir(folder_name)
+    return folder_name
@@ -0,0 +1,170 @@
+"""
+Tests on module aio with asyncio variants of producer, broker and consumer.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from median_filter import (
+    END_OF_STREAM,
+    AsyncBroker,
+    AsyncConsumer,
+    AsyncProducer,
+    Sequenced,
+    set_n_steps,
+)
+
+TIMEOUT = 0.1
+
+
+async def run_chain(n_steps: int, **kwargs) -> list:
+    """Run producer, broker and consumer on asyncio queues.
+
+    Args:
+        n_steps (int): number of produced data
+        kwargs: arguments of AsyncBroker
+
+    Returns:
+        list: consumed data
+    """
+    queue0: asyncio.Queue = asyncio.Queue(4)
+    queue1: asyncio.Queue = asyncio.Queue(4)
+    counter = set_n_steps(n_steps)
+    numbers = iter(range(n_steps))
+    consumed = []
+    workers = [
+        AsyncProducer(
+            queue0, lambda: (next(counter), next(numbers, None)), end_of_stream=1
+        ),
+        AsyncBroker(queue0, queue1, lambda x: 2 * x, timeout=None, **kwargs),
+        AsyncConsumer(queue1, consumed.append, timeout=None),
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        await worker.join(timeout=10)
+        assert not worker.is_alive()
+    return consumed
+
+
+@pytest.mark.parametrize("n_steps", (1, 30))
+def test_chain(n_steps: int):
+    """Data pass the stages in order and END_OF_STREAM ends all of them.
+
+    Args:
+        n_steps (int): number of produced data
+    """
+    assert asyncio.run(run_chain(n_steps)) == [2 * i for i in range(n_steps)]
+
+
+def test_executor():
+    """Functions run in given executor, not on the thread of the loop."""
+    threads = set()
+
+    def fun(data):
+        threads.add(threading.current_thread().name)
+        return data
+
+    async def main():
+        queue0: asyncio.Queue = asyncio.Queue()
+        queue1: asyncio.Queue = asyncio.Queue()
+        for i in range(5):
+            queue0.put_nowait(i)
+        queue0.put_nowait(END_OF_STREAM)
+        with ThreadPoolExecutor(1, thread_name_prefix="stage") as executor:
+            broker = AsyncBroker(queue0, queue1, fun, executor=executor)
+            broker.start()
+            await broker.join()
+        return [queue1.get_nowait() for _ in range(queue1.qsize())]
+
+    assert asyncio.run(main()) == [0, 1, 2, 3, 4, END_OF_STREAM]
+    assert all(name.startswith("stage") for name in threads)
+
+
+def test_sequenced_and_errors():
+    """Sequenced data keep their index, errors of fun are counted and skipped."""
+
+    async def main():
+        queue0: asyncio.Queue = asyncio.Queue()
+        queue1: asyncio.Queue = asyncio.Queue()
+        for i in range(4):
+            queue0.put_nowait(Sequenced(i, 0.0, i))
+        broker = AsyncBroker(queue0, queue1, lambda x: 1 / x, timeout=TIMEOUT)
+        broker.start()
+        await broker.join()
+        assert broker.metrics.errors == 1
+        assert broker.snapshot()["items"] == 3
+        return [queue1.get_nowait() for _ in range(queue1.qsize())]
+
+    results = asyncio.run(main())
+    assert [data.index for data in results] == [1, 2, 3]
+    assert [data.data for data in results] == [1, 0.5, 1 / 3]
+
+
+def test_overflow():
+    """Producer drops the newest data when output queue is full."""
+
+    async def main():
+        queue: asyncio.Queue = asyncio.Queue(2)
+        counter = set_n_steps(5)
+        producer = AsyncProducer(
+            queue, lambda: (next(counter), 1), overflow="drop_newest"
+        )
+        producer.start()
+        await producer.join()
+        return producer.dropped, queue.qsize()
+
+    assert asyncio.run(main()) == (3, 2)
+
+
+def test_consumer_upstreams():
+    """Consumer ends after END_OF_STREAM markers from all upstreams."""
+
+    async def main():
+        queue: asyncio.Queue = asyncio.Queue()
+        consumed = []
+        consumer = AsyncConsumer(
+            queue, consumed.append, timeout=None, upstreams=2, sequenced=True
+        )
+        consumer.start()
+        for marker in (Sequenced(0, 0.0, "a"), END_OF_STREAM, "b", END_OF_STREAM):
+            await queue.put(marker)
+        await consumer.join(timeout=1)
+        return consumed
+
+    assert asyncio.run(main()) == [Sequenced(0, 0.0, "a"), "b"]
+
+
+def test_many_pipelines():
+    """Many pipelines run concurrently on one loop without thread per stage."""
+
+    async def main():
+        threads = threading.active_count()
+        with ThreadPoolExecutor(2) as executor:
+            loop = asyncio.get_running_loop()
+            loop.set_default_executor(executor)
+            results = await asyncio.gather(*(run_chain(10) for _ in range(20)))
+            assert threading.active_count() <= threads + 2
+        return results
+
+    for result in asyncio.run(main()):
+        assert result == [2 * i for i in range(10)]
+
+
+def test_start_join():
+    """Worker starts only once and has to be started before join."""
+
+    async def main():
+        broker = AsyncBroker(asyncio.Queue(), asyncio.Queue(), abs, timeout=TIMEOUT)
+        with pytest.raises(RuntimeError):
+            await broker.join()
+        broker.start()
+        with pytest.raises(RuntimeError):
+            broker.start()
+        with pytest.raises(asyncio.TimeoutError):
+            await broker.join(timeout=TIMEOUT / 10)
+        await broker.join()
+
+    asyncio.run(main())
@@ -2,13 +2,25 @@
 Tests on modules producer, broker and consumer
 which realizing extended consumer-producer paradigm.
 """
+import pickle
+import queue
 import random
-from time import sleep
+from time import monotonic, sleep
 from typing import Any, Callable, Iterable
 
 import pytest
 
-from median_filter import Broker, Consumer, Producer, Queue, set_n_steps
+import median_filter.producer as producer_module
+from median_filter import (
+    END_OF_STREAM,
+    Broker,
+    Consumer,
+    ProcessQueue,
+    Producer,
+    Queue,
+    Sequenced,
+    set_n_steps,
+)
 
 TIMEOUT = 0.1
 
@@ -257,7 +269,240 @@ def test_consumer_names():
         fun=lambda x: x,
         timeout=TIMEOUT,
     )
-    queue.cancel_join_thread()
-    sleep(0.1)
     assert consumer0.name == "Consumer-0"
     assert consumer1.name == "Consumer-1"
+
+
+def test_end_of_stream():
+    """Stages stop on END_OF_STREAM markers without waiting for timeout."""
+    n_steps = 10
+    rets = []
+    counter = set_n_steps(n_steps)
+    queue0: Queue = Queue()
+    queue1: Queue = Queue()
+    producer = Producer(queue0, lambda: (next(counter), 1), end_of_stream=2)
+    brokers = [Broker(queue0, queue1, lambda x: 2 * x, timeout=None) for _ in range(2)]
+    consumer = Consumer(queue1, rets.append, timeout=None, upstreams=2)
+
+    start = monotonic()
+    for worker in (producer, *brokers, consumer):
+        worker.start()
+    for worker in (producer, *brokers, consumer):
+        worker.join()
+
+    assert monotonic() - start < 5.0
+    assert rets == [2] * n_steps
+    assert queue0.empty()
+    assert queue1.empty()
+
+
+def test_end_of_stream_pickle():
+    """END_OF_STREAM marker is the same object after pickling."""
+    assert pickle.loads(pickle.dumps(END_OF_STREAM)) is END_OF_STREAM
+    queue = ProcessQueue()
+    queue.put(END_OF_STREAM)
+    assert queue.get(timeout=1) is END_OF_STREAM
+    queue.close()
+
+
+@pytest.mark.parametrize(
+    "overflow, expected, dropped",
+    (
+        ("drop_newest", [0, 1], 3),
+        ("drop_oldest", [3, 4], 3),
+        ("latest", [4], 4),
+    ),
+)
+def test_producer_overflow(overflow: str, expected: list, dropped: int):
+    """Producer drops data according to overflow policy when queue is full.
+
+    Args:
+        overflow (str): overflow policy
+        expected (list): data left in queue
+        dropped (int): number of dropped data
+    """
+    bounded_queue: queue.Queue = queue.Queue(maxsize=2)
+    counter = set_n_steps(5)
+    values = iter(range(5))
+    prod = Producer(
+        bounded_queue,
+        lambda: (next(counter), next(values, None)),
+        overflow=overflow,
+    )
+    prod.start()
+    prod.join()
+
+    assert [bounded_queue.get_nowait() for _ in expected] == expected
+    assert bounded_queue.empty()
+    assert prod.dropped == dropped
+
+
+def test_overflow_keeps_end_of_stream():
+    """END_OF_STREAM markers are not dropped from full queue."""
+    bounded_queue: queue.Queue = queue.Queue(maxsize=2)
+    bounded_queue.put(END_OF_STREAM)
+    bounded_queue.put(0)
+    broker = Broker(queue.Queue(), bounded_queue, lambda x: x, overflow="drop_oldest")
+    broker.put(bounded_queue, 1)
+
+    assert bounded_queue.get_nowait() is END_OF_STREAM
+    assert bounded_queue.get_nowait() == 1
+    assert broker.dropped == 1
+
+
+def test_wrong_overflow():
+    """Unknown overflow policy is rejected."""
+    with pytest.raises(ValueError):
+        Producer(Queue(), lambda: (False, None), overflow="unknown")
+
+
+@pytest.mark.parametrize("overflow", ("drop_oldest", "latest"))
+def test_overflow_queue_full_of_markers(overflow: str):
+    """New data is dropped when full queue has only END_OF_STREAM markers.
+
+    Args:
+        overflow (str): overflow policy
+    """
+    bounded_queue: queue.Queue = queue.Queue(maxsize=1)
+    bounded_queue.put(END_OF_STREAM)
+    broker = Broker(queue.Queue(), bounded_queue, lambda x: x, overflow=overflow)
+    broker.put(bounded_queue, 1)
+
+    assert broker.dropped == 1
+    assert bounded_queue.get_nowait() is END_OF_STREAM
+    assert bounded_queue.empty()
+
+
+class FakeClock:
+    """Monotonic clock which moves only by sleep, so schedules are deterministic."""
+
+    def __init__(self) -> None:
+        """Initialize self."""
+        self.now = 100.0
+
+    def monotonic(self) -> float:
+        """Return current time.
+
+        Returns:
+            float: time in seconds
+        """
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """Move the clock.
+
+        Args:
+            seconds (float): time to move
+        """
+        self.now += seconds
+
+
+@pytest.mark.parametrize("schedule", ("catch_up", "skip"))
+def test_producer_schedule(schedule: str, monkeypatch: pytest.MonkeyPatch):
+    """Producer keeps ticks of monotonic clock, time of producing does not add up.
+
+    Args:
+        schedule (str): schedule of producer
+        monkeypatch (pytest.MonkeyPatch): replaces clock of producer by FakeClock
+    """
+    clock = FakeClock()
+    monkeypatch.setattr(producer_module, "monotonic", clock.monotonic)
+    monkeypatch.setattr(producer_module, "sleep", clock.sleep)
+    interval = 0.02
+    counter = set_n_steps(10)
+
+    def fun():
+        clock.sleep(0.01)
+        return next(counter), 1
+
+    out_queue: queue.Queue = queue.Queue()
+    prod = Producer(out_queue, fun, interval, sequence=True, schedule=schedule)
+    prod.start()
+    prod.join()
+
+    times = [out_queue.get_nowait().timestamp for _ in range(10)]
+    for i, time in enumerate(times):
+        assert time - times[0] == pytest.approx(i * interval)
+    assert prod.ticks == 11
+    assert prod.missed_ticks == 0
+    assert prod.max_jitter == pytest.approx(0)
+
+
+@pytest.mark.parametrize("schedule, n_data", (("catch_up", 5), ("skip", 3)))
+def test_producer_late_ticks(schedule: str, n_data: int):
+    """Producer runs late ticks one after another or skips them.
+
+    Args:
+        schedule (str): schedule of producer
+        n_data (int): number of data produced in 0.2 s
+    """
+    interval = 0.04
+    start = monotonic()
+    counter = set_n_steps(100)
+
+    def fun():
+        if monotonic() - start < 0.1:
+            sleep(0.1)
+        if monotonic() - start > 0.18:
+            return False, None
+        return next(counter), 1
+
+    out_queue: queue.Queue = queue.Queue()
+    prod = Producer(out_queue, fun, interval, schedule=schedule)
+    prod.start()
+    prod.join()
+
+    assert out_queue.qsize() == n_data
+    assert prod.missed_ticks == (2 if schedule == "skip" else 0)
+
+
+def test_wrong_schedule():
+    """Unknown schedule is rejected."""
+    with pytest.raises(ValueError):
+        Producer(Queue(), lambda: (False, None), schedule="unknown")
+
+
+@pytest.mark.parametrize("put_batch", (False, True))
+def test_broker_batch(put_batch: bool):
+    """Broker converts up to batch_size data by one call of batch_fun.
+
+    Args:
+        put_batch (bool): results are put as one list
+    """
+    queue_in: queue.Queue = queue.Queue()
+    queue_out: queue.Queue = queue.Queue()
+    for i in range(7):
+        queue_in.put(Sequenced(i, monotonic(), i))
+    queue_in.put(END_OF_STREAM)
+    broker = Broker(
+        queue_in,
+        queue_out,
+        lambda x: x,
+        batch_size=3,
+        batch_fun=lambda values: [(len(values), value) for value in values],
+        put_batch=put_batch,
+        end_of_stream=0,
+    )
+    broker.start()
+    broker.join()
+
+    results = [queue_out.get_nowait() for _ in range(queue_out.qsize())]
+    if put_batch:
+        assert [len(batch) for batch in results] == [3, 3, 1]
+        results = [item for batch in results for item in batch]
+    assert [item.index for item in results] == list(range(7))
+    assert [item.data for item in results] == [(3, i) for i in range(6)] + [(1, 6)]
+
+
+def test_broker_batch_timeout():
+    """Broker does not wait longer than batch_timeout for the rest of the batch."""
+    queue_in: queue.Queue = queue.Queue()
+    queue_out: queue.Queue = queue.Queue()
+    broker = Broker(
+        queue_in, queue_out, lambda x: 2 * x, batch_size=4, batch_timeout=0.05
+    )
+    broker.start()
+    queue_in.put(1)
+    assert queue_out.get(timeout=0.5) == 2
+    queue_in.put(END_OF_STREAM)
+    broker.join()
@@ -0,0 +1,54 @@
+"""
+Tests on benchmarks which measure speed of the package.
+"""
+import json
+import os
+
+from benchmarks.bench import BENCHMARKS, cases, compare, main, run_case
+
+KEYS = {"name", "params", "frames", "fps", "p50_ms", "p99_ms", "peak_rss_mb"}
+
+
+def test_run_case():
+    """Each benchmark reports frames per second, latency percentiles and peak RSS."""
+    for name, params in (
+        ("resize_median", {"size": (48, 64), "dtype": "uint8", "method": "fused"}),
+        ("broker", {"queue_type": "thread"}),
+        ("frame_queue", {"queue_type": "frames"}),
+        ("recorder", {"file_ext": "png"}),
+        ("pipeline", {"method": "rank", "writers": 0}),
+    ):
+        if name == "resize_median":
+            params["filter_shape"] = (3, 3, 1)
+        result = run_case(name, {**params, "frames": 3})
+        assert set(result) == KEYS
+        assert result["frames"] == 3
+        assert result["fps"] > 0
+        assert 0 <= result["p50_ms"] <= result["p99_ms"]
+
+
+def test_cases():
+    """Quick cases cover every benchmark with less cases."""
+    quick = cases(quick=True)
+    assert {name for name, _ in quick} == set(BENCHMARKS)
+    assert len(quick) < len(cases())
+
+
+def test_main(tmp_path):
+    """Results are saved as JSON and compared with earlier results.
+
+    Args:
+        tmp_path (pathlib.Path): temporary folder
+    """
+    before = os.path.join(tmp_path, "before.json")
+    after = os.path.join(tmp_path, "after.json")
+    assert main(["--quick", "--filter", '"thread"', "--output", before]) == 0
+    with open(before, encoding="utf-8") as file:
+        saved = json.load(file)
+    assert len(saved["results"]) == 1
+    assert "commit" in saved["environment"]
+
+    slower = [dict(result, fps=result["fps"] / 2) for result in saved["results"]]
+    assert len(compare(saved["results"], slower)) == 1
+    assert not compare(slower, saved["results"])
+    assert main(["--quick", "--filter", '"thread"', "--output", after]) in (0, 1)
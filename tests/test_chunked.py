@@ -0,0 +1,101 @@
+"""
+Tests on module chunked which streams frames into one file of compressed chunks.
+"""
+import os
+import queue
+
+import numpy as np
+import pytest
+
+from median_filter import END_OF_STREAM, ChunkedReader, ChunkedRecorder, FramePool
+
+TIMEOUT = 0.1
+
+
+@pytest.mark.parametrize("level", (0, 1, 9))
+def test_record_and_read(level: int, try_folder: str):
+    """Frames are read back by number from chunks compressed on any level.
+
+    Args:
+        level (int): zlib compression level
+        try_folder (str): empty folder for the file
+    """
+    file_name = os.sep.join([try_folder, "frames.mfc"])
+    frames_queue: queue.Queue = queue.Queue()
+    pics = [np.random.randint(4, size=(6, 5, 3), dtype=np.uint8) for _ in range(11)]
+    for pic in pics:
+        frames_queue.put(pic)
+    frames_queue.put(END_OF_STREAM)
+
+    recorder = ChunkedRecorder(
+        frames_queue, file_name, (6, 5, 3), chunk_size=4, level=level, max_in_flight=1
+    )
+    recorder.start()
+    recorder.join()
+
+    reader = ChunkedReader(file_name)
+    assert len(reader) == 11
+    for i in (5, 0, 10, 4, -1):
+        assert (reader[i] == pics[i]).all()
+    with pytest.raises(IndexError):
+        reader[11]  # pylint: disable=pointless-statement
+
+
+def test_read_without_index(try_folder: str):
+    """File cut before its index is read chunk by chunk, broken chunk is ignored.
+
+    Args:
+        try_folder (str): empty folder for the file
+    """
+    file_name = os.sep.join([try_folder, "frames.mfc"])
+    pool = FramePool((4, 4, 1), "uint16", size=9)
+    frames_queue: queue.Queue = queue.Queue()
+    for i in range(9):
+        frame = pool.acquire()
+        frame[...] = i
+        frames_queue.put(frame)
+        if i == 2:
+            frames_queue.put(np.zeros((3, 3, 1), dtype=np.uint16))
+
+    recorder = ChunkedRecorder(
+        frames_queue,
+        file_name,
+        (4, 4, 1),
+        "uint16",
+        chunk_size=2,
+        pool=pool,
+        timeout=TIMEOUT,
+    )
+    recorder.start()
+    recorder.join()
+    assert pool._free.qsize() == 9  # pylint: disable=protected-access
+
+    reader = ChunkedReader(file_name)
+    assert [int(reader[i][0, 0, 0]) for i in range(len(reader))] == list(range(9))
+    with open(file_name, "r+b") as file:
+        file.truncate(reader._offsets[-1] + 5)  # pylint: disable=protected-access
+    reader = ChunkedReader(file_name)
+    assert [int(reader[i][0, 0, 0]) for i in range(len(reader))] == list(range(8))
+
+
+def test_record_float_frames(try_folder: str):
+    """Float frames are scaled to uint8, frames of other dtype are not recorded.
+
+    Args:
+        try_folder (str): empty folder for the file
+    """
+    file_name = os.sep.join([try_folder, "frames.mfc"])
+    frames_queue: queue.Queue = queue.Queue()
+    frame = np.random.rand(6, 5, 3)
+    frames_queue.put(frame)
+    frames_queue.put(np.zeros((6, 5, 3), dtype=np.uint16))
+    frames_queue.put(END_OF_STREAM)
+
+    recorder = ChunkedRecorder(frames_queue, file_name, (6, 5, 3), chunk_size=2)
+    recorder.start()
+    recorder.join()
+
+    reader = ChunkedReader(file_name)
+    assert len(reader) == 1
+    assert (reader[0] == (255 * frame).astype(np.uint8)).all()
+    assert recorder.metrics.errors == 1
@@ -0,0 +1,101 @@
+"""
+Tests on module frame_file which records frames into one memory-mapped file.
+"""
+import os
+import queue
+from time import monotonic
+
+import numpy as np
+
+from median_filter import (
+    END_OF_STREAM,
+    FrameFileReader,
+    FrameFileRecorder,
+    FramePool,
+    Sequenced,
+)
+
+TIMEOUT = 0.1
+
+
+def test_record_and_read(try_folder: str):
+    """Recorded frames, their indexes and timestamps are read back by number.
+
+    Args:
+        try_folder (str): empty folder for the file
+    """
+    file_name = os.sep.join([try_folder, "frames"])
+    frames_queue: queue.Queue = queue.Queue()
+    pics = [np.random.randint(256, size=(6, 5, 3), dtype=np.uint8) for _ in range(5)]
+    for i, pic in enumerate(pics):
+        frames_queue.put(Sequenced(10 + i, monotonic(), pic))
+    frames_queue.put(END_OF_STREAM)
+
+    recorder = FrameFileRecorder(frames_queue, file_name, (6, 5, 3), capacity=8)
+    recorder.start()
+    recorder.join()
+
+    reader = FrameFileReader(file_name)
+    assert len(reader) == 5
+    for i in (3, 0, 4):
+        assert (reader[i] == pics[i]).all()
+    assert list(reader.indexes) == list(range(10, 15))
+    assert (np.diff(reader.timestamps) >= 0).all()
+    assert (np.load(f"{file_name}.npy") == np.stack(pics)).all()
+
+
+def test_record_over_capacity(try_folder: str):
+    """Frames over capacity and frames with wrong shape are not recorded.
+
+    Args:
+        try_folder (str): empty folder for the file
+    """
+    file_name = os.sep.join([try_folder, "frames"])
+    pool = FramePool((4, 4, 1), "uint16", size=6)
+    frames_queue: queue.Queue = queue.Queue()
+    frames_queue.put(np.zeros((3, 3, 1), dtype=np.uint16))
+    for i in range(5):
+        frame = pool.acquire()
+        frame[...] = i
+        frames_queue.put(frame)
+
+    recorder = FrameFileRecorder(
+        frames_queue,
+        file_name,
+        (4, 4, 1),
+        "uint16",
+        capacity=3,
+        pool=pool,
+        timeout=TIMEOUT,
+    )
+    recorder.start()
+    recorder.join()
+
+    reader = FrameFileReader(file_name)
+    assert [int(frame[0, 0, 0]) for frame in reader.frames] == [0, 1, 2]
+    assert list(reader.indexes) == [0, 1, 2]
+    assert recorder.dropped == 2
+    assert pool._free.qsize() == 6  # pylint: disable=protected-access
+
+
+def test_record_float_frames(try_folder: str):
+    """Float frames are scaled to uint8, frames of other dtype are not recorded.
+
+    Args:
+        try_folder (str): empty folder for the file
+    """
+    file_name = os.sep.join([try_folder, "frames"])
+    frames_queue: queue.Queue = queue.Queue()
+    frame = np.random.rand(6, 5, 3)
+    frames_queue.put(frame)
+    frames_queue.put(np.zeros((6, 5, 3), dtype=np.uint16))
+    frames_queue.put(END_OF_STREAM)
+
+    recorder = FrameFileRecorder(frames_queue, file_name, (6, 5, 3), capacity=4)
+    recorder.start()
+    recorder.join()
+
+    reader = FrameFileReader(file_name)
+    assert len(reader) == 1
+    assert (reader[0] == (255 * frame).astype(np.uint8)).all()
+    assert recorder.metrics.errors == 1
@@ -0,0 +1,117 @@
+"""
+Tests on module frame_pool which gives preallocated frames to pipeline stages.
+"""
+import os
+import queue
+import tracemalloc
+from shutil import rmtree
+
+import numpy as np
+import pytest
+
+from median_filter import FramePool, MedianFilter, PictureRecorder, Producer
+from median_filter.median_filter import _resize_median_filter_native
+
+TIMEOUT = 0.1
+
+
+@pytest.mark.parametrize("shared", (False, True))
+def test_acquire_release(shared: bool):
+    """FramePool gives every frame once and takes it back.
+
+    Args:
+        shared (bool): pool in shared memory
+    """
+    pool = FramePool((4, 5, 3), "uint16", size=3, shared=shared)
+    frames = [pool.acquire(timeout=TIMEOUT) for _ in range(3)]
+    assert sorted(pool.index(frame) for frame in frames) == [0, 1, 2]
+    assert all(frame.dtype == np.uint16 for frame in frames)
+    with pytest.raises(queue.Empty):
+        pool.acquire(timeout=TIMEOUT)
+
+    pool.release(frames[1])
+    assert pool.index(pool.acquire(timeout=TIMEOUT)) == 1
+    with pytest.raises(ValueError):
+        pool.release(np.zeros((4, 5, 3), dtype=np.uint16))
+    del frames
+    pool.close()
+
+
+def test_filter_out():
+    """Median filter writes result into given array."""
+    frame = np.random.randint(256, size=(32, 32, 3), dtype=np.uint8)
+    out = np.empty((16, 16, 3), dtype=np.uint8)
+    footprint = np.ones((3, 3), dtype=bool)
+    result = _resize_median_filter_native(frame, (16, 16), footprint, out=out)
+    assert result is out
+    assert (out == _resize_median_filter_native(frame, (16, 16), footprint)).all()
+
+
+def test_filter_out_does_not_allocate():
+    """Native median filter with out allocates no frames after the first call."""
+    frame = np.random.randint(256, size=(256, 256, 3), dtype=np.uint8)
+    out = np.empty((128, 128, 3), dtype=np.uint8)
+    footprint = np.ones((3, 3), dtype=bool)
+    _resize_median_filter_native(frame, (128, 128), footprint, out=out)
+    tracemalloc.start()
+    _resize_median_filter_native(frame, (128, 128), footprint, out=out)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < 128 * 128
+
+
+@pytest.mark.parametrize("batch_size, writers", ((1, 0), (3, 0), (1, 2)))
+def test_pooled_pipeline(batch_size: int, writers: int):
+    """All frames return to their pools after pipeline with pools.
+
+    Args:
+        batch_size (int): number of frames converted together
+        writers (int): number of recorder writer threads
+    """
+    folder_name = os.sep.join(["tests", "try"])
+    file_name = "test"
+    if os.path.exists(folder_name):
+        rmtree(folder_name)
+    n_steps = 20
+    input_pool = FramePool((32, 32, 3), "uint8", size=4)
+    output_pool = FramePool((16, 16, 3), "uint8", size=4)
+    queue0: queue.Queue = queue.Queue()
+    queue1: queue.Queue = queue.Queue()
+    steps = iter(range(n_steps))
+
+    def produce():
+        if next(steps, None) is None:
+            return False, None
+        frame = input_pool.acquire()
+        frame[...] = np.random.randint(256, size=frame.shape)
+        return True, frame
+
+    producer = Producer(queue0, produce)
+    broker = MedianFilter(
+        queue0,
+        queue1,
+        (16, 16),
+        (3, 3, 1),
+        method="rank",
+        pool=output_pool,
+        input_pool=input_pool,
+        timeout=TIMEOUT,
+        batch_size=batch_size,
+        batch_timeout=0.01,
+    )
+    consumer = PictureRecorder(
+        queue1,
+        folder_name,
+        file_name,
+        pool=output_pool,
+        writers=writers,
+        timeout=TIMEOUT,
+    )
+    for worker in (producer, broker, consumer):
+        worker.start()
+    for worker in (producer, broker, consumer):
+        worker.join()
+
+    assert len(os.listdir(folder_name)) == n_steps
+    assert output_pool._free.qsize() == 4  # pylint: disable=protected-access
+    assert input_pool._free.qsize() == 4  # pylint: disable=protected-access
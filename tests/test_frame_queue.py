@@ -0,0 +1,102 @@
+"""
+Tests on module frame_queue which passes frames between processes.
+"""
+import multiprocessing
+from queue import Empty, Full
+
+import numpy as np
+import pytest
+
+from median_filter import END_OF_STREAM, Broker, FrameQueue, Sequenced
+from median_filter.frame_queue import dumps_frame
+
+TIMEOUT = 0.1
+
+
+def run_broker(queue_in: FrameQueue, queue_out: FrameQueue) -> None:
+    """Run Broker inverting frames in child process.
+
+    Args:
+        queue_in (FrameQueue): queue with frames
+        queue_out (FrameQueue): queue for inverted frames
+    """
+    broker = Broker(queue_in, queue_out, np.invert, verbose=False, timeout=None)
+    broker.run()
+    queue_out.close()
+
+
+@pytest.mark.parametrize(
+    "frame",
+    (
+        np.arange(24, dtype=np.uint16).reshape(2, 3, 4),
+        np.asfortranarray(np.arange(12, dtype=np.float32).reshape(3, 4)),
+        np.arange(24, dtype=np.uint8).reshape(4, 6)[:, ::2],
+        np.empty((0, 3), np.uint8),
+    ),
+)
+def test_round_trip(frame: np.ndarray):
+    """Frames keep data, shape and dtype and are writable after transfer.
+
+    Args:
+        frame (np.ndarray): frame to transfer
+    """
+    queue = FrameQueue()
+    queue.put(Sequenced(7, 1.5, frame))
+    result = queue.get(timeout=1)
+    assert result.index == 7
+    assert result.timestamp == 1.5
+    assert result.data.dtype == frame.dtype
+    np.testing.assert_array_equal(result.data, frame)
+    assert result.data.flags.writeable
+    queue.close()
+
+
+def test_out_of_band():
+    """Data of contiguous array are not copied into pickle."""
+    frame = np.zeros((64, 64, 3), np.uint8)
+    header, data, raw = dumps_frame(Sequenced(0, 0.0, frame))
+    assert len(data) < 1000
+    assert raw.nbytes == frame.nbytes
+    assert np.shares_memory(np.frombuffer(raw, np.uint8), frame)
+    assert len(header) > 0
+
+
+def test_bounded():
+    """Bounded queue raises Full and Empty like multiprocessing.Queue."""
+    queue = FrameQueue(2)
+    queue.put(1)
+    queue.put_nowait(2)
+    assert queue.full()
+    with pytest.raises(Full):
+        queue.put(3, timeout=TIMEOUT)
+    assert queue.qsize() == 2
+    assert [queue.get(), queue.get()] == [1, 2]
+    assert queue.empty()
+    with pytest.raises(Empty):
+        queue.get(timeout=TIMEOUT)
+    with pytest.raises(Empty):
+        queue.get_nowait()
+    queue.close()
+
+
+def test_other_process():
+    """Broker in child process gets and returns frames and END_OF_STREAM."""
+    queue_in, queue_out = FrameQueue(4), FrameQueue(4)
+    process = multiprocessing.Process(target=run_broker, args=(queue_in, queue_out))
+    process.start()
+    frames = [np.full((48, 64, 3), i, np.uint8) for i in range(10)]
+    results = []
+    for i, frame in enumerate(frames):
+        queue_in.put(Sequenced(i, 0.0, frame))
+        if i >= 2:
+            results.append(queue_out.get(timeout=10))
+    queue_in.put(END_OF_STREAM)
+    while len(results) < len(frames):
+        results.append(queue_out.get(timeout=10))
+    assert queue_out.get(timeout=10) is END_OF_STREAM
+    process.join(10)
+    assert process.exitcode == 0
+    assert [result.index for result in results] == list(range(10))
+    for frame, result in zip(frames, results):
+        np.testing.assert_array_equal(result.data, np.invert(frame))
+    queue_in.close()
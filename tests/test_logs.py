@@ -0,0 +1,68 @@
+"""
+Tests on module logs which configures logging of workers.
+"""
+import io
+import logging
+
+import pytest
+
+from median_filter import Worker, configure_logging
+from median_filter.logs import LOGGER
+
+
+@pytest.fixture(name="stream")
+def fixture_stream():
+    """Stream with messages of the package logger, handlers are removed after test.
+
+    Yields:
+        io.StringIO: stream with logged messages
+    """
+    handlers = list(LOGGER.handlers)
+    level = LOGGER.level
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    LOGGER.addHandler(handler)
+    LOGGER.setLevel(logging.INFO)
+    yield stream
+    LOGGER.handlers[:] = handlers
+    LOGGER.setLevel(level)
+
+
+def test_log_item_rate_limited(stream: io.StringIO):
+    """Messages about single items are logged at most once per interval.
+
+    Args:
+        stream (io.StringIO): stream with logged messages
+    """
+    worker = Worker()
+    worker.ITEM_LOG_INTERVAL = 0.0
+    worker.log_item("Item %d.", 0)
+    worker.ITEM_LOG_INTERVAL = 100.0
+    for i in range(1, 10):
+        worker.log_item("Item %d.", i)
+    worker.ITEM_LOG_INTERVAL = 0.0
+    worker.log_item("Item %d.", 10)
+
+    assert stream.getvalue().splitlines()[-2:] == [
+        "Item 0.",
+        "Item 10. (9 item messages suppressed)",
+    ]
+
+
+def test_configure_logging():
+    """configure_logging adds handler to the package logger only,
+    non-blocking handler writes messages after the listener stops."""
+    root_handlers = list(logging.getLogger().handlers)
+    handlers = list(LOGGER.handlers)
+    listener = configure_logging(non_blocking=True, fmt="%(message)s")
+    try:
+        assert logging.getLogger().handlers == root_handlers
+        assert len(LOGGER.handlers) == len(handlers) + 1
+        stream = io.StringIO()
+        listener.handlers[0].setStream(stream)
+        Worker().log("Message %s.", "text")
+        listener.stop()
+        assert "Message text." in stream.getvalue()
+    finally:
+        LOGGER.handlers[:] = handlers
+        LOGGER.setLevel(logging.NOTSET)
@@ -1,13 +1,33 @@
 """
 Tests on module median_filter which is responsible for saving images.
 """
+import queue
+import threading
+from time import monotonic
 from typing import Tuple
 
 import numpy as np
 import pytest
+from scipy import ndimage
 
-from median_filter import Queue
-from median_filter.median_filter import MedianFilter, _resize_median_filter
+from median_filter import FramePool, Queue
+from median_filter.kernels import (
+    _fused_resize_median,
+    _histogram_median,
+    _median_network,
+    _native_resize,
+    _nearest_indices,
+    _resize_plan,
+    _separable_median,
+)
+from median_filter.median_filter import (
+    MedianFilter,
+    _make_filter,
+    _resize_median_filter,
+    _resize_median_filter_native,
+    _resize_median_filter_tiled,
+)
+from median_filter.process_pool import ProcessPoolMedianFilter
 
 median_check_params = (
     ((3, 3), (2**4, 2**10)),
@@ -147,3 +167,369 @@ def test_MedianFilter(  # pylint: disable=invalid-name
     for pic in pics:
         new_pic = queue_out.get()
         assert random_median_check(pic, new_pic, median_shape, pic_shape)
+
+
+@pytest.mark.parametrize("dtype", ("uint8", "uint16"))
+def test_resize_median_filter_native_shape(dtype: str):
+    """_resize_median_filter_native keeps dtype while resizing.
+
+    Args:
+        dtype (str): dtype of frames
+    """
+    pics = [np.random.randint(256, size=(128, 512, 3)).astype(dtype) for _ in range(3)]
+
+    for pic in pics:
+        new_pic = _resize_median_filter_native(
+            pic,
+            (64, 256),
+            np.ones((3, 3), dtype=bool),
+        )
+        assert new_pic.shape == (64, 256, 3)
+        assert new_pic.dtype == np.dtype(dtype)
+
+
+@pytest.mark.parametrize("median_shape, pic_shape", median_check_params)
+def test_resize_median_filter_native_median(
+    median_shape: Tuple[int, int],
+    pic_shape: Tuple[int, int],
+):
+    """_resize_median_filter_native standard operation test without resizing.
+
+    Args:
+        median_shape (Tuple[int, int]): shape of median filter
+        pic_shape (Tuple[int, int]): shape of picture
+    """
+    pics = [
+        np.random.randint(256, size=(*pic_shape, 3), dtype=np.uint8) for _ in range(3)
+    ]
+    for pic in pics:
+        new_pic = _resize_median_filter_native(
+            pic,
+            pic_shape,
+            np.ones(median_shape, dtype=bool),
+        )
+
+        assert random_median_check(pic, new_pic, median_shape, pic_shape)
+
+
+def test_native_resize_plan():
+    """_native_resize reuses cached plan and gives the same frame for any memory layout."""
+    pic = np.random.randint(256, size=(48, 40, 3), dtype=np.uint8)
+    rows = _nearest_indices(48, 24)
+    cols = _nearest_indices(40, 30)
+    expected_pic = pic[rows[:, None], cols]
+
+    _resize_plan.cache_clear()
+    assert (_native_resize(pic, (24, 30)) == expected_pic).all()
+    out = np.empty((30, 24, 3), dtype=np.uint8).transpose(1, 0, 2)
+    assert (
+        _native_resize(np.asfortranarray(pic), (24, 30), out=out) == expected_pic
+    ).all()
+    assert _resize_plan.cache_info().hits == 1
+    assert _resize_plan.cache_info().misses == 1
+
+
+def test_resize_median_filter_native_float():
+    """_resize_median_filter_native rejects float frames."""
+    with pytest.raises(ValueError):
+        _resize_median_filter_native(
+            np.random.random((16, 16, 3)),
+            (8, 8),
+            np.ones((3, 3), dtype=bool),
+        )
+
+
+def test_MedianFilter_rank():  # pylint: disable=invalid-name
+    """MedianFilter with method rank returns uint8 frames."""
+    queue_in: Queue = Queue()
+    queue_out: Queue = Queue()
+
+    pics = [np.random.randint(256, size=(64, 64, 3), dtype=np.uint8) for _ in range(3)]
+    for pic in pics:
+        queue_in.put(pic)
+
+    working_thread = MedianFilter(
+        queue_in,
+        queue_out,
+        (64, 64),
+        (5, 5, 1),
+        method="rank",
+        timeout=TIMEOUT,
+    )
+    working_thread.start()
+    working_thread.join()
+
+    for pic in pics:
+        new_pic = queue_out.get()
+        assert new_pic.dtype == np.uint8
+        assert random_median_check(pic, new_pic, (5, 5), (64, 64))
+
+
+@pytest.mark.parametrize("median_shape, pic_shape", median_check_params)
+def test_histogram_median(
+    median_shape: Tuple[int, int],
+    pic_shape: Tuple[int, int],
+):
+    """_histogram_median gives exactly the median with edge pixels repeated.
+
+    Args:
+        median_shape (Tuple[int, int]): shape of median filter
+        pic_shape (Tuple[int, int]): shape of picture
+    """
+    pic = np.random.randint(256, size=(*pic_shape[:2], 3), dtype=np.uint8)
+    new_pic = _histogram_median(pic, np.ones(median_shape, dtype=bool))
+    expected_pic = ndimage.median_filter(pic, size=(*median_shape, 1), mode="nearest")
+    assert new_pic.dtype == np.uint8
+    assert (new_pic == expected_pic).all()
+
+
+def test_histogram_median_uint16():
+    """_histogram_median counts only uint8 values."""
+    pic = np.zeros((8, 8, 1), dtype=np.uint16)
+    with pytest.raises(ValueError):
+        _histogram_median(pic, np.ones((3, 3), dtype=bool))
+
+
+@pytest.mark.parametrize("dtype", ("uint8", "uint16"))
+def test_separable_median(dtype: str):
+    """_separable_median is exact on gradient and close to median on noisy gradient
+        away from the edges.
+
+    Args:
+        dtype (str): dtype of picture
+    """
+    footprint = np.ones((15, 15), dtype=bool)
+    rows, cols = np.mgrid[:64, :96]
+    pic = (rows + cols)[:, :, None].astype(dtype)
+    inner = (slice(7, -7), slice(7, -7))
+    assert (_separable_median(pic, footprint)[inner] == pic[inner]).all()
+
+    noisy = pic.copy()
+    noise = np.random.random(pic.shape) < 0.05
+    noisy[noise] = np.random.randint(256, size=noise.sum())
+    new_pic = _separable_median(noisy, footprint)
+    expected_pic = ndimage.median_filter(noisy, size=(15, 15, 1), mode="nearest")
+    assert new_pic.dtype == np.dtype(dtype)
+    assert np.abs(new_pic[inner].astype(int) - expected_pic[inner]).mean() < 1
+
+
+@pytest.mark.parametrize("size", range(1, 50))
+def test_median_network(size: int):
+    """Sorting network selects median of any values.
+
+    Args:
+        size (int): number of values
+    """
+    values = list(np.random.randint(256, size=size))
+    expected = sorted(values)[size // 2]
+    for a, b, _, _ in _median_network(size):
+        values[a], values[b] = min(values[a], values[b]), max(values[a], values[b])
+    assert values[size // 2] == expected
+
+
+@pytest.mark.parametrize("dtype", ("uint8", "uint16"))
+@pytest.mark.parametrize("median_shape", ((1, 1), (3, 3), (4, 3), (5, 5), (7, 7)))
+def test_fused_resize_median(median_shape: Tuple[int, int], dtype: str):
+    """_fused_resize_median equals median of the resized frame with edge repeated.
+
+    Args:
+        median_shape (Tuple[int, int]): shape of median filter
+        dtype (str): dtype of picture
+    """
+    pic = np.random.randint(256, size=(96, 128, 3)).astype(dtype)
+    for new_shape in ((64, 48), (70, 200)):
+        new_pic = _fused_resize_median(pic, new_shape, median_shape)
+        resized = _native_resize(pic, new_shape)
+        expected_pic = ndimage.median_filter(
+            resized, size=(*median_shape, 1), mode="nearest"
+        )
+        assert new_pic.dtype == np.dtype(dtype)
+        assert (new_pic == expected_pic).all()
+
+
+@pytest.mark.parametrize("method", ("rank", "histogram", "separable", "fused"))
+@pytest.mark.parametrize("filter_shape", ((3, 3, 1), (4, 5, 1), (7, 7, 1)))
+def test_MedianFilter_tiles(method: str, filter_shape: Tuple[int, int, int]):
+    """MedianFilter with tiles gives the same frames as with whole frames.
+
+    Args:
+        method (str): median filter method
+        filter_shape (Tuple[int, int, int]): shape of median filter
+    """
+    pic = np.random.randint(256, size=(57, 71, 3), dtype=np.uint8)
+    for new_shape in ((30, 40), (80, 100)):
+        fun = MedianFilter(Queue(), Queue(), new_shape, filter_shape, method=method).fun
+        expected_pic = fun(pic)
+        for tile_rows, tile_workers in ((1, 1), (7, 1), (16, 3), (500, 2), (None, 4)):
+            tiled = MedianFilter(
+                Queue(),
+                Queue(),
+                new_shape,
+                filter_shape,
+                method=method,
+                tile_rows=tile_rows,
+                tile_workers=tile_workers,
+            )
+            assert (tiled.fun(pic) == expected_pic).all()
+
+
+def test_resize_median_filter_tiled_threads():
+    """Bands of one frame are filtered on several threads at the same time."""
+    threads = set()
+    barrier = threading.Barrier(3, timeout=TIMEOUT * 10)
+    fun = _make_filter((60, 40), (3, 3, 1), "rank")
+
+    def recording_fun(frame: np.ndarray, **kwargs) -> np.ndarray:
+        threads.add(threading.current_thread().name)
+        barrier.wait()
+        return fun(frame, **kwargs)
+
+    pic = np.random.randint(256, size=(90, 50, 3), dtype=np.uint8)
+    new_pic = _resize_median_filter_tiled(pic, (60, 40), 3, recording_fun, workers=3)
+
+    assert len(threads) == 3
+    assert (new_pic == fun(pic)).all()
+
+
+def test_MedianFilter_wrong_method():  # pylint: disable=invalid-name
+    """MedianFilter rejects unknown methods and filters spanning channels."""
+    with pytest.raises(ValueError):
+        MedianFilter(Queue(), Queue(), (8, 8), (3, 3, 1), method="unknown")
+    with pytest.raises(ValueError):
+        MedianFilter(Queue(), Queue(), (8, 8), (3, 3, 3), method="rank")
+    with pytest.raises(ValueError):
+        MedianFilter(Queue(), Queue(), (8, 8), (9, 9, 1), method="fused")
+    with pytest.raises(ValueError):
+        MedianFilter(Queue(), Queue(), (8, 8), (3, 3, 1), tile_rows=4)
+    with pytest.raises(ValueError):
+        MedianFilter(Queue(), Queue(), (8, 8), (3, 3, 1), tile_workers=2)
+    with pytest.raises(ValueError):
+        MedianFilter(Queue(), Queue(), (8, 8), (3, 3, 1), method="rank", tile_rows=0)
+
+
+@pytest.mark.parametrize(
+    "method", ("skimage", "rank", "histogram", "separable", "fused")
+)
+def test_MedianFilter_batch(method: str):  # pylint: disable=invalid-name
+    """MedianFilter with batch_size gives the same frames as without batches.
+
+    Args:
+        method (str): median filter method
+    """
+    queue_in: Queue = Queue()
+    queue_out: Queue = Queue()
+
+    pics = [np.random.randint(256, size=(64, 48, 3), dtype=np.uint8) for _ in range(7)]
+    pics[5] = np.random.randint(256, size=(60, 40, 3), dtype=np.uint8)
+    for pic in pics:
+        queue_in.put(pic)
+
+    working_thread = MedianFilter(
+        queue_in,
+        queue_out,
+        (32, 24),
+        (3, 3, 1),
+        method=method,
+        batch_size=3,
+        timeout=TIMEOUT,
+    )
+    working_thread.start()
+    working_thread.join()
+
+    fun = MedianFilter(Queue(), Queue(), (32, 24), (3, 3, 1), method=method).fun
+    for pic in pics:
+        new_pic = queue_out.get()
+        expected_pic = fun(pic)
+        assert new_pic.dtype == expected_pic.dtype
+        assert (new_pic == expected_pic).all()
+    assert queue_out.empty()
+
+
+@pytest.mark.parametrize("method", ("skimage", "rank"))
+def test_ProcessPoolMedianFilter(method: str):  # pylint: disable=invalid-name
+    """ProcessPoolMedianFilter gives the same frames as MedianFilter in the same order.
+
+    Args:
+        method (str): median filter method
+    """
+    queue_in: Queue = Queue()
+    queue_out: Queue = Queue()
+
+    pics = [np.random.randint(256, size=(64, 48, 3), dtype=np.uint8) for _ in range(9)]
+    for pic in pics:
+        queue_in.put(pic)
+
+    working_thread = ProcessPoolMedianFilter(
+        queue_in,
+        queue_out,
+        (32, 24),
+        (3, 3, 1),
+        processes=2,
+        slots=3,
+        method=method,
+        timeout=TIMEOUT,
+    )
+    working_thread.start()
+    working_thread.join()
+
+    fun = MedianFilter(Queue(), Queue(), (32, 24), (3, 3, 1), method=method).fun
+    for pic in pics:
+        new_pic = queue_out.get()
+        expected_pic = fun(pic)
+        assert new_pic.dtype == expected_pic.dtype
+        assert (new_pic == expected_pic).all()
+    assert queue_out.empty()
+
+
+def test_ProcessPoolMedianFilter_latency():  # pylint: disable=invalid-name
+    """ProcessPoolMedianFilter puts converted frame without waiting for next frames."""
+    queue_in: Queue = Queue()
+    queue_out: Queue = Queue()
+    working_thread = ProcessPoolMedianFilter(
+        queue_in, queue_out, (16, 16), (3, 3, 1), processes=1, slots=4, timeout=3.0
+    )
+    working_thread.start()
+    start = monotonic()
+    queue_in.put(np.random.random((32, 32, 3)))
+    assert queue_out.get(timeout=2.5).shape == (16, 16, 3)
+    assert monotonic() - start < 2.5
+    working_thread.join()
+
+
+def test_ProcessPoolMedianFilter_pools():  # pylint: disable=invalid-name
+    """ProcessPoolMedianFilter reads frames and indexes from shared pools in place."""
+    input_pool = FramePool((32, 32, 3), "uint8", size=4, shared=True)
+    output_pool = FramePool((16, 16, 3), "uint8", size=4, shared=True)
+    queue_in: queue.Queue = queue.Queue()
+    queue_out: queue.Queue = queue.Queue()
+    pics = []
+    for i in range(4):
+        frame = input_pool.acquire()
+        frame[...] = np.random.randint(256, size=frame.shape)
+        pics.append(frame.copy())
+        queue_in.put(frame if i % 2 else input_pool.index(frame))
+
+    working_thread = ProcessPoolMedianFilter(
+        queue_in,
+        queue_out,
+        (16, 16),
+        (3, 3, 1),
+        processes=2,
+        method="rank",
+        pool=output_pool,
+        input_pool=input_pool,
+        timeout=TIMEOUT,
+    )
+    working_thread.start()
+    working_thread.join()
+
+    fun = MedianFilter(Queue(), Queue(), (16, 16), (3, 3, 1), method="rank").fun
+    for pic in pics:
+        new_pic = queue_out.get_nowait()
+        assert output_pool.index(new_pic) is not None
+        assert (new_pic == fun(pic)).all()
+        output_pool.release(new_pic)
+    assert input_pool._free.qsize() == 4  # pylint: disable=protected-access
+    del new_pic
+    input_pool.close()
+    output_pool.close()
@@ -0,0 +1,73 @@
+"""
+Tests on module metrics which measures pipeline stages.
+"""
+import queue
+from time import sleep
+
+import pytest
+
+from median_filter import Broker, Consumer, MetricsReporter, Producer, set_n_steps
+from median_filter.metrics import LatencyHistogram, format_snapshot
+
+
+def test_latency_histogram():
+    """LatencyHistogram gives percentiles with precision of its buckets."""
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) == 0.0
+    for i in range(1, 101):
+        histogram.record(i / 1000)
+
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["mean"] == pytest.approx(0.0505)
+    assert summary["max"] == 0.1
+    assert 0.05 <= summary["p50"] < 0.05 * 1.3
+    assert 0.09 <= summary["p90"] < 0.09 * 1.3
+    assert summary["p99"] <= summary["max"]
+
+
+def test_stage_metrics():
+    """Workers count items and errors and measure processing, waiting and age."""
+    n_steps = 10
+    queue0: queue.Queue = queue.Queue()
+    queue1: queue.Queue = queue.Queue()
+    counter = set_n_steps(n_steps)
+    values = iter(range(n_steps))
+
+    def convert(value: int) -> int:
+        sleep(0.002)
+        if value == 3:
+            raise ValueError("wrong value")
+        return value
+
+    producer = Producer(
+        queue0,
+        lambda: (next(counter), next(values, None)),
+        sequence=True,
+        end_of_stream=1,
+    )
+    broker = Broker(queue0, queue1, convert)
+    consumer = Consumer(queue1, lambda x: None)
+    snapshots = []
+    reporter = MetricsReporter(
+        [producer, broker, consumer], interval=0.01, fun=snapshots.append
+    )
+    for worker in (reporter, producer, broker, consumer):
+        worker.start()
+    for worker in (producer, broker, consumer):
+        worker.join()
+    reporter.stop()
+    reporter.join()
+
+    producer_snapshot, broker_snapshot, consumer_snapshot = snapshots[-1]
+    assert producer_snapshot["items"] == n_steps
+    assert producer_snapshot["put_wait"]["count"] == n_steps
+    assert broker_snapshot["items"] == n_steps - 1
+    assert broker_snapshot["errors"] == 1
+    assert broker_snapshot["processing"]["p50"] >= 0.002
+    assert broker_snapshot["age"]["count"] == n_steps - 1
+    assert broker_snapshot["queue_depth"] == 0
+    assert consumer_snapshot["items"] == n_steps - 1
+    assert consumer_snapshot["age"]["p50"] >= 0.002
+    assert consumer_snapshot["get_wait"]["count"] == n_steps
+    assert "Broker" in format_snapshot(broker_snapshot)
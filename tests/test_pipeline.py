@@ -0,0 +1,173 @@
+"""
+Tests on module pipeline which wires and runs stages.
+"""
+import queue
+from threading import Thread
+from time import sleep
+
+import pytest
+
+from median_filter import (
+    Broker,
+    Consumer,
+    FrameQueue,
+    Pipeline,
+    Producer,
+    ReorderBuffer,
+    set_n_steps,
+)
+
+
+@pytest.mark.parametrize("queue_type", ("thread", "process"))
+def test_pipeline(queue_type: str):
+    """Pipeline passes all data through parallel brokers in order and ends.
+
+    Args:
+        queue_type (str): type of queues
+    """
+    n_steps = 50
+    counter = set_n_steps(n_steps)
+    values = iter(range(n_steps))
+    rets = []
+
+    pipeline = Pipeline(queue_type=queue_type, maxsize=8)
+    pipeline.add(Producer, lambda: (next(counter), next(values, None)), sequence=True)
+    pipeline.add(Broker, lambda x: 2 * x, workers=3)
+    pipeline.add(ReorderBuffer, window=n_steps)
+    pipeline.add(Consumer, rets.append)
+    pipeline.run()
+
+    assert rets == [2 * i for i in range(n_steps)]
+    assert all(
+        not worker.is_alive() for stage in pipeline.stages for worker in stage.workers
+    )
+    assert sum(snapshot["items"] for snapshot in pipeline.snapshot()[1:4]) == n_steps
+
+
+def test_pipeline_scaling():
+    """Slow stage gets more workers while its queue is deep."""
+    n_steps = 60
+    counter = set_n_steps(n_steps)
+    rets = []
+
+    def slow(value: int) -> int:
+        sleep(0.01)
+        return value
+
+    pipeline = Pipeline(poll_interval=0.01, high_water=2)
+    pipeline.add(Producer, lambda: (next(counter), 1), 0.002)
+    pipeline.add(Broker, slow, workers=1, max_workers=4)
+    pipeline.add(Consumer, rets.append)
+    pipeline.run()
+
+    assert len(rets) == n_steps
+    assert len(pipeline.stages[1].workers) > 1
+
+
+@pytest.mark.parametrize(
+    "queue_type, queue_class", (("thread", queue.Queue), ("process", FrameQueue))
+)
+def test_pipeline_queue_types(queue_type: str, queue_class: type):
+    """Thread queues pass data by reference, process queues pickle them.
+
+    Args:
+        queue_type (str): type of queues
+        queue_class (type): expected class of queues
+    """
+    n_steps = 5
+    counter = set_n_steps(n_steps)
+    frames = [[i] for i in range(n_steps)]
+    values = iter(frames)
+    rets = []
+
+    pipeline = Pipeline(queue_type=queue_type)
+    pipeline.add(Producer, lambda: (next(counter), next(values, None)))
+    pipeline.add(Broker, lambda x: x)
+    pipeline.add(Consumer, rets.append)
+    pipeline.start()
+    queues = [stage.queue_in for stage in pipeline.stages[1:]]
+    pipeline.join()
+
+    assert all(isinstance(q, queue_class) for q in queues)
+    assert rets == frames
+    by_reference = [ret is frame for ret, frame in zip(rets, frames)]
+    assert all(by_reference) == any(by_reference) == (queue_type == "thread")
+
+
+class _Crash(BaseException):
+    """Exception which is not caught by workers."""
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_pipeline_error():
+    """Failure of worker stops producers and is raised after pipeline ends."""
+    counter = set_n_steps(10**6)
+    rets = []
+
+    def crash(value: int) -> int:
+        if value == 5:
+            raise _Crash()
+        return value
+
+    values = iter(range(10**6))
+    pipeline = Pipeline()
+    pipeline.add(Producer, lambda: (next(counter), next(values)), 0.001)
+    pipeline.add(Broker, crash)
+    pipeline.add(Consumer, rets.append)
+    with pytest.raises(RuntimeError):
+        pipeline.run()
+    assert rets == [0, 1, 2, 3, 4]
+
+
+def test_pipeline_item_errors():
+    """Errors of function on items stop the pipeline and are raised after it ends."""
+    counter = set_n_steps(10**6)
+    values = iter(range(10**6))
+    rets = []
+
+    pipeline = Pipeline(max_errors=1)
+    pipeline.add(Producer, lambda: (next(counter), next(values)), 0.001)
+    pipeline.add(Broker, lambda x: 1 // (x % 5))
+    pipeline.add(Consumer, rets.append)
+    with pytest.raises(RuntimeError):
+        pipeline.run()
+    assert pipeline.stages[1].workers[0].metrics.errors >= 2
+    assert rets[:4] == [1, 0, 0, 0]
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_pipeline_error_bounded():
+    """Producer and broker blocked on full queues of failed consumer end."""
+    counter = set_n_steps(10**6)
+    errors = []
+
+    def crash(value: int) -> None:
+        if value == 3:
+            raise _Crash()
+
+    def run() -> None:
+        try:
+            pipeline.run()
+        except RuntimeError as error:
+            errors.append(error)
+
+    values = iter(range(10**6))
+    pipeline = Pipeline(maxsize=2, poll_interval=0.01)
+    pipeline.add(Producer, lambda: (next(counter), next(values)))
+    pipeline.add(Broker, lambda x: x)
+    pipeline.add(Consumer, crash)
+    thread = Thread(target=run)
+    thread.start()
+    thread.join(10)
+    assert not thread.is_alive()
+    assert len(errors) == 1
+
+
+def test_pipeline_wrong_stages():
+    """Pipeline has to start with Producer and end with Consumer."""
+    with pytest.raises(ValueError):
+        Pipeline().add(Broker, lambda x: x).add(Consumer, print).run()
+    with pytest.raises(ValueError):
+        Pipeline().add(Producer, lambda: (False, None)).run()
+    with pytest.raises(ValueError):
+        Pipeline(queue_type="unknown")
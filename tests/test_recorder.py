@@ -8,7 +8,7 @@ import numpy as np
 import pytest
 from skimage.io import imread
 
-from median_filter import Queue
+from median_filter import END_OF_STREAM, Queue
 from median_filter.recorder import PictureRecorder, _Recorder
 
 TIMEOUT = 0.1
@@ -85,6 +85,30 @@ def test_save_pictures(dim: int):
         assert (saved_pic == expected_pic).all()
 
 
+@pytest.mark.parametrize("dim", (1, 3))
+def test_save_integer_pictures(dim: int):
+    """Test of storing uint8 images without scaling.
+
+    Args:
+        dim (int): number of picture channels.
+    """
+    folder_name = os.sep.join(["tests", "try"])
+    file_name = "test"
+    if os.path.exists(folder_name):
+        rmtree(folder_name)
+    rec = _Recorder(
+        folder_name,
+        file_name,
+    )
+    pics = [np.random.randint(256, size=(5, 5, dim), dtype=np.uint8) for _ in range(3)]
+    for pic in pics:
+        rec.save_to_file(pic)
+
+    for i, pic in enumerate(pics):
+        saved_pic = imread(os.sep.join([folder_name, f"{file_name}_{i}.png"]))
+        assert (saved_pic == pic.squeeze()).all()
+
+
 @pytest.mark.parametrize("n_recorders", (1, 2, 6))
 def test_save_pictures_n_recorders(n_recorders: int):
     """
@@ -130,3 +154,39 @@ def test_save_pictures_n_recorders(n_recorders: int):
         saved_pic = imread(os.sep.join([folder_name, f"{file_name}_{i}.png"]))
         expected_pic = (255 * pic).astype(np.dtype("uint8"))
         assert (saved_pic == expected_pic).all()
+
+
+@pytest.mark.parametrize("processes", (False, True))
+def test_save_pictures_writers(processes: bool):
+    """PictureRecorder with writer pool names pictures in order of queue
+    and writes all of them before it ends.
+
+    Args:
+        processes (bool): writers are processes
+    """
+    folder_name = os.sep.join(["tests", "try"])
+    file_name = "test"
+    if os.path.exists(folder_name):
+        rmtree(folder_name)
+
+    queue: Queue = Queue()
+    pics = [np.random.randint(256, size=(10, 10, 3), dtype=np.uint8) for _ in range(50)]
+    for pic in pics:
+        queue.put(pic)
+    queue.put(END_OF_STREAM)
+
+    recorder = PictureRecorder(
+        queue,
+        folder_name,
+        file_name,
+        writers=3,
+        processes=processes,
+        max_in_flight=4,
+    )
+    recorder.start()
+    recorder.join()
+
+    assert len(os.listdir(folder_name)) == len(pics)
+    for i, pic in enumerate(pics):
+        saved_pic = imread(os.sep.join([folder_name, f"{file_name}_{i}.png"]))
+        assert (saved_pic == pic).all()
@@ -0,0 +1,125 @@
+"""
+Tests on module reorder which restores order of sequenced data.
+"""
+import queue
+import random
+from time import monotonic, sleep
+
+from median_filter import END_OF_STREAM, Broker, Consumer, Producer, Queue, set_n_steps
+from median_filter.common import Sequenced
+from median_filter.reorder import ReorderBuffer
+
+TIMEOUT = 0.1
+
+
+def test_producer_sequence():
+    """Producer gives consecutive indexes to data."""
+    n_steps = 10
+    queue: Queue = Queue()
+    counter = set_n_steps(n_steps)
+    prod = Producer(queue, lambda: (next(counter), "data"), sequence=True)
+    prod.start()
+    prod.join()
+
+    for i in range(n_steps):
+        item = queue.get()
+        assert isinstance(item, Sequenced)
+        assert item.index == i
+        assert item.data == "data"
+
+
+def test_broker_and_consumer_sequenced():
+    """Broker keeps index and converts data, consumer gets data only."""
+    queue_in: Queue = Queue()
+    queue_out: Queue = Queue()
+    rets = []
+    queue_in.put(Sequenced(3, monotonic(), 2))
+    broker = Broker(queue_in, queue_out, lambda x: 2 * x, timeout=TIMEOUT)
+    broker.start()
+    broker.join()
+
+    item = queue_out.get()
+    assert item.index == 3
+    assert item.data == 4
+
+    queue_out.put(item)
+    consumer = Consumer(queue_out, rets.append, timeout=TIMEOUT)
+    consumer.start()
+    consumer.join()
+    assert rets == [4]
+
+
+def test_reorder():
+    """ReorderBuffer puts shuffled data in order."""
+    queue_in: Queue = Queue()
+    queue_out: Queue = Queue()
+    items = [Sequenced(i, monotonic(), i) for i in range(50)]
+    random.shuffle(items)
+    for item in items:
+        queue_in.put(item)
+
+    reorder = ReorderBuffer(queue_in, queue_out, window=50, timeout=TIMEOUT)
+    reorder.start()
+    reorder.join()
+
+    assert [queue_out.get().index for _ in range(50)] == list(range(50))
+    assert queue_out.empty()
+    assert reorder.skipped == 0
+
+
+def test_reorder_window():
+    """ReorderBuffer skips missing index when window is full and drops late data."""
+    queue_in: Queue = Queue()
+    queue_out: Queue = Queue()
+    for i in (1, 2, 3, 0, 4):
+        queue_in.put(Sequenced(i, monotonic(), i))
+
+    reorder = ReorderBuffer(queue_in, queue_out, window=2, timeout=TIMEOUT)
+    reorder.start()
+    reorder.join()
+
+    assert [queue_out.get().index for _ in range(4)] == [1, 2, 3, 4]
+    assert queue_out.empty()
+    assert reorder.skipped == 1
+    assert reorder.late == 1
+
+
+def test_reorder_max_latency():
+    """ReorderBuffer does not wait for missing index longer than max_latency."""
+    queue_in: Queue = Queue()
+    queue_out: Queue = Queue()
+    queue_in.put(Sequenced(1, monotonic(), 1))
+
+    reorder = ReorderBuffer(queue_in, queue_out, max_latency=0.01, timeout=0.5)
+    reorder.start()
+    assert queue_out.get(timeout=1.0).index == 1
+    queue_in.put(Sequenced(2, monotonic(), 2))
+    assert queue_out.get(timeout=1.0).index == 2
+    reorder.join()
+    assert reorder.skipped == 1
+
+
+class _BusyQueue(queue.Queue):
+    """Queue which is never empty for its reader, every item comes after 5 ms."""
+
+    def get(self, block=True, timeout=None):
+        sleep(0.005)
+        return super().get(block=False)
+
+
+def test_reorder_max_latency_flowing_input():
+    """ReorderBuffer skips missing index after max_latency while data keeps coming."""
+    queue_in: queue.Queue = _BusyQueue()
+    queue_out: queue.Queue = queue.Queue()
+    for i in range(1, 200):
+        queue_in.put(Sequenced(i, monotonic(), i))
+    queue_in.put(END_OF_STREAM)
+
+    reorder = ReorderBuffer(queue_in, queue_out, window=1000, max_latency=0.05)
+    reorder.start()
+    assert queue_out.get(timeout=0.5).index == 1
+    assert queue_in.qsize() > 0
+    reorder.join()
+    assert [queue_out.get().index for _ in range(198)] == list(range(2, 200))
+    assert queue_out.get_nowait() is END_OF_STREAM
+    assert reorder.skipped == 1
@@ -0,0 +1,126 @@
+"""
+Tests on module supervisor which scales broker workers by load.
+"""
+import pickle
+import queue
+from time import sleep
+
+import pytest
+
+from median_filter import (
+    END_OF_STREAM,
+    RETIRE,
+    Broker,
+    BrokerSupervisor,
+    Producer,
+    Queue,
+    set_n_steps,
+)
+
+TIMEOUT = 0.1
+
+
+def slow(value: int) -> int:
+    """Broker function which takes some time.
+
+    Args:
+        value (int): data
+
+    Returns:
+        int: the same data
+    """
+    sleep(0.01)
+    return value
+
+
+def test_retire():
+    """RETIRE ends one broker without END_OF_STREAM for the next stage."""
+    queue_in: Queue = Queue()
+    queue_out: Queue = Queue()
+    for marker in (1, RETIRE, 2):
+        queue_in.put(marker)
+    broker = Broker(queue_in, queue_out, lambda x: x, timeout=TIMEOUT)
+    broker.start()
+    broker.join()
+    assert broker.retired
+    assert not broker.ended
+    assert queue_out.get_nowait() == 1
+    assert queue_out.empty()
+    assert queue_in.get_nowait() == 2
+    assert pickle.loads(pickle.dumps(RETIRE)) is RETIRE
+
+
+def test_retire_not_dropped():
+    """Overflow policies keep RETIRE marker in full queue."""
+    bounded_queue: queue.Queue = queue.Queue(maxsize=2)
+    bounded_queue.put(RETIRE)
+    bounded_queue.put(0)
+    counter = set_n_steps(3)
+    producer = Producer(bounded_queue, lambda: (next(counter), 1), overflow="latest")
+    producer.start()
+    producer.join()
+    assert [bounded_queue.get_nowait() for _ in range(2)] == [RETIRE, 1]
+
+
+def test_scaling():
+    """Supervisor adds workers under load and ends the stage after END_OF_STREAM."""
+    n_steps = 150
+    counter = set_n_steps(n_steps)
+    queue_in: Queue = Queue()
+    queue_out: Queue = Queue()
+    producer = Producer(queue_in, lambda: (next(counter), 1), 0.002, end_of_stream=1)
+    supervisor = BrokerSupervisor(
+        lambda: Broker(queue_in, queue_out, slow, timeout=None, verbose=False),
+        min_workers=1,
+        max_workers=4,
+        interval=0.02,
+        down_polls=3,
+    )
+    supervisor.start()
+    producer.start()
+    producer.join()
+    supervisor.join(10)
+
+    assert not supervisor.is_alive()
+    assert len(supervisor.workers) > 1
+    assert all(not worker.is_alive() for worker in supervisor.workers)
+    results = [queue_out.get_nowait() for _ in range(n_steps)]
+    assert results == [1] * n_steps
+    assert queue_out.get_nowait() is END_OF_STREAM
+    assert queue_out.empty()
+    assert sum(snapshot["items"] for snapshot in supervisor.snapshot()) == n_steps
+
+
+def test_scale_down():
+    """Idle supervisor retires extra workers down to min_workers."""
+    queue_in: Queue = Queue()
+    queue_out: Queue = Queue()
+    for _ in range(60):
+        queue_in.put(1)
+    supervisor = BrokerSupervisor(
+        lambda: Broker(queue_in, queue_out, slow, timeout=None, verbose=False),
+        min_workers=1,
+        max_workers=3,
+        interval=0.02,
+        up_polls=1,
+        down_polls=2,
+    )
+    supervisor.start()
+    for _ in range(200):
+        sleep(0.02)
+        if queue_in.empty() and len(supervisor.running) == 1:
+            break
+    assert len(supervisor.workers) > 1
+    assert len(supervisor.running) == 1
+    queue_in.put(END_OF_STREAM)
+    supervisor.join(10)
+    assert not supervisor.is_alive()
+    assert [queue_out.get_nowait() for _ in range(61)] == [1] * 60 + [END_OF_STREAM]
+
+
+def test_wrong_workers():
+    """Supervisor needs 1 <= min_workers <= max_workers."""
+    with pytest.raises(ValueError):
+        BrokerSupervisor(lambda: None, min_workers=0)
+    with pytest.raises(ValueError):
+        BrokerSupervisor(lambda: None, min_workers=3, max_workers=2)
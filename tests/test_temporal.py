@@ -0,0 +1,94 @@
+"""
+Tests on module temporal which filters frames over time.
+"""
+from typing import List, Tuple
+
+import numpy as np
+import pytest
+
+from median_filter import END_OF_STREAM, Queue, TemporalMedianFilter
+from median_filter.kernels import _rank_median
+
+TIMEOUT = 0.1
+
+
+def temporal_median(frames: List[np.ndarray], window: int) -> List[np.ndarray]:
+    """Function compute median of each pixel over the last frames from scratch.
+
+    Args:
+        frames (List[np.ndarray]): frames in order of time
+        window (int): number of the last frames
+
+    Returns:
+        List[np.ndarray]: median of each frame and its predecessors
+    """
+    medians = []
+    for i in range(len(frames)):
+        last = np.sort(np.stack(frames[max(i - window + 1, 0) : i + 1]), axis=0)
+        medians.append(last[len(last) // 2])
+    return medians
+
+
+@pytest.mark.parametrize("window", (1, 2, 3, 5, 8))
+@pytest.mark.parametrize("shape, high", (((16, 12, 3), 256), ((9, 7), 3)))
+def test_temporal_median(window: int, shape: Tuple[int, ...], high: int):
+    """TemporalMedianFilter updated frame by frame equals median over the last frames.
+
+    Args:
+        window (int): number of the last frames
+        shape (Tuple[int, ...]): shape of frames
+        high (int): upper bound of values, small one gives many equal values
+    """
+    frames = [
+        np.random.randint(high, size=shape).astype(np.uint8)
+        for _ in range(3 * window + 4)
+    ]
+    broker = TemporalMedianFilter(Queue(), Queue(), window)
+    for frame, expected in zip(frames, temporal_median(frames, window)):
+        median = broker.fun(frame)
+        assert median.dtype == np.uint8
+        assert (median == expected).all()
+
+
+def test_temporal_median_reset():
+    """Frame with other shape or dtype starts new window."""
+    broker = TemporalMedianFilter(Queue(), Queue(), 3)
+    for _ in range(3):
+        broker.fun(np.zeros((4, 4), np.uint8))
+    frame = np.ones((4, 5), np.uint8)
+    assert (broker.fun(frame) == frame).all()
+    frame = np.full((4, 5), 7, np.uint16)
+    assert (broker.fun(frame) == frame).all()
+    assert broker.count == 1
+
+
+def test_TemporalMedianFilter_spatial():  # pylint: disable=invalid-name
+    """TemporalMedianFilter removes flicker and shot noise of frames from queue."""
+    queue_in: Queue = Queue()
+    queue_out: Queue = Queue()
+    frames = [
+        np.random.randint(256, size=(20, 30, 3), dtype=np.uint8) for _ in range(6)
+    ]
+    for frame in frames:
+        queue_in.put(frame)
+    queue_in.put(END_OF_STREAM)
+
+    broker = TemporalMedianFilter(
+        queue_in, queue_out, 3, (3, 3), timeout=TIMEOUT, end_of_stream=0
+    )
+    broker.start()
+    broker.join()
+
+    footprint = np.ones((3, 3), dtype=bool)
+    for expected in temporal_median(frames, 3):
+        median = queue_out.get(timeout=TIMEOUT)
+        assert (median == _rank_median(expected, footprint)).all()
+    assert broker.metrics.items == len(frames)
+
+
+def test_TemporalMedianFilter_wrong_args():  # pylint: disable=invalid-name
+    """TemporalMedianFilter rejects empty window and filters spanning channels."""
+    with pytest.raises(ValueError):
+        TemporalMedianFilter(Queue(), Queue(), 0)
+    with pytest.raises(ValueError):
+        TemporalMedianFilter(Queue(), Queue(), 3, (3, 3, 3))